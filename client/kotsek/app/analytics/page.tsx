@@ -1,6 +1,7 @@
 "use client";
 
-import { useState } from "react";
+import { useEffect, useState } from "react";
+import axios from "axios";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import {
   Select,
@@ -41,129 +42,104 @@ interface MonthlyData {
   volume: number;
 }
 
-type ViewType = "daily" | "weekly" | "monthly";
-
-const AnalyticsDashboard = () => {
-  const [selectedCamera, setSelectedCamera] = useState("camera1");
-  const [selectedView, setSelectedView] = useState<ViewType>("daily");
-
-  // Sample daily data
-  const dailyData: DailyData[] = [
-    { time: "00:00", volume: 20 },
-    { time: "04:00", volume: 35 },
-    { time: "08:00", volume: 85 },
-    { time: "12:00", volume: 65 },
-    { time: "16:00", volume: 90 },
-    { time: "20:00", volume: 45 },
-  ];
+interface Stats {
+  totalVolume: number;
+  avgVolume: number;
+  peakVolume: number;
+  peakTime?: string;
+}
 
-  // Sample weekly data
-  const weeklyData: WeeklyData[] = [
-    { day: "Mon", volume: 450, average: 420 },
-    { day: "Tue", volume: 520, average: 480 },
-    { day: "Wed", volume: 640, average: 550 },
-    { day: "Thu", volume: 580, average: 510 },
-    { day: "Fri", volume: 780, average: 650 },
-    { day: "Sat", volume: 420, average: 380 },
-    { day: "Sun", volume: 320, average: 300 },
-  ];
+// GET /analytics: pre-aggregated counts for the selected view
+interface AnalyticsResponse {
+  series: (DailyData | WeeklyData | MonthlyData)[];
+  stats: Stats;
+  cameras: string[];
+}
 
-  // Sample monthly data
-  const monthlyData: MonthlyData[] = [
-    { month: "Jan", volume: 12500 },
-    { month: "Feb", volume: 11800 },
-    { month: "Mar", volume: 13200 },
-    { month: "Apr", volume: 14500 },
-    { month: "May", volume: 15800 },
-    { month: "Jun", volume: 16200 },
-    { month: "Jul", volume: 17500 },
-    { month: "Aug", volume: 16800 },
-    { month: "Sep", volume: 15500 },
-    { month: "Oct", volume: 14200 },
-    { month: "Nov", volume: 13800 },
-    { month: "Dec", volume: 12900 },
-  ];
+type ViewType = "daily" | "weekly" | "monthly";
 
-  // Calculate summary statistics based on selected view
-  const calculateStats = () => {
-    switch (selectedView) {
-      case "weekly":
-        const weeklyTotal = weeklyData.reduce(
-          (sum, entry) => sum + entry.volume,
-          0
-        );
-        const weeklyAvg = Math.round(weeklyTotal / weeklyData.length);
-        const weeklyPeak = Math.max(...weeklyData.map((entry) => entry.volume));
-        const weeklyPeakDay = weeklyData.find(
-          (entry) => entry.volume === weeklyPeak
-        )?.day;
-        return {
-          totalVolume: weeklyTotal,
-          avgVolume: weeklyAvg,
-          peakVolume: weeklyPeak,
-          peakTime: weeklyPeakDay,
-        };
+const ALL_CAMERAS = "all";
+const EMPTY_STATS: Stats = { totalVolume: 0, avgVolume: 0, peakVolume: 0 };
 
-      case "monthly":
-        const monthlyTotal = monthlyData.reduce(
-          (sum, entry) => sum + entry.volume,
-          0
-        );
-        const monthlyAvg = Math.round(monthlyTotal / monthlyData.length);
-        const monthlyPeak = Math.max(
-          ...monthlyData.map((entry) => entry.volume)
-        );
-        const monthlyPeakMonth = monthlyData.find(
-          (entry) => entry.volume === monthlyPeak
-        )?.month;
-        return {
-          totalVolume: monthlyTotal,
-          avgVolume: monthlyAvg,
-          peakVolume: monthlyPeak,
-          peakTime: monthlyPeakMonth,
-        };
+const AnalyticsDashboard = () => {
+  const SERVER_URL = process.env.NEXT_PUBLIC_SERVER_URL;
+  const [selectedCamera, setSelectedCamera] = useState(ALL_CAMERAS);
+  const [selectedView, setSelectedView] = useState<ViewType>("daily");
+  const [cameras, setCameras] = useState<string[]>([]);
+  const [dailyData, setDailyData] = useState<DailyData[]>([]);
+  const [weeklyData, setWeeklyData] = useState<WeeklyData[]>([]);
+  const [monthlyData, setMonthlyData] = useState<MonthlyData[]>([]);
+  const [stats, setStats] = useState<Stats>(EMPTY_STATS);
+  const [error, setError] = useState<string | null>(null);
 
-      default:
-        const dailyTotal = dailyData.reduce(
-          (sum, entry) => sum + entry.volume,
-          0
-        );
-        const dailyAvg = Math.round(dailyTotal / dailyData.length);
-        const dailyPeak = Math.max(...dailyData.map((entry) => entry.volume));
-        const dailyPeakTime = dailyData.find(
-          (entry) => entry.volume === dailyPeak
-        )?.time;
-        return {
-          totalVolume: dailyTotal,
-          avgVolume: dailyAvg,
-          peakVolume: dailyPeak,
-          peakTime: dailyPeakTime,
-        };
+  // Counts come from the server's rollup tables, so every view is one small request
+  useEffect(() => {
+    const token = sessionStorage.getItem("access_token");
+    const params: Record<string, string> = { view: selectedView };
+    if (selectedCamera !== ALL_CAMERAS) {
+      params.camera = selectedCamera;
     }
-  };
-
-  const stats = calculateStats();
+    axios
+      .get<AnalyticsResponse>(`${SERVER_URL}/analytics`, {
+        params,
+        headers: { Authorization: `Bearer ${token}` },
+      })
+      .then(({ data }) => {
+        if (selectedView === "weekly") {
+          setWeeklyData(data.series as WeeklyData[]);
+        } else if (selectedView === "monthly") {
+          setMonthlyData(data.series as MonthlyData[]);
+        } else {
+          setDailyData(data.series as DailyData[]);
+        }
+        setStats(data.stats);
+        setCameras(data.cameras);
+        setError(null);
+      })
+      .catch((err) => {
+        console.error("Error fetching analytics:", err);
+        setError("Failed to load analytics");
+      });
+  }, [SERVER_URL, selectedView, selectedCamera]);
 
   return (
     <div className="min-h-screen bg-white p-8">
       <div className="max-w-[90%] mx-auto space-y-6">
         <div className="flex justify-between items-center">
           <h1 className="text-2xl font-bold">Analytics Dashboard</h1>
-          <Select
-            value={selectedView}
-            onValueChange={(value: ViewType) => setSelectedView(value)}
-          >
-            <SelectTrigger className="w-32">
-              <SelectValue placeholder="Select view" />
-            </SelectTrigger>
-            <SelectContent>
-              <SelectItem value="daily">Daily</SelectItem>
-              <SelectItem value="weekly">Weekly</SelectItem>
-              <SelectItem value="monthly">Monthly</SelectItem>
-            </SelectContent>
-          </Select>
+          <div className="flex gap-2">
+            <Select value={selectedCamera} onValueChange={setSelectedCamera}>
+              <SelectTrigger className="w-40">
+                <Camera className="h-4 w-4 mr-2" />
+                <SelectValue placeholder="Select camera" />
+              </SelectTrigger>
+              <SelectContent>
+                <SelectItem value={ALL_CAMERAS}>All cameras</SelectItem>
+                {cameras.map((camera) => (
+                  <SelectItem key={camera} value={camera}>
+                    {camera}
+                  </SelectItem>
+                ))}
+              </SelectContent>
+            </Select>
+            <Select
+              value={selectedView}
+              onValueChange={(value: ViewType) => setSelectedView(value)}
+            >
+              <SelectTrigger className="w-32">
+                <SelectValue placeholder="Select view" />
+              </SelectTrigger>
+              <SelectContent>
+                <SelectItem value="daily">Daily</SelectItem>
+                <SelectItem value="weekly">Weekly</SelectItem>
+                <SelectItem value="monthly">Monthly</SelectItem>
+              </SelectContent>
+            </Select>
+          </div>
         </div>
 
+        {error && <p className="text-sm text-red-500">{error}</p>}
+
         {/* Main Chart Card */}
         <Card>
           <CardHeader>
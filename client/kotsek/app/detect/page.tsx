@@ -25,10 +25,36 @@ interface Detection {
   label: string;
   confidence: number;
   color_annotation: string;
-  coordinates: number[][];
+  coordinates: number[];
   ocr_text: string;
+  track_id?: number;
+  plate?: string;
+  plate_confidence?: number;
+  color_name?: string;
 }
 
+// Compact detection sent with the binary transport (see compact_detection)
+interface CompactDetection {
+  b: number[];
+  l: string;
+  c: number;
+  k: string;
+  t?: number;
+  p?: string;
+  n?: string;
+}
+
+const expandDetection = (d: CompactDetection): Detection => ({
+  label: d.l,
+  confidence: d.c,
+  color_annotation: d.k,
+  coordinates: d.b,
+  ocr_text: d.p || "",
+  track_id: d.t,
+  plate: d.p,
+  color_name: d.n,
+});
+
 interface ParkingSlot {
   id: number;
   status: "available" | "occupied" | "reserved";
@@ -36,6 +62,7 @@ interface ParkingSlot {
 
 const SurveillanceInterface = () => {
   const entryVideoRef = useRef<HTMLImageElement | null>(null);
+  const overlayRef = useRef<HTMLCanvasElement | null>(null);
   const [devices, setDevices] = useState<MediaDeviceInfo[]>([]);
   const [selectedCamera, setSelectedCamera] = useState<string>("0");
   const [enabled, setEnabled] = useState(false);
@@ -377,12 +404,18 @@ const SurveillanceInterface = () => {
         }));
       });
 
+      // Every frame message is acknowledged: the server sends this viewer
+      // its next frame only once the previous one has arrived
       socket.current.on(
         "video_frame",
-        (data: {
-          entrance_frame: string;
-          entrance_detections: Detection[];
-        }) => {
+        (
+          data: {
+            entrance_frame: string | null;
+            entrance_detections: Detection[];
+          },
+          ack?: () => void
+        ) => {
+          ack?.();
           if (!data) {
             console.error("No data received");
             return;
@@ -393,33 +426,73 @@ const SurveillanceInterface = () => {
             entryVideoRef.current.src = `data:image/jpeg;base64,${data.entrance_frame}`;
           }
 
-          // Process entrance detections
-          if (data.entrance_detections?.length > 0) {
-            const mostConfidentDetection = data.entrance_detections.reduce(
-              (prev, current) =>
-                current.confidence > prev.confidence ? current : prev
-            );
-
-            console.log("Detected OCR Text:", mostConfidentDetection.ocr_text);
-
-            setEntryDetectionData({
-              vehicleType: determineVehicleType(mostConfidentDetection.label),
-              plateNumber: mostConfidentDetection.ocr_text || "NFP 8793",
-              colorAnnotation: mostConfidentDetection.color_annotation,
-              ocrText: mostConfidentDetection.ocr_text,
-              annotationLabel: parseInt(mostConfidentDetection.label),
-            });
-          } else {
-            setEntryDetectionData({
-              vehicleType: "No detection",
-              plateNumber: "N/A",
-              colorAnnotation: "N/A",
-              ocrText: "",
-              annotationLabel: 0,
-            });
+          applyDetections(data.entrance_detections);
+        }
+      );
+
+      // Binary transport: raw JPEG bytes, with detections sent separately
+      socket.current.on(
+        "video_frame_bin",
+        (data: { frame_id: number; frame: ArrayBuffer }, ack?: () => void) => {
+          ack?.();
+          if (!data?.frame || !entryVideoRef.current) {
+            return;
+          }
+          const previous = entryVideoRef.current.src;
+          entryVideoRef.current.src = URL.createObjectURL(
+            new Blob([data.frame], { type: "image/jpeg" })
+          );
+          if (previous.startsWith("blob:")) {
+            URL.revokeObjectURL(previous);
+          }
+        }
+      );
+
+      // Overlay mode with the base64 transport: raw frames at a reduced rate
+      socket.current.on(
+        "raw_frame",
+        (data: { frame_id: number; frame: string }, ack?: () => void) => {
+          ack?.();
+          if (data?.frame && entryVideoRef.current) {
+            entryVideoRef.current.src = `data:image/jpeg;base64,${data.frame}`;
           }
+        }
+      );
 
-          setDebugInfo((prev) => ({ ...prev, receivedFrame: true }));
+      socket.current.on(
+        "detections",
+        (
+          data: {
+            frame_id: number;
+            d: CompactDetection[];
+            w: number;
+            h: number;
+            overlay: boolean;
+          },
+          ack?: () => void
+        ) => {
+          ack?.();
+          const detections = (data?.d || []).map(expandDetection);
+          applyDetections(detections);
+          if (data?.overlay) {
+            drawOverlay(detections, data.w, data.h);
+          }
+        }
+      );
+
+      // Plate text from the asynchronous OCR workers arrives after its frame
+      socket.current.on(
+        "ocr_result",
+        (data: { ocr_text: string; plate?: string; track_id?: number }) => {
+          const plate = data?.plate || data?.ocr_text;
+          if (!plate) {
+            return;
+          }
+          setEntryDetectionData((prev) => ({
+            ...prev,
+            plateNumber: plate,
+            ocrText: plate,
+          }));
         }
       );
 
@@ -440,6 +513,83 @@ const SurveillanceInterface = () => {
     }
   };
 
+  // Draw detection boxes over the raw stream (overlay mode). The image is
+  // rendered with object-contain, so boxes are scaled and letterboxed the same way.
+  const drawOverlay = (
+    detections: Detection[],
+    frameWidth: number,
+    frameHeight: number
+  ) => {
+    const canvas = overlayRef.current;
+    if (!canvas || !frameWidth || !frameHeight) {
+      return;
+    }
+    const rect = canvas.getBoundingClientRect();
+    canvas.width = rect.width;
+    canvas.height = rect.height;
+    const ctx = canvas.getContext("2d");
+    if (!ctx) {
+      return;
+    }
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    const scale = Math.min(
+      canvas.width / frameWidth,
+      canvas.height / frameHeight
+    );
+    const offsetX = (canvas.width - frameWidth * scale) / 2;
+    const offsetY = (canvas.height - frameHeight * scale) / 2;
+    ctx.lineWidth = 2;
+    ctx.font = "14px sans-serif";
+    detections.forEach((detection) => {
+      const [x1, y1, x2, y2] = detection.coordinates;
+      const x = offsetX + x1 * scale;
+      const y = offsetY + y1 * scale;
+      const caption = `${detection.label} ${detection.confidence.toFixed(2)}${
+        detection.plate ? ` ${detection.plate}` : ""
+      }`;
+      ctx.strokeStyle = "#22c55e";
+      ctx.strokeRect(x, y, (x2 - x1) * scale, (y2 - y1) * scale);
+      ctx.fillStyle = "#22c55e";
+      ctx.fillRect(x, y - 18, ctx.measureText(caption).width + 8, 18);
+      ctx.fillStyle = "#ffffff";
+      ctx.fillText(caption, x + 4, y - 4);
+    });
+  };
+
+  const clearOverlay = () => {
+    const canvas = overlayRef.current;
+    canvas?.getContext("2d")?.clearRect(0, 0, canvas.width, canvas.height);
+  };
+
+  const applyDetections = (detections: Detection[]) => {
+    // Process entrance detections
+    if (detections?.length > 0) {
+      const mostConfidentDetection = detections.reduce((prev, current) =>
+        current.confidence > prev.confidence ? current : prev
+      );
+
+      console.log("Detected OCR Text:", mostConfidentDetection.ocr_text);
+
+      setEntryDetectionData({
+        vehicleType: determineVehicleType(mostConfidentDetection.label),
+        plateNumber: mostConfidentDetection.ocr_text || "NFP 8793",
+        colorAnnotation: mostConfidentDetection.color_annotation,
+        ocrText: mostConfidentDetection.ocr_text,
+        annotationLabel: parseInt(mostConfidentDetection.label),
+      });
+    } else {
+      setEntryDetectionData({
+        vehicleType: "No detection",
+        plateNumber: "N/A",
+        colorAnnotation: "N/A",
+        ocrText: "",
+        annotationLabel: 0,
+      });
+    }
+
+    setDebugInfo((prev) => ({ ...prev, receivedFrame: true }));
+  };
+
   const stopVideo = () => {
     if (socket.current) {
       socket.current.emit("stop_video");
@@ -449,6 +599,7 @@ const SurveillanceInterface = () => {
     if (entryVideoRef.current) {
       entryVideoRef.current.src = "";
     }
+    clearOverlay();
     setEnabled(false);
     setDebugInfo({
       lastDetection: null,
@@ -511,6 +662,10 @@ const SurveillanceInterface = () => {
                 alt="Camera Stream"
                 className="w-full h-full object-contain"
               />
+              <canvas
+                ref={overlayRef}
+                className="absolute inset-0 w-full h-full pointer-events-none"
+              />
             </CardContent>
           </Card>
 
@@ -1,6 +1,7 @@
 "use client";
 
 import React from "react";
+import axios from "axios";
 import { useForm, useFieldArray } from "react-hook-form";
 import {
   Table,
@@ -40,6 +41,30 @@ import { zodResolver } from "@hookform/resolvers/zod";
 import CustomDropdown from "@/components/Dropdown";
 
 const VEHICLE_TYPES = ["Car", "Motorcycle", "Bicycle", "Truck", "Van"];
+const PAGE_SIZE = 50;
+
+type Vehicle = {
+  plateNumber: string;
+  type: string;
+  color: string;
+  driversName: string;
+  contactNumber: string;
+};
+
+type Incident = {
+  id: number;
+  incident_name: string;
+  date: string;
+  time: string;
+  details: string;
+  vehicles: Vehicle[];
+};
+
+type IncidentPage = {
+  items: Incident[];
+  next_cursor: string | null;
+  has_more: boolean;
+};
 
 // Zod Schemas
 const vehicleSchema = z.object({
@@ -84,43 +109,83 @@ const IncidentReportPage = () => {
     name: "vehicles",
   });
 
-  const [incidents, setIncidents] = React.useState(generateSampleIncidents());
+  const SERVER_URL = process.env.NEXT_PUBLIC_SERVER_URL;
+  const [incidents, setIncidents] = React.useState<Incident[]>([]);
+  const [nextCursor, setNextCursor] = React.useState<string | null>(null);
+  const [loading, setLoading] = React.useState(false);
+  const [error, setError] = React.useState<string | null>(null);
   const [searchTerm, setSearchTerm] = React.useState("");
+  const [query, setQuery] = React.useState("");
   const [sortBy, setSortBy] = React.useState("date");
   const [vehicleTypeFilter, setVehicleTypeFilter] = React.useState("");
 
-  const onSubmit = (data: any) => {
-    const newIncident = {
-      ...data,
-      id: incidents.length + 1,
-    };
-    setIncidents([...incidents, newIncident]);
-    form.reset();
-  };
+  // Wait for a pause in typing before searching on the server
+  React.useEffect(() => {
+    const timer = setTimeout(() => setQuery(searchTerm.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
-  const filteredIncidents = incidents
-    .filter(
-      (incident) =>
-        incident.incident_name
-          .toLowerCase()
-          .includes(searchTerm.toLowerCase()) ||
-        incident.details.toLowerCase().includes(searchTerm.toLowerCase())
-    )
-    .filter(
-      (incident) =>
-        !vehicleTypeFilter ||
-        incident.vehicles.some((v) => v.type === vehicleTypeFilter)
-    )
-    .sort((a, b) => {
-      switch (sortBy) {
-        case "name":
-          return a.incident_name.localeCompare(b.incident_name);
-        case "date":
-          return new Date(b.date).getTime() - new Date(a.date).getTime();
-        default:
-          return 0;
+  // Search, sorting and the vehicle filter run on the server; pages are
+  // fetched with the cursor of the previous one
+  const fetchIncidents = React.useCallback(
+    (cursor: string | null) => {
+      const token = sessionStorage.getItem("access_token");
+      const params: Record<string, string> = {
+        sort: sortBy,
+        limit: String(PAGE_SIZE),
+      };
+      if (query) {
+        params.q = query;
       }
-    });
+      if (vehicleTypeFilter) {
+        params.type = vehicleTypeFilter;
+      }
+      if (cursor) {
+        params.cursor = cursor;
+      }
+      setLoading(true);
+      return axios
+        .get<IncidentPage>(`${SERVER_URL}/incidents`, {
+          params,
+          headers: { Authorization: `Bearer ${token}` },
+        })
+        .then(({ data }) => {
+          setIncidents((current) =>
+            cursor ? [...current, ...data.items] : data.items
+          );
+          setNextCursor(data.has_more ? data.next_cursor : null);
+          setError(null);
+        })
+        .catch((err) => {
+          console.error("Error fetching incidents:", err);
+          setError("Failed to load incidents");
+        })
+        .finally(() => setLoading(false));
+    },
+    [SERVER_URL, sortBy, query, vehicleTypeFilter]
+  );
+
+  React.useEffect(() => {
+    fetchIncidents(null);
+  }, [fetchIncidents]);
+
+  const onSubmit = (data: any) => {
+    const token = sessionStorage.getItem("access_token");
+    axios
+      .post(
+        `${SERVER_URL}/incidents`,
+        { ...data, date: format(data.date, "yyyy-MM-dd") },
+        { headers: { Authorization: `Bearer ${token}` } }
+      )
+      .then(() => {
+        form.reset();
+        fetchIncidents(null);
+      })
+      .catch((err) => {
+        console.error("Error reporting incident:", err);
+        setError(err.response?.data?.error || "Failed to report incident");
+      });
+  };
 
   return (
     <div className="p-4 md:p-6 space-y-6 pl-[100px] md:pl-[100px] lg:pl-[100px]">
@@ -349,6 +414,8 @@ const IncidentReportPage = () => {
             />
           </div>
 
+          {error && <p className="text-sm text-red-600 mb-4">{error}</p>}
+
           <Table>
             <TableHeader>
               <TableRow>
@@ -360,10 +427,12 @@ const IncidentReportPage = () => {
               </TableRow>
             </TableHeader>
             <TableBody>
-              {filteredIncidents.map((incident) => (
+              {incidents.map((incident) => (
                 <TableRow key={incident.id}>
                   <TableCell>{incident.incident_name}</TableCell>
-                  <TableCell>{incident.date.toLocaleDateString()}</TableCell>
+                  <TableCell>
+                    {new Date(`${incident.date}T00:00`).toLocaleDateString()}
+                  </TableCell>
                   <TableCell>{incident.time}</TableCell>
                   <TableCell>{incident.details}</TableCell>
                   <TableCell>
@@ -377,6 +446,18 @@ const IncidentReportPage = () => {
               ))}
             </TableBody>
           </Table>
+
+          {nextCursor && (
+            <div className="flex justify-center mt-4">
+              <Button
+                variant="outline"
+                disabled={loading}
+                onClick={() => fetchIncidents(nextCursor)}
+              >
+                {loading ? "Loading..." : "Load more"}
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
     </div>
@@ -384,40 +465,3 @@ const IncidentReportPage = () => {
 };
 
 export default IncidentReportPage;
-
-function generateSampleIncidents() {
-  return [
-    {
-      id: 1,
-      incident_name: "Parking Collision",
-      date: new Date("2024-01-15"),
-      time: "14:30",
-      details: "Minor collision in parking lot",
-      vehicles: [
-        {
-          plateNumber: "ABC1234",
-          type: "Car",
-          color: "Blue",
-          driversName: "John Doe",
-          contactNumber: "123-456-7890",
-        },
-      ],
-    },
-    {
-      id: 2,
-      incident_name: "Speeding Violation",
-      date: new Date("2024-01-20"),
-      time: "09:15",
-      details: "Vehicle exceeding speed limit",
-      vehicles: [
-        {
-          plateNumber: "XYZ5678",
-          type: "Motorcycle",
-          color: "Red",
-          driversName: "Jane Smith",
-          contactNumber: "987-654-3210",
-        },
-      ],
-    },
-  ];
-}
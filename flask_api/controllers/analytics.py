@@ -0,0 +1,107 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from datetime import datetime, timedelta
+from controllers.streams import get_stream_manager
+from models.detections import AnalyticsRollup
+
+analytics_bp = Blueprint('analytics', __name__)
+
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+# Weeks of history behind the weekly view's "average" line
+AVERAGE_WEEKS = 4
+
+def fetch(granularity, start, end, camera=None, label=None):
+    """Rollup rows of one granularity in [start, end): a range scan of the rollup key, not of the events"""
+    query = AnalyticsRollup.query.filter(AnalyticsRollup.granularity == granularity,
+                                         AnalyticsRollup.bucket >= start,
+                                         AnalyticsRollup.bucket < end)
+    if camera:
+        query = query.filter(AnalyticsRollup.stream_id == camera)
+    if label:
+        query = query.filter(AnalyticsRollup.label == label)
+    return query.all()
+
+def totals(rows):
+    """bucket -> {"volume", "detections", "by_class"} summed over cameras (and classes)"""
+    buckets = {}
+    for row in rows:
+        entry = buckets.setdefault(row.bucket, {'volume': 0, 'detections': 0, 'by_class': {}})
+        entry['volume'] += row.vehicles
+        entry['detections'] += row.detections
+        entry['by_class'][row.label] = entry['by_class'].get(row.label, 0) + row.vehicles
+    return buckets
+
+def point(buckets, bucket, **fields):
+    entry = buckets.get(bucket, {'volume': 0, 'detections': 0, 'by_class': {}})
+    return {**fields, 'volume': entry['volume'], 'detections': entry['detections'], 'by_class': entry['by_class']}
+
+def summary(series, key):
+    total = sum(p['volume'] for p in series)
+    peak = max(series, key=lambda p: p['volume'])
+    return {
+        'totalVolume': total,
+        'avgVolume': round(total / len(series)),
+        'peakVolume': peak['volume'],
+        'peakTime': peak[key]
+    }
+
+@analytics_bp.route('/analytics', methods=['GET'])
+@jwt_required()
+def analytics():
+    """
+    Traffic volume (vehicles) for the analytics page, from the rollup tables:
+    ?view=daily (24 hours of &date), weekly (the 7 days up to &date, with the
+    average of the same weekday over the previous weeks) or monthly (the
+    12 months of &date's year). &camera and &label narrow it to one stream
+    or vehicle class. Dates are local (KOTSEK_ANALYTICS_UTC_OFFSET).
+    """
+    manager = get_stream_manager()
+    view = request.args.get('view', 'daily')
+    camera = request.args.get('camera') or None
+    label = request.args.get('label') or None
+    try:
+        if request.args.get('date'):
+            day = datetime.strptime(request.args['date'], '%Y-%m-%d')
+        else:
+            now = datetime.utcnow() + timedelta(hours=manager.config.analytics_utc_offset)
+            day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+
+    if view == 'daily':
+        rows = fetch('hour', day, day + timedelta(days=1), camera, label)
+        buckets = totals(rows)
+        series = [point(buckets, day + timedelta(hours=h), time=f'{h:02d}:00') for h in range(24)]
+        stats = summary(series, 'time')
+    elif view == 'weekly':
+        first = day - timedelta(days=6)
+        rows = fetch('day', first - timedelta(weeks=AVERAGE_WEEKS), day + timedelta(days=1), camera, label)
+        buckets = totals(rows)
+        series = []
+        for offset in range(7):
+            date = first + timedelta(days=offset)
+            previous = [buckets.get(date - timedelta(weeks=w), {}).get('volume', 0)
+                        for w in range(1, AVERAGE_WEEKS + 1)]
+            series.append(point(buckets, date, day=WEEKDAYS[date.weekday()], date=date.strftime('%Y-%m-%d'),
+                                average=round(sum(previous) / AVERAGE_WEEKS)))
+        stats = summary(series, 'day')
+    elif view == 'monthly':
+        year = day.replace(month=1, day=1)
+        rows = fetch('month', year, year.replace(year=year.year + 1), camera, label)
+        buckets = totals(rows)
+        series = [point(buckets, year.replace(month=m + 1), month=name) for m, name in enumerate(MONTHS)]
+        stats = summary(series, 'month')
+    else:
+        return jsonify({'error': 'view must be daily, weekly or monthly'}), 400
+
+    return jsonify({
+        'view': view,
+        'date': day.strftime('%Y-%m-%d'),
+        'camera': camera,
+        'label': label,
+        'series': series,
+        'stats': stats,
+        'cameras': list(manager.streams),
+        'labels': sorted({row.label for row in rows})
+    }), 200
@@ -14,13 +14,24 @@ import requests
 from models.users import User
 from db.db import db
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from threading import Lock
 import uuid
 import secrets
 
 load_dotenv()
 
-supabase: Client = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+_supabase = None
+_supabase_lock = Lock()
+
+def get_supabase():
+    """Supabase client, created on first use so importing the app stays fast"""
+    global _supabase
+    if _supabase is None:
+        with _supabase_lock:
+            if _supabase is None:
+                from supabase import create_client
+                _supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+    return _supabase
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -140,14 +151,14 @@ def google_callback():
                     
                     # Upload to Supabase
                     try:
-                        supabase.storage.from_(bucket_name).upload(
+                        get_supabase().storage.from_(bucket_name).upload(
                             file_path,
                             response.content,
                             file_options={"content-type": "image/jpeg"}
                         )
                         try:
                             # Generate a signed URL with the Supabase client
-                            signed_url = supabase.storage.from_(bucket_name).create_signed_url(
+                            signed_url = get_supabase().storage.from_(bucket_name).create_signed_url(
                                 file_path,
                                 60 * 60 * 24 * 7  # 7 days expiration in seconds
                             )
@@ -248,7 +259,7 @@ def register():
             
             # Upload the file
             try:
-                supabase.storage.from_(bucket_name).upload(
+                get_supabase().storage.from_(bucket_name).upload(
                     file_path,
                     profile_image.read(),
                     file_options={"content-type": profile_image.mimetype}
@@ -0,0 +1,240 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import and_, insert, or_, select, tuple_
+from datetime import datetime, timedelta
+from db.db import db
+from models.incidents import Incident, IncidentVehicle
+from detection_service.plate_search import normalize_plate
+import base64
+import json
+
+incidents_bp = Blueprint('incidents', __name__)
+
+MAX_PAGE_SIZE = 200
+# Incidents per bulk request, and per multi-row INSERT within it
+MAX_BULK = 10000
+BULK_CHUNK = 1000
+
+VEHICLE_FIELDS = {
+    'plateNumber': ('plate_number', 32),
+    'type': ('vehicle_type', 32),
+    'color': ('color', 32),
+    'driversName': ('drivers_name', 120),
+    'contactNumber': ('contact_number', 32),
+}
+
+def required_text(data, key, max_length=None):
+    value = data.get(key)
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f'{key} is required')
+    value = value.strip()
+    if max_length is not None and len(value) > max_length:
+        raise ValueError(f'{key} is longer than {max_length} characters')
+    return value
+
+def parse_incident(data):
+    """
+    Validate an incident in the report page's shape (incident_name, date,
+    time, details, vehicles[]). Returns the incidents row and its
+    incident_vehicles rows; raises ValueError.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('incident must be an object')
+    # The page sends a full ISO timestamp for the date; only the day counts
+    date = required_text(data, 'date')[:10]
+    time = required_text(data, 'time')
+    try:
+        occurred_at = datetime.strptime(f'{date} {time[:5]}', '%Y-%m-%d %H:%M')
+    except ValueError:
+        raise ValueError('date must be YYYY-MM-DD and time HH:MM')
+    vehicles = data.get('vehicles')
+    if not isinstance(vehicles, list) or not vehicles:
+        raise ValueError('At least one vehicle is required')
+    vehicle_rows = []
+    for vehicle in vehicles:
+        if not isinstance(vehicle, dict):
+            raise ValueError('vehicles must be objects')
+        row = {column: required_text(vehicle, key, length) for key, (column, length) in VEHICLE_FIELDS.items()}
+        row['plate_normalized'] = normalize_plate(row['plate_number'])
+        row['occurred_at'] = occurred_at
+        vehicle_rows.append(row)
+    incident = {
+        'incident_name': required_text(data, 'incident_name', 200),
+        'occurred_at': occurred_at,
+        'details': required_text(data, 'details'),
+    }
+    return incident, vehicle_rows
+
+def current_user_id():
+    identity = get_jwt_identity()
+    try:
+        return int(identity)
+    except (TypeError, ValueError):
+        return None
+
+def encode_cursor(sort, incident):
+    key = incident.incident_name if sort == 'name' else incident.occurred_at.isoformat()
+    raw = json.dumps({'s': sort, 'k': [key, incident.id]}).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor, sort):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        key, incident_id = data['k']
+        if data['s'] != sort:
+            raise ValueError
+        if sort == 'date':
+            key = datetime.fromisoformat(key)
+        return key, int(incident_id)
+    except Exception:
+        raise ValueError('Invalid cursor for this sort order')
+
+def parse_day(value):
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+@incidents_bp.route('/incidents', methods=['GET'])
+@jwt_required()
+def list_incidents():
+    """
+    One page of incidents, newest first (?sort=date) or by name (?sort=name).
+    Filters: q (name/details substring), type (vehicle type), plate, from / to
+    (YYYY-MM-DD, inclusive). Pages are keyset-paginated: pass the returned
+    next_cursor as ?cursor= for the next page, so every page costs the same
+    however deep it is. There is deliberately no total count.
+    """
+    sort = request.args.get('sort', 'date')
+    if sort not in ('date', 'name'):
+        return jsonify({'error': 'sort must be date or name'}), 400
+    try:
+        limit = min(MAX_PAGE_SIZE, max(1, int(request.args.get('limit', 50))))
+        date_from = parse_day(request.args.get('from'))
+        date_to = parse_day(request.args.get('to'))
+        cursor = decode_cursor(request.args['cursor'], sort) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e) if 'cursor' in str(e) else 'Invalid limit, from or to'}), 400
+
+    query = Incident.query
+    time_filters = []
+    if date_from is not None:
+        time_filters.append(lambda column: column >= date_from)
+    if date_to is not None:
+        time_filters.append(lambda column: column < date_to + timedelta(days=1))
+    if cursor is not None and sort == 'date':
+        time_filters.append(lambda column: column <= cursor[0])
+    for time_filter in time_filters:
+        query = query.filter(time_filter(Incident.occurred_at))
+
+    q = request.args.get('q', '').strip()
+    if q:
+        pattern = '%' + q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        query = query.filter(or_(Incident.incident_name.ilike(pattern, escape='\\'),
+                                 Incident.details.ilike(pattern, escape='\\')))
+    # Both vehicle filters also use the vehicles' copy of occurred_at, which
+    # their (type|plate, occurred_at, incident_id) indexes cover
+    if request.args.get('plate'):
+        # A plate matches a handful of incidents: start from those
+        plate = normalize_plate(request.args['plate'])
+        query = query.filter(Incident.id.in_(
+            select(IncidentVehicle.incident_id).where(
+                IncidentVehicle.plate_normalized == plate,
+                *[time_filter(IncidentVehicle.occurred_at) for time_filter in time_filters])))
+    if request.args.get('type'):
+        # A type matches a large share of them: walk the listing's own order
+        # and check each incident with one index seek
+        query = query.filter(Incident.vehicles.any(and_(
+            IncidentVehicle.vehicle_type == request.args['type'],
+            IncidentVehicle.occurred_at == Incident.occurred_at)))
+
+    if sort == 'name':
+        if cursor is not None:
+            query = query.filter(tuple_(Incident.incident_name, Incident.id) > tuple_(*cursor))
+        query = query.order_by(Incident.incident_name.asc(), Incident.id.asc())
+    else:
+        if cursor is not None:
+            query = query.filter(tuple_(Incident.occurred_at, Incident.id) < tuple_(*cursor))
+        query = query.order_by(Incident.occurred_at.desc(), Incident.id.desc())
+
+    incidents = query.limit(limit + 1).all()
+    has_more = len(incidents) > limit
+    incidents = incidents[:limit]
+    return jsonify({
+        'items': [incident.to_dict() for incident in incidents],
+        'next_cursor': encode_cursor(sort, incidents[-1]) if has_more else None,
+        'has_more': has_more
+    }), 200
+
+@incidents_bp.route('/incidents/<int:incident_id>', methods=['GET'])
+@jwt_required()
+def get_incident(incident_id):
+    incident = db.session.get(Incident, incident_id)
+    if incident is None:
+        return jsonify({'error': 'Incident not found'}), 404
+    return jsonify(incident.to_dict()), 200
+
+@incidents_bp.route('/incidents', methods=['POST'])
+@jwt_required()
+def create_incident():
+    """Report one incident (the report page's form)"""
+    try:
+        row, vehicle_rows = parse_incident(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        incident = Incident(**row, created_by=current_user_id(),
+                            vehicles=[IncidentVehicle(**vehicle) for vehicle in vehicle_rows])
+        db.session.add(incident)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    return jsonify(incident.to_dict()), 201
+
+@incidents_bp.route('/incidents/bulk', methods=['POST'])
+@jwt_required()
+def bulk_import():
+    """
+    Import up to MAX_BULK incidents in one transaction, as a JSON array (or
+    {"incidents": [...]}) or as NDJSON (application/x-ndjson), one incident
+    per line. Nothing is imported unless every incident is valid.
+    """
+    try:
+        if request.mimetype == 'application/x-ndjson':
+            items = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        else:
+            data = request.get_json(silent=True)
+            items = data.get('incidents') if isinstance(data, dict) else data
+    except ValueError:
+        return jsonify({'error': 'Invalid NDJSON'}), 400
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected a non-empty list of incidents'}), 400
+    if len(items) > MAX_BULK:
+        return jsonify({'error': f'At most {MAX_BULK} incidents per request'}), 413
+
+    parsed, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            parsed.append(parse_incident(item))
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+    if errors:
+        return jsonify({'error': 'No incidents were imported', 'errors': errors[:100],
+                        'invalid': len(errors)}), 400
+
+    created_by = current_user_id()
+    created_at = datetime.utcnow()
+    incidents = Incident.__table__
+    try:
+        for start in range(0, len(parsed), BULK_CHUNK):
+            chunk = parsed[start:start + BULK_CHUNK]
+            # Multi-row INSERT ... RETURNING, ids in the order of the rows
+            ids = db.session.execute(
+                insert(incidents).returning(incidents.c.id, sort_by_parameter_order=True),
+                [dict(row, created_by=created_by, created_at=created_at) for row, _ in chunk]).scalars().all()
+            vehicle_rows = [dict(vehicle, incident_id=incident_id)
+                            for incident_id, (_, vehicles) in zip(ids, chunk) for vehicle in vehicles]
+            db.session.execute(insert(IncidentVehicle.__table__), vehicle_rows)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'imported': len(parsed)}), 201
@@ -0,0 +1,10 @@
+from flask import Blueprint, Response
+from controllers.streams import get_stream_manager
+from detection_service.metrics import render
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint: stage latencies, queue depths, drops, OCR and emit counters per camera"""
+    return Response(render(get_stream_manager()), mimetype='text/plain; version=0.0.4')
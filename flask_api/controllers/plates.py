@@ -0,0 +1,50 @@
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import jwt_required
+from sqlalchemy import or_
+from models.detections import PlateRead
+import time
+
+plates_bp = Blueprint('plates', __name__)
+
+def get_plate_index():
+    """The PlateIndex created by create_app"""
+    return current_app.extensions['plate_index']
+
+@plates_bp.route('/plates/search', methods=['GET'])
+@jwt_required()
+def search_plates():
+    """
+    Fuzzy plate lookup tolerant of OCR confusions (0/O, 1/I, 8/B, ...):
+    ?q=ABC1234 (&max_distance=0|1, default 1) or a partial plate such as
+    ?q=BC12&partial=1 or ?q=AB?1234 ("?" = one unknown character).
+    &reads=N adds the N latest plate reads of the matches.
+    """
+    index = get_plate_index()
+    if index.state != 'ready':
+        return jsonify({'error': 'Plate index is not ready', 'state': index.state}), 503
+    query = request.args.get('q', '')
+    partial = request.args.get('partial', '').lower() in ('1', 'true', 'yes')
+    try:
+        max_distance = min(1, max(0, int(request.args.get('max_distance', 1))))
+        limit = min(200, max(1, int(request.args.get('limit', 50))))
+        reads = min(200, max(0, int(request.args.get('reads', 0))))
+    except ValueError:
+        return jsonify({'error': 'max_distance, limit and reads must be integers'}), 400
+
+    started = time.perf_counter()
+    try:
+        matches = index.search(query, max_distance=max_distance, partial=partial, limit=limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = {'query': query, 'matches': matches}
+    if reads and matches:
+        # Indexed lookups on plate_reads.text / plate_reads.plate for the matched spellings only
+        spellings = sorted({s for match in matches for s in match['spellings']})
+        rows = (PlateRead.query
+                .filter(or_(PlateRead.text.in_(spellings), PlateRead.plate.in_(spellings)))
+                .order_by(PlateRead.read_at.desc())
+                .limit(reads)
+                .all())
+        response['reads'] = [row.to_dict() for row in rows]
+    response['took_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return jsonify(response), 200
@@ -0,0 +1,99 @@
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import jwt_required
+import re
+
+streams_bp = Blueprint('streams', __name__)
+
+# Stream ids end up in URLs, metric labels and detection_events.stream_id (64 characters)
+STREAM_ID = re.compile(r'[A-Za-z0-9_.-]{1,64}')
+
+def get_stream_manager():
+    """The StreamManager created by create_app"""
+    return current_app.extensions['stream_manager']
+
+@streams_bp.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 once the detector and OCR pool are loaded, 503 while loading or failed"""
+    state = get_stream_manager().readiness()
+    return jsonify(state), 200 if state['ready'] else 503
+
+@streams_bp.route('/streams', methods=['GET'])
+def list_streams():
+    """Per-stream FPS, capture-to-emit latency and queue counters"""
+    return jsonify(get_stream_manager().stats()), 200
+
+@streams_bp.route('/streams', methods=['POST'])
+@jwt_required()
+def register_stream():
+    """Register a new camera source: {"id": "exit", "source": "rtsp://..."}"""
+    data = request.get_json(silent=True) or {}
+    stream_id = data.get('id')
+    source = data.get('source')
+    if not stream_id or source in (None, ''):
+        return jsonify({'error': 'id and source are required'}), 400
+    if not isinstance(stream_id, str) or not STREAM_ID.fullmatch(stream_id):
+        return jsonify({'error': 'id must be 1-64 letters, digits, "_", "." or "-"'}), 400
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    try:
+        get_stream_manager().register(stream_id, source)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'id': stream_id, 'source': str(source)}), 201
+
+@streams_bp.route('/streams/<stream_id>', methods=['DELETE'])
+@jwt_required()
+def unregister_stream(stream_id):
+    if not get_stream_manager().unregister(stream_id):
+        return jsonify({'error': 'Stream not found'}), 404
+    return jsonify({'message': 'Stream removed'}), 200
+
+@streams_bp.route('/streams/<stream_id>/start', methods=['POST'])
+@jwt_required()
+def start_stream(stream_id):
+    manager = get_stream_manager()
+    if stream_id not in manager.streams:
+        return jsonify({'error': 'Stream not found'}), 404
+    if not manager.start(stream_id):
+        return jsonify({'error': 'Video source not available'}), 503
+    if stream_id in manager.readiness()['waiting_to_start']:
+        return jsonify({'message': 'Stream starts once the models are loaded'}), 202
+    return jsonify({'message': 'Stream started'}), 200
+
+@streams_bp.route('/streams/<stream_id>/stop', methods=['POST'])
+@jwt_required()
+def stop_stream(stream_id):
+    if not get_stream_manager().stop(stream_id):
+        return jsonify({'error': 'Stream not found'}), 404
+    return jsonify({'message': 'Stream stopped'}), 200
+
+@streams_bp.route('/streams/<stream_id>/controller', methods=['GET'])
+def get_controller(stream_id):
+    """Current load-shedding level, knob settings and the measurements behind them"""
+    processor = get_stream_manager().streams.get(stream_id)
+    if processor is None:
+        return jsonify({'error': 'Stream not found'}), 404
+    controller = getattr(processor, 'controller', None)
+    if controller is None:
+        return jsonify({'error': 'Adaptive control is disabled for this stream'}), 404
+    return jsonify(controller.state()), 200
+
+@streams_bp.route('/streams/<stream_id>/controller', methods=['PUT'])
+@jwt_required()
+def update_controller(stream_id):
+    """Change the targets: {"target_latency_ms": 250, "target_fps": 10, "level": 2, "pin": true}"""
+    processor = get_stream_manager().streams.get(stream_id)
+    if processor is None:
+        return jsonify({'error': 'Stream not found'}), 404
+    controller = getattr(processor, 'controller', None)
+    if controller is None:
+        return jsonify({'error': 'Adaptive control is disabled for this stream'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        controller.configure(target_latency_ms=data.get('target_latency_ms'),
+                             target_fps=data.get('target_fps'),
+                             level=data.get('level'),
+                             pin=data.get('pin'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid controller settings'}), 400
+    return jsonify(controller.state()), 200
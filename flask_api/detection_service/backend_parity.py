@@ -0,0 +1,178 @@
+"""
+Speed and accuracy-parity report for the detector backends, on frames
+sampled from a recorded clip:
+
+    python -m detection_service.backend_parity ./sample/mamamo.mov \
+        --backends torch onnx onnx-int8 openvino openvino-int8 --json report.json
+
+Every backend sees exactly the same frames. PyTorch is the reference: boxes
+are matched to its boxes greedily by IoU (same class only), and the report
+shows recall/precision against it, the mean IoU and confidence difference
+of matched boxes, and the ms per batch, so the fastest backend that still
+agrees with PyTorch can be picked for each host.
+"""
+import argparse
+import json
+import time
+import cv2
+import numpy as np
+from detection_service.backends import BACKENDS, TORCH, load_model
+
+
+def sample_frames(video_path, max_frames, stride, size):
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open {video_path}")
+    frames = []
+    index = 0
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        index += 1
+        if (index - 1) % stride:
+            continue
+        frames.append(cv2.resize(frame, size))
+    cap.release()
+    return frames
+
+
+def _boxes(result):
+    boxes = result.boxes
+    return (boxes.xyxy.cpu().numpy(), boxes.cls.cpu().numpy().astype(int), boxes.conf.cpu().numpy())
+
+
+def run_backend(model, frames, batch_size, conf, iou):
+    """Detections per frame and the seconds spent in inference, after one warm-up batch."""
+    model(frames[:batch_size], conf=conf, iou=iou, verbose=False)
+    detections = []
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        results = model(frames[i:i + batch_size], conf=conf, iou=iou, verbose=False)
+        detections.extend(_boxes(r) for r in results)
+    return detections, time.perf_counter() - start
+
+
+def _iou_matrix(a, b):
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def compare(reference, candidate, match_iou=0.5):
+    ref_total = cand_total = matched = identical_frames = 0
+    iou_sum = conf_diff_sum = 0.0
+    for (ref_xyxy, ref_cls, ref_conf), (xyxy, cls, conf) in zip(reference, candidate):
+        ref_total += len(ref_cls)
+        cand_total += len(cls)
+        frame_matched = 0
+        if len(ref_cls) and len(cls):
+            ious = _iou_matrix(ref_xyxy, xyxy)
+            ious[ref_cls[:, None] != cls[None, :]] = 0.0
+            # Greedy one-to-one matching, best overlaps first
+            for flat in np.argsort(-ious, axis=None):
+                r, c = np.unravel_index(flat, ious.shape)
+                if ious[r, c] < match_iou:
+                    break
+                iou_sum += float(ious[r, c])
+                conf_diff_sum += abs(float(ref_conf[r]) - float(conf[c]))
+                frame_matched += 1
+                ious[r, :] = 0.0
+                ious[:, c] = 0.0
+        matched += frame_matched
+        if frame_matched == len(ref_cls) == len(cls):
+            identical_frames += 1
+    return {
+        "recall": matched / ref_total if ref_total else 1.0,
+        "precision": matched / cand_total if cand_total else 1.0,
+        "mean_iou": iou_sum / matched if matched else 0.0,
+        "mean_conf_diff": conf_diff_sum / matched if matched else 0.0,
+        "frames_identical": identical_frames / max(len(reference), 1),
+        "boxes": cand_total,
+    }
+
+
+def parse_backend(name):
+    """"onnx-int8" -> ("onnx", True); argparse.ArgumentTypeError for names the report cannot run"""
+    backend, dash, suffix = name.partition("-")
+    if backend not in BACKENDS:
+        raise argparse.ArgumentTypeError(f"unknown backend '{backend}' (choose from {', '.join(BACKENDS)})")
+    if dash and suffix != "int8":
+        raise argparse.ArgumentTypeError(f"'{name}': the only suffix is -int8")
+    if dash and backend == TORCH:
+        # load_model would quietly run fp32 under an INT8 label
+        raise argparse.ArgumentTypeError("torch has no int8 build (use onnx-int8 or openvino-int8)")
+    return backend, bool(dash)
+
+
+def backend_name(name):
+    """argparse type of --backends: the name, once parse_backend accepts it."""
+    parse_backend(name)
+    return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="Reference clip to sample frames from")
+    parser.add_argument("--model", default="./sample/best.pt")
+    parser.add_argument("--backends", nargs="+", type=backend_name, default=["torch", "onnx", "openvino"],
+                        help="Backends to compare, with an optional -int8 suffix (e.g. onnx-int8)")
+    parser.add_argument("--frames", type=int, default=300, help="Number of frames to sample")
+    parser.add_argument("--stride", type=int, default=2, help="Sample every Nth frame")
+    parser.add_argument("--batch-size", type=int, default=4, help="Frames per inference call")
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--match-iou", type=float, default=0.5, help="IoU for a box to count as the same detection")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    frames = sample_frames(args.video, args.frames, args.stride, (640, 480))
+    if not frames:
+        raise SystemExit("No frames could be read from the clip")
+
+    reference, reference_seconds = run_backend(load_model(args.model), frames, args.batch_size, args.conf, args.iou)
+    report = {
+        "video": args.video,
+        "frames": len(frames),
+        "batch_size": args.batch_size,
+        "backends": {},
+    }
+    for name in args.backends:
+        backend, int8 = parse_backend(name)
+        if backend == TORCH and not int8:
+            detections, seconds = reference, reference_seconds
+        else:
+            try:
+                model = load_model(args.model, backend, int8, calibration_video=args.video)
+            except Exception as e:
+                print(f"{name}: skipped ({e})")
+                report["backends"][name] = {"error": str(e)}
+                continue
+            detections, seconds = run_backend(model, frames, args.batch_size, args.conf, args.iou)
+        entry = {
+            "ms_per_frame": 1000.0 * seconds / len(frames),
+            "speedup": reference_seconds / seconds if seconds > 0 else 0.0,
+        }
+        entry.update(compare(reference, detections, args.match_iou))
+        report["backends"][name] = entry
+        print(f"{name:>14}: {entry['ms_per_frame']:6.1f} ms/frame ({entry['speedup']:.2f}x) | "
+              f"recall {entry['recall']:.1%} precision {entry['precision']:.1%} | "
+              f"IoU {entry['mean_iou']:.3f} | conf diff {entry['mean_conf_diff']:.3f} | "
+              f"identical frames {entry['frames_identical']:.1%}")
+
+    timed = {name: entry for name, entry in report["backends"].items() if "ms_per_frame" in entry}
+    if timed:
+        report["fastest"] = min(timed, key=lambda name: timed[name]["ms_per_frame"])
+        print(f"Fastest: {report['fastest']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+CPU inference backends for the detector. Every backend loads an export of
+the same `best.pt` through Ultralytics' AutoBackend, so letterboxing, NMS,
+class names and the Results objects the pipeline consumes are exactly the
+ones the PyTorch model produces; only the network itself runs elsewhere.
+
+    torch     PyTorch eager (the original behaviour)
+    onnx      ONNX Runtime; with int8, dynamically quantized weights
+    openvino  OpenVINO; with int8, statically quantized (NNCF) on
+              calibration frames from a reference clip
+
+Exports are created next to the .pt on first use and reused afterwards.
+"""
+import os
+import shutil
+import tempfile
+import cv2
+
+TORCH = "torch"
+ONNX = "onnx"
+OPENVINO = "openvino"
+
+BACKENDS = (TORCH, ONNX, OPENVINO)
+
+
+def export_path(model_path, backend, int8=False):
+    """Where the export of `model_path` for `backend` lives."""
+    stem, _ = os.path.splitext(model_path)
+    if backend == ONNX:
+        return f"{stem}_int8.onnx" if int8 else f"{stem}.onnx"
+    if backend == OPENVINO:
+        return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+    return model_path
+
+
+def calibration_dataset(video_path, names, frames=200, stride=5, size=(640, 480)):
+    """
+    Ultralytics dataset yaml over frames sampled from `video_path`, for
+    static INT8 calibration on footage from our own cameras. Calibration
+    only needs images, so the label folders stay empty.
+    Returns (yaml_path, temp_dir); the caller removes temp_dir.
+    """
+    root = tempfile.mkdtemp(prefix="kotsek_calib_")
+    images = os.path.join(root, "images", "val")
+    os.makedirs(images)
+    os.makedirs(os.path.join(root, "labels", "val"))
+    cap = cv2.VideoCapture(video_path)
+    index = saved = 0
+    while saved < frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        index += 1
+        if (index - 1) % stride:
+            continue
+        cv2.imwrite(os.path.join(images, f"{saved:05d}.jpg"), cv2.resize(frame, size))
+        saved += 1
+    cap.release()
+    if not saved:
+        shutil.rmtree(root, ignore_errors=True)
+        raise ValueError(f"No calibration frames could be read from {video_path}")
+    yaml_path = os.path.join(root, "calibration.yaml")
+    with open(yaml_path, "w") as f:
+        f.write(f"path: {root}\ntrain: images/val\nval: images/val\nnames:\n")
+        for class_id, name in sorted(names.items()):
+            f.write(f"  {class_id}: {name!r}\n")
+    return yaml_path, root
+
+
+def _quantize_onnx(source, target):
+    """Dynamic INT8 weight quantization, keeping the Ultralytics metadata (names, stride, imgsz)."""
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(source, target, weight_type=QuantType.QUInt8)
+    metadata = {prop.key: prop.value for prop in onnx.load(source, load_external_data=False).metadata_props}
+    quantized = onnx.load(target)
+    existing = {prop.key for prop in quantized.metadata_props}
+    for key, value in metadata.items():
+        if key not in existing:
+            prop = quantized.metadata_props.add()
+            prop.key, prop.value = key, value
+    onnx.save(quantized, target)
+
+
+def export_model(model_path, backend, int8=False, imgsz=640, calibration_video=None):
+    """Export `model_path` for `backend` (if not already done) and return the export's path."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    target = export_path(model_path, backend, int8)
+    if backend == TORCH or os.path.exists(target):
+        return target
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    # Dynamic axes keep batched inference and the load controller's
+    # smaller input resolutions working
+    if backend == ONNX:
+        exported = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            _quantize_onnx(exported, target)
+            return target
+        return exported
+
+    data, calibration_dir = None, None
+    if int8 and calibration_video:
+        data, calibration_dir = calibration_dataset(calibration_video, model.names)
+    try:
+        exported = model.export(format="openvino", imgsz=imgsz, dynamic=True, int8=int8, data=data)
+    finally:
+        if calibration_dir:
+            shutil.rmtree(calibration_dir, ignore_errors=True)
+    if os.path.abspath(exported) != os.path.abspath(target):
+        shutil.move(exported, target)
+    return target
+
+
+def load_model(model_path, backend=TORCH, int8=False, imgsz=640, calibration_video=None):
+    """
+    The detector for `backend`, exporting it first if needed. Falls back to
+    PyTorch when the runtime for the backend is not installed.
+    """
+    # Imported here: pulling in Ultralytics (and torch) takes seconds, and
+    # only the processes that actually run the detector should pay for it
+    from ultralytics import YOLO
+
+    if backend == TORCH:
+        return YOLO(model_path)
+    try:
+        path = export_model(model_path, backend, int8, imgsz, calibration_video)
+        return YOLO(path, task="detect")
+    except (ImportError, ModuleNotFoundError) as e:
+        print(f"{backend} backend unavailable ({e}), falling back to PyTorch")
+        return YOLO(model_path)
@@ -0,0 +1,249 @@
+"""
+Headless batch processing of recorded footage, as fast as the hardware
+allows (no pacing, no Socket.IO):
+
+    python -m detection_service.batch /recordings/2026-10-17 --out ./detections --workers 4
+    python -m detection_service.batch /recordings --out ./detections --format parquet --segment-minutes 10
+
+Every video file is split into segments of --segment-minutes, and the
+segments are spread over a pool of worker processes, each with its own
+detector and OCR. Detections are streamed to one JSONL (or Parquet) file per
+segment in --out. A segment's file only gets its final name once the whole
+segment is done, so after an interruption the same command picks up where
+it stopped and skips finished segments. Tracking starts fresh at every
+segment boundary.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import cv2
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".m4v", ".ts", ".webm")
+
+# Per-worker VideoProcessor, created by _init_worker
+_processor = None
+
+
+def find_videos(paths):
+    videos = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.update(os.path.abspath(os.path.join(root, name)) for name in files
+                              if name.lower().endswith(VIDEO_EXTENSIONS))
+        elif os.path.isfile(path):
+            videos.add(os.path.abspath(path))
+    return sorted(videos)
+
+
+def plan_segments(video, segment_minutes):
+    """(video, start_frame, end_frame, fps) work units covering the whole file."""
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        print(f"Skipping {video}: cannot open")
+        return []
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total <= 0 or segment_minutes <= 0:
+        # Unknown length (or no splitting): one unit that runs to the end
+        return [(video, 0, None, fps)]
+    length = max(1, int(segment_minutes * 60 * fps))
+    return [(video, start, min(start + length, total), fps) for start in range(0, total, length)]
+
+
+def output_path(out_dir, root, segment, fmt):
+    video, start, end, _ = segment
+    relative = os.path.relpath(video, root)
+    stem = os.path.splitext(relative)[0].replace(os.sep, "__")
+    return os.path.join(out_dir, f"{stem}.{start:09d}-{end if end is not None else 'end'}.{fmt}")
+
+
+def _init_worker(model_path, threads):
+    """Build this worker's processor; the detector and OCR load once per process."""
+    global _processor
+    # Split the cores between the workers instead of every worker using all of them
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+    cv2.setNumThreads(threads)
+    from detection_service.benchmark import NullEmitter
+    from detection_service.config import PipelineConfig
+    from detection_service.detection import VideoProcessor
+
+    config = PipelineConfig.from_env(ocr_mode="inline", realtime_pacing=False, motion_gating=False,
+                                     adaptive=False)
+    _processor = VideoProcessor(NullEmitter(), "batch", model_path, config)
+
+
+def detection_rows(video, frame_index, fps, detections, scale):
+    sx, sy = scale
+    rows = []
+    for detection in detections:
+        x1, y1, x2, y2 = detection["coordinates"]
+        rows.append({
+            "video": video,
+            "frame": frame_index,
+            "time_s": round(frame_index / fps, 3),
+            "label": detection["label"],
+            "confidence": round(detection["confidence"], 4),
+            # In source-video pixels
+            "x1": round(x1 * sx, 1), "y1": round(y1 * sy, 1),
+            "x2": round(x2 * sx, 1), "y2": round(y2 * sy, 1),
+            "track_id": detection.get("track_id"),
+            "plate": detection.get("plate") or detection.get("ocr_text") or None,
+            "plate_confidence": detection.get("plate_confidence"),
+            "color": detection.get("color_annotation"),
+            "color_name": detection.get("color_name"),
+        })
+    return rows
+
+
+class JSONLWriter:
+    def __init__(self, path):
+        self.file = open(path, "w")
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(row))
+            self.file.write("\n")
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Row groups of `chunk_rows` rows, so a long segment never sits in memory."""
+
+    def __init__(self, path, chunk_rows=10000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.schema = pa.schema([
+            ("video", pa.string()), ("frame", pa.int64()), ("time_s", pa.float64()),
+            ("label", pa.string()), ("confidence", pa.float64()),
+            ("x1", pa.float64()), ("y1", pa.float64()), ("x2", pa.float64()), ("y2", pa.float64()),
+            ("track_id", pa.int64()), ("plate", pa.string()), ("plate_confidence", pa.float64()),
+            ("color", pa.string()), ("color_name", pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.chunk_rows = chunk_rows
+        self.rows = []
+
+    def write(self, rows):
+        self.rows.extend(rows)
+        if len(self.rows) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        import pyarrow as pa
+
+        if self.rows:
+            self.writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def process_segment(segment, path, fmt):
+    """Run one segment and write its detections to `path`. Returns (frames, detections, seconds)."""
+    video, start, end, fps = segment
+    processor = _processor
+    processor.tracker.reset()
+    processor.frame_id = 0
+    width, height = processor.config.input_size
+    batch_size = processor.config.batch_size
+    cap = cv2.VideoCapture(video)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    scale = (cap.get(cv2.CAP_PROP_FRAME_WIDTH) / width, cap.get(cv2.CAP_PROP_FRAME_HEIGHT) / height)
+    partial = path + ".part"
+    writer = ParquetWriter(partial) if fmt == "parquet" else JSONLWriter(partial)
+    started = time.perf_counter()
+    index = start
+    detections_total = 0
+    try:
+        while end is None or index < end:
+            frames = []
+            while len(frames) < batch_size and (end is None or index + len(frames) < end):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frames.append(cv2.resize(frame, (width, height)))
+            if not frames:
+                break
+            for offset, (_, detections) in enumerate(processor.process_batch(frames)):
+                rows = detection_rows(video, index + offset, fps, detections, scale)
+                detections_total += len(rows)
+                writer.write(rows)
+            index += len(frames)
+    finally:
+        cap.release()
+        writer.close()
+    # Only a complete segment gets its final name; resuming skips it
+    os.replace(partial, path)
+    return index - start, detections_total, time.perf_counter() - started
+
+
+def _run(segment, path, fmt):
+    return segment, path, process_segment(segment, path, fmt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="Video files and/or directories of video files")
+    parser.add_argument("--out", required=True, help="Directory for the per-segment detection files")
+    parser.add_argument("--model", default="./sample/best.pt")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Worker processes (default: half the cores)")
+    parser.add_argument("--segment-minutes", type=float, default=10.0,
+                        help="Split files into segments of this length; 0 keeps files whole (default 10)")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), default="jsonl")
+    args = parser.parse_args()
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        raise SystemExit("No video files found")
+    os.makedirs(args.out, exist_ok=True)
+    # Output names mirror the inputs' paths below their common directory
+    root = os.path.commonpath([os.path.dirname(v) for v in videos])
+
+    todo = []
+    done = 0
+    for video in videos:
+        for segment in plan_segments(video, args.segment_minutes):
+            path = output_path(args.out, root, segment, args.format)
+            if os.path.exists(path):
+                done += 1
+            else:
+                todo.append((segment, path))
+    print(f"{len(videos)} files, {done + len(todo)} segments ({done} already done), {args.workers} workers")
+    if not todo:
+        return
+
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    started = time.perf_counter()
+    frames_total = 0
+    # spawn: the parent never loads the detector, and the workers start clean
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(args.model, threads)) as pool:
+        futures = [pool.submit(_run, segment, path, args.format) for segment, path in todo]
+        for completed, future in enumerate(as_completed(futures), 1):
+            try:
+                segment, path, (frames, detections, seconds) = future.result()
+            except Exception as e:
+                # Left without an output file, so the next run retries it
+                print(f"[{completed}/{len(todo)}] segment failed: {e}")
+                continue
+            frames_total += frames
+            elapsed = time.perf_counter() - started
+            print(f"[{completed}/{len(todo)}] {os.path.basename(path)}: {frames} frames, "
+                  f"{detections} detections, {frames / seconds if seconds > 0 else 0:.1f} FPS | "
+                  f"overall {frames_total / elapsed:.1f} FPS")
+
+
+if __name__ == "__main__":
+    main()
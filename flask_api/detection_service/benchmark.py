@@ -0,0 +1,243 @@
+"""
+Offline benchmark of the detection pipeline, without Socket.IO or pacing.
+Frames are decoded, run through VideoProcessor.process_frame, JPEG-encoded
+and turned into the emitted messages, one at a time:
+
+    python -m detection_service.benchmark --video ./sample/mamamo.mov --frames 300 --json bench.json
+    python -m detection_service.benchmark --synthetic 300 --json bench.json
+    python -m detection_service.benchmark --synthetic 300 --compare bench.json --threshold 0.10
+
+The report has p50/p95/p99 latency of every stage (the same stages as
+/metrics) and of the whole frame, frames per second, OCR calls per frame and
+peak RSS. With --compare, it is checked against a saved report and the
+command exits with status 1 if any of them regressed by more than
+--threshold. Synthetic frames (moving boxes with plate-like text on a noisy
+background, fixed seed) need no sample footage.
+"""
+import argparse
+import json
+import resource
+import sys
+import time
+import cv2
+import numpy as np
+from detection_service.config import PipelineConfig
+from detection_service.decoder import open_decoder
+from detection_service.detection import VideoProcessor
+from detection_service.metrics import STAGES, StreamMetrics
+
+PERCENTILES = (50, 95, 99)
+
+
+class NullEmitter:
+    """Stands in for SocketIO: messages are built but go nowhere."""
+
+    def emit(self, *args, **kwargs):
+        pass
+
+
+class SampleMetrics(StreamMetrics):
+    """StreamMetrics that also keeps every sample, for exact percentiles."""
+
+    def __init__(self):
+        super().__init__()
+        self.samples = {stage: [] for stage in STAGES}
+
+    def observe(self, stage, seconds):
+        super().observe(stage, seconds)
+        self.samples[stage].append(seconds)
+
+
+def synthetic_frames(count, size, seed=0):
+    """Deterministic frames: a few vehicle-like boxes with plate text drifting across a noisy road."""
+    width, height = size
+    rng = np.random.default_rng(seed)
+    background = rng.integers(60, 110, (height, width, 3), dtype=np.uint8)
+    vehicles = [{
+        "x": float(rng.integers(0, width)),
+        "y": float(rng.integers(height // 4, 3 * height // 4)),
+        "speed": float(rng.uniform(2.0, 8.0)),
+        "color": tuple(int(c) for c in rng.integers(0, 255, 3)),
+        "plate": "".join(rng.choice(list("ABCDEFGHJKLMNPRSTUVWXYZ"), 3)) + " " + str(rng.integers(1000, 9999)),
+    } for _ in range(3)]
+    for _ in range(count):
+        frame = background.copy()
+        noise = rng.integers(0, 12, (height, width, 1), dtype=np.uint8)
+        cv2.add(frame, np.repeat(noise, 3, axis=2), dst=frame)
+        for vehicle in vehicles:
+            vehicle["x"] = (vehicle["x"] + vehicle["speed"]) % (width + 160) - 160
+            x, y = int(vehicle["x"]), int(vehicle["y"])
+            cv2.rectangle(frame, (x, y), (x + 160, y + 90), vehicle["color"], -1)
+            cv2.rectangle(frame, (x + 35, y + 55), (x + 125, y + 80), (255, 255, 255), -1)
+            cv2.putText(frame, vehicle["plate"], (x + 38, y + 74), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+        yield frame, None
+
+
+def video_frames(path, count, size):
+    decoder = open_decoder(path, size, "opencv", live=False)
+    if not decoder.is_opened():
+        raise SystemExit(f"Cannot open {path}")
+    buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            if not decoder.read_into(buffer):
+                break
+            yield buffer, time.perf_counter() - start
+    finally:
+        decoder.release()
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    values = np.asarray(samples) * 1000.0
+    summary = {f"p{p}_ms": float(np.percentile(values, p)) for p in PERCENTILES}
+    summary.update({"mean_ms": float(values.mean()), "count": len(samples)})
+    return summary
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def run(processor, frames, warmup):
+    """
+    Push (frame, decode seconds) pairs through the pipeline; the first
+    `warmup` frames are not measured.
+    """
+    totals = []
+    measured = 0
+    started = None
+    for index, (frame, decode_seconds) in enumerate(frames):
+        if index == warmup:
+            # Model and OCR initialisation is not what is being measured
+            processor.metrics = SampleMetrics()
+            started = time.perf_counter()
+        if decode_seconds is not None:
+            processor.metrics.observe("decode", decode_seconds)
+        start = time.perf_counter()
+        annotated, detections = processor.process_frame(frame)
+        result = processor.encode_frame(processor.frame_id, annotated, detections)
+        processor.emit_result(result, 0.0)
+        if index >= warmup:
+            totals.append(time.perf_counter() - start)
+            measured += 1
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    return totals, measured, elapsed
+
+
+def build_report(processor, totals, measured, elapsed, source):
+    metrics = processor.metrics
+    _, counters = metrics.snapshot()
+    return {
+        "source": source,
+        "frames": measured,
+        "fps": measured / elapsed if elapsed > 0 else 0.0,
+        "frame": percentiles(totals),
+        "stages": {stage: percentiles(samples) for stage, samples in metrics.samples.items() if samples},
+        "ocr_calls_per_frame": counters["ocr_calls"] / measured if measured else 0.0,
+        "emitted_bytes_per_frame": counters["emitted_bytes"] / measured if measured else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "config": {
+            "input_size": list(processor.config.input_size),
+            "ocr_backend": processor.config.ocr_backend,
+            "model_backend": processor.config.model_backend,
+            "tracking": processor.config.tracking,
+            "motion_gating": processor.config.motion_gating,
+        },
+    }
+
+
+def compare(report, baseline, threshold, min_delta_ms=0.5):
+    """
+    Regressions of `report` against `baseline`: anything more than
+    `threshold` (a fraction) worse. Latencies must also have grown by at
+    least `min_delta_ms`, so jitter in sub-millisecond stages is not flagged.
+    """
+    regressions = []
+
+    def check(name, current, previous, higher_is_better=False, delta=0.0):
+        if current is None or previous is None or previous <= 0:
+            return
+        change = (current - previous) / previous
+        worse = -change if higher_is_better else change
+        if worse > threshold and abs(current - previous) >= delta:
+            regressions.append({"metric": name, "baseline": previous, "current": current, "change": change})
+
+    check("fps", report["fps"], baseline.get("fps"), higher_is_better=True)
+    check("peak_rss_mb", report["peak_rss_mb"], baseline.get("peak_rss_mb"))
+    check("ocr_calls_per_frame", report["ocr_calls_per_frame"], baseline.get("ocr_calls_per_frame"))
+    for p in PERCENTILES:
+        key = f"p{p}_ms"
+        check(f"frame.{key}", (report["frame"] or {}).get(key), (baseline.get("frame") or {}).get(key),
+              delta=min_delta_ms)
+        for stage, summary in report["stages"].items():
+            previous = (baseline.get("stages", {}).get(stage) or {}).get(key)
+            check(f"{stage}.{key}", summary.get(key), previous, delta=min_delta_ms)
+    return regressions
+
+
+def print_report(report):
+    print(f"Source: {report['source']} | frames: {report['frames']} | {report['fps']:.2f} FPS | "
+          f"OCR calls/frame: {report['ocr_calls_per_frame']:.2f} | peak RSS: {report['peak_rss_mb']:.0f} MB")
+    rows = [("frame", report["frame"])] + list(report["stages"].items())
+    for name, summary in rows:
+        if summary:
+            print(f"  {name:>9}: p50 {summary['p50_ms']:7.2f} ms | p95 {summary['p95_ms']:7.2f} ms | "
+                  f"p99 {summary['p99_ms']:7.2f} ms | n={summary['count']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="Clip to replay")
+    source.add_argument("--synthetic", type=int, metavar="N", help="Use N generated frames instead of a clip")
+    parser.add_argument("--model", default="./sample/best.pt")
+    parser.add_argument("--frames", type=int, default=300, help="Frames to replay from --video")
+    parser.add_argument("--warmup", type=int, default=10, help="Leading frames left out of the measurements")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --synthetic")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--compare", help="Baseline report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown (default 0.10)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="Latency changes smaller than this are never regressions (default 0.5)")
+    args = parser.parse_args()
+
+    # Benchmark the synchronous path: OCR inline, so its cost lands on the frame
+    config = PipelineConfig.from_env(ocr_mode="inline", realtime_pacing=False)
+    processor = VideoProcessor(NullEmitter(), args.video or "synthetic", args.model, config)
+    if args.video:
+        frames = video_frames(args.video, args.frames + args.warmup, config.input_size)
+        source_name = args.video
+    else:
+        frames = synthetic_frames(args.synthetic + args.warmup, config.input_size, args.seed)
+        source_name = f"synthetic:{args.synthetic}:seed={args.seed}"
+    totals, measured, elapsed = run(processor, frames, args.warmup)
+    if not measured:
+        raise SystemExit("No frames were measured; lower --warmup or use a longer source")
+
+    report = build_report(processor, totals, measured, elapsed, source_name)
+    print_report(report)
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(report, baseline, args.threshold, args.min_delta_ms)
+        if report["regressions"]:
+            status = 1
+            print(f"Regressions against {args.compare} (threshold {args.threshold:.0%}):")
+            for item in report["regressions"]:
+                print(f"  {item['metric']}: {item['baseline']:.2f} -> {item['current']:.2f} ({item['change']:+.1%})")
+        else:
+            print(f"No regressions against {args.compare}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
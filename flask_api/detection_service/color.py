@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+
+COLOR_NAMES = ("black", "white", "gray", "red", "orange", "yellow", "green", "cyan", "blue", "purple")
+
+# Upper hue bound (OpenCV 0-179 scale) of each chromatic bin, in COLOR_NAMES order
+_HUE_BINS = ((10, "red"), (22, "orange"), (35, "yellow"), (85, "green"),
+             (100, "cyan"), (130, "blue"), (170, "purple"), (180, "red"))
+
+
+def _clip_boxes(boxes, width, height):
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4).astype(int)
+    boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width)
+    boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height)
+    return boxes
+
+
+def _box_sums(integral, boxes):
+    """Sum of every box from an (H+1, W+1, C) integral image, as an (N, C) array."""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    return integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+
+
+def _name_labels(hsv):
+    """Classify every HSV pixel into one of COLOR_NAMES (as indices)."""
+    h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    labels = np.full(h.shape, COLOR_NAMES.index("red"), dtype=np.uint8)
+    lower = 0
+    for upper, name in _HUE_BINS:
+        labels[(h >= lower) & (h < upper)] = COLOR_NAMES.index(name)
+        lower = upper
+    achromatic = s < 40
+    labels[achromatic] = COLOR_NAMES.index("gray")
+    labels[achromatic & (v > 200)] = COLOR_NAMES.index("white")
+    labels[v < 50] = COLOR_NAMES.index("black")
+    return labels
+
+
+def box_colors(frame, boxes, with_names=False, name_scale=4):
+    """
+    Colour annotation for every box of a frame from a single HSV conversion
+    of the region covering all boxes. Per-box means come from an integral
+    image, so each box costs four lookups regardless of its size or the
+    number of boxes. With `with_names`, also returns the dominant coarse
+    colour name of each box (None otherwise).
+    Returns (hex_colors, names).
+    """
+    height, width = frame.shape[:2]
+    boxes = _clip_boxes(boxes, width, height)
+    if len(boxes) == 0:
+        return [], ([] if with_names else None)
+
+    # Only convert the part of the frame the boxes actually cover
+    x0, y0 = boxes[:, 0].min(), boxes[:, 1].min()
+    x1, y1 = boxes[:, 2].max(), boxes[:, 3].max()
+    if x1 <= x0 or y1 <= y0:
+        # Every box is degenerate: nothing to measure
+        return ["#000000"] * len(boxes), (["black"] * len(boxes) if with_names else None)
+    hsv = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2HSV)
+    local = boxes - np.array([x0, y0, x0, y0])
+
+    area = np.maximum((local[:, 2] - local[:, 0]) * (local[:, 3] - local[:, 1]), 1)
+    mean_hsv = _box_sums(cv2.integral(hsv), local) / area[:, None]
+    mean_bgr = cv2.cvtColor(mean_hsv.astype(np.uint8)[:, None, :], cv2.COLOR_HSV2BGR)[:, 0, :]
+    hex_colors = ['#{:02x}{:02x}{:02x}'.format(int(r), int(g), int(b)) for b, g, r in mean_bgr]
+    if not with_names:
+        return hex_colors, None
+    return hex_colors, _dominant_names(hsv, local, name_scale)
+
+
+def _dominant_names(hsv, boxes, scale):
+    """
+    Coarse colour histogram per box: label a downscaled copy of the region,
+    then one integral image per colour name gives every box's counts in O(1).
+    """
+    labels = _name_labels(hsv[::scale, ::scale])
+    integral = np.stack([cv2.integral((labels == k).view(np.uint8)) for k in range(len(COLOR_NAMES))], axis=-1)
+    small_h, small_w = labels.shape
+    # Round outwards so that tiny boxes still cover at least one cell
+    small = np.stack([boxes[:, 0] // scale, boxes[:, 1] // scale,
+                      -(-boxes[:, 2] // scale), -(-boxes[:, 3] // scale)], axis=1)
+    counts = _box_sums(integral, _clip_boxes(small, small_w, small_h))
+    return [COLOR_NAMES[i] for i in counts.argmax(axis=1)]
@@ -0,0 +1,231 @@
+import os
+from dataclasses import dataclass
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class PipelineConfig:
+    """Tunable settings for a VideoProcessor pipeline.
+
+    Every field can be overridden from the environment (see `from_env`), so a
+    deployment can be tuned without touching code.
+    """
+    # Frame size fed to the detector
+    input_size: tuple = (640, 480)
+    conf: float = 0.5
+    iou: float = 0.5
+    jpeg_quality: int = 60
+
+    # Micro-batching: run one inference call for up to `batch_size` frames,
+    # waiting at most `batch_timeout_ms` for the batch to fill up.
+    batch_size: int = 1
+    batch_timeout_ms: float = 0.0
+
+    # Drop policy per stage ("lossless", "drop_oldest" or "latest"). Empty
+    # means auto: keep-latest for live sources, lossless for file replay.
+    frame_policy: str = ""
+    result_policy: str = ""
+    queue_size: int = 10
+    # Pace file sources at their native FPS; live sources are never paced
+    realtime_pacing: bool = True
+
+    # Track vehicles across frames so OCR runs once per vehicle rather than
+    # once per box per frame
+    tracking: bool = True
+    track_iou: float = 0.3
+    track_max_missed: int = 15
+    ocr_retry_frames: int = 15
+
+    # "inline" runs PaddleOCR on the processor thread; "async" hands crops to
+    # a pool of OCR worker processes and emits plate text later as `ocr_result`
+    ocr_mode: str = "inline"
+    ocr_workers: int = 2
+    ocr_queue_size: int = 32
+    ocr_max_age_ms: float = 2000.0
+
+    # OCR backend: "full" runs PaddleOCR's detect/classify/recognize stack per
+    # crop; "rec" batches the YOLO-localised crops through recognition only.
+    # Angle classification is optional on the "rec" path.
+    ocr_backend: str = "full"
+    ocr_angle_cls: bool = False
+    ocr_batch_size: int = 8
+
+    # Perceptual-hash OCR cache: crops whose dHash is within
+    # `ocr_cache_distance` bits of a cached crop reuse its text. 0 disables it.
+    ocr_cache_size: int = 512
+    ocr_cache_distance: int = 10
+    ocr_cache_ttl: float = 30.0
+
+    # "base64": JPEG as a base64 string inside the video_frame JSON (legacy).
+    # "binary": JPEG bytes as a Socket.IO binary attachment (video_frame_bin)
+    # plus a compact `detections` event.
+    transport: str = "base64"
+
+    # "annotated": the server draws the boxes into every streamed frame.
+    # "overlay": raw frames go out at `raw_fps` / `raw_jpeg_quality`, while
+    # detections are sent for every processed frame and drawn by the client.
+    stream_mode: str = "annotated"
+    raw_fps: float = 10.0
+    raw_jpeg_quality: int = 50
+
+    # Add a coarse dominant "color_name" (red, white, ...) to every detection
+    color_names: bool = False
+
+    # Motion gating: skip the detector on frames where less than
+    # `motion_min_area` of a 1/`motion_scale` grayscale thumbnail changed by
+    # more than `motion_threshold` grey levels since the last inferred frame.
+    # Skipped frames reuse the last detections (or carry none without
+    # `motion_reuse`); one frame in `motion_refresh_frames` always runs.
+    motion_gating: bool = False
+    motion_threshold: int = 25
+    motion_min_area: float = 0.005
+    motion_scale: int = 4
+    motion_refresh_frames: int = 30
+    motion_reuse: bool = True
+
+    # Adaptive load shedding: per stream, hold the p95 capture-to-emit
+    # latency under `target_latency_ms` and/or the frame rate above
+    # `target_fps` (0 disables either) by stepping OCR sampling, JPEG quality,
+    # inference stride and detector resolution, re-evaluated every
+    # `control_interval` seconds
+    adaptive: bool = False
+    target_latency_ms: float = 300.0
+    target_fps: float = 0.0
+    control_interval: float = 2.0
+
+    # Frame decoding: "opencv" (cv2.VideoCapture) or "ffmpeg" (a subprocess
+    # that scales to `input_size` while decoding). Frames are decoded into a
+    # pool of `frame_buffers` preallocated arrays; 0 sizes it from the queues.
+    decoder: str = "opencv"
+    frame_buffers: int = 0
+
+    # "threads" runs a stream's stages as threads of this process; "processes"
+    # runs decode, detect (with its OCR pool) and encode as separate processes
+    # that share frames through shared memory
+    execution: str = "threads"
+
+    # Frames waiting per viewer and stream while the viewer has not yet
+    # acknowledged the last one sent; newer frames replace the oldest.
+    # A frame left unacknowledged for `viewer_ack_timeout` seconds counts as
+    # received, so clients that never ack still get that many frames per second
+    viewer_outbox_size: int = 1
+    viewer_ack_timeout: float = 1.0
+
+    # Detector runtime: "torch" (PyTorch eager), "onnx" (ONNX Runtime) or
+    # "openvino", all loading exports of the same best.pt. `model_int8`
+    # quantizes the export (dynamic INT8 for ONNX, static INT8 for OpenVINO,
+    # calibrated on frames of `calibration_video` when given).
+    model_backend: str = "torch"
+    model_int8: bool = False
+    calibration_video: str = ""
+
+    # Model start-up: `warmup` runs dummy frames and plate crops through
+    # every new detector and OCR instance before it serves a stream, and up
+    # to `model_pool_size` warmed instances of each are kept ready for the
+    # next stream. Until its models are ready, a stream sends raw `preview`
+    # frames (no detections). The models count as ready once the OCR workers
+    # have warmed up too, or after `ocr_ready_timeout` seconds without them.
+    warmup: bool = True
+    model_pool_size: int = 1
+    ocr_ready_timeout: float = 120.0
+    preview: bool = True
+
+    # Persist detection events and plate reads to the database from a
+    # background writer: flushed every `event_batch_size` rows or
+    # `event_flush_interval` seconds, spilled to `event_spill_dir` when more
+    # than `event_max_pending` rows are waiting or the database is down
+    persist_events: bool = False
+    event_batch_size: int = 500
+    event_flush_interval: float = 1.0
+    event_max_pending: int = 20000
+    event_spill_dir: str = "./spill"
+
+    # Analytics rollups (hour/day/month counts per camera and class) are
+    # bucketed in local time, `analytics_utc_offset` hours from UTC
+    analytics_utc_offset: float = 0.0
+
+    # Multi-camera scheduling: max frames per shared inference call. 0 means
+    # one frame from every stream that has one ready, taken round-robin.
+    scheduler_batch_size: int = 0
+
+    # How often (in batches) the processor prints its batching report
+    report_interval: int = 30
+
+    @classmethod
+    def from_env(cls, **overrides):
+        config = cls(
+            batch_size=max(1, _env_int("KOTSEK_BATCH_SIZE", cls.batch_size)),
+            batch_timeout_ms=max(0.0, _env_float("KOTSEK_BATCH_TIMEOUT_MS", cls.batch_timeout_ms)),
+            jpeg_quality=_env_int("KOTSEK_JPEG_QUALITY", cls.jpeg_quality),
+            frame_policy=os.getenv("KOTSEK_FRAME_POLICY", cls.frame_policy),
+            result_policy=os.getenv("KOTSEK_RESULT_POLICY", cls.result_policy),
+            queue_size=max(1, _env_int("KOTSEK_QUEUE_SIZE", cls.queue_size)),
+            realtime_pacing=_env_bool("KOTSEK_REALTIME_PACING", cls.realtime_pacing),
+            tracking=_env_bool("KOTSEK_TRACKING", cls.tracking),
+            ocr_mode=os.getenv("KOTSEK_OCR_MODE", cls.ocr_mode),
+            ocr_workers=max(1, _env_int("KOTSEK_OCR_WORKERS", cls.ocr_workers)),
+            ocr_queue_size=max(1, _env_int("KOTSEK_OCR_QUEUE_SIZE", cls.ocr_queue_size)),
+            ocr_max_age_ms=_env_float("KOTSEK_OCR_MAX_AGE_MS", cls.ocr_max_age_ms),
+            ocr_backend=os.getenv("KOTSEK_OCR_BACKEND", cls.ocr_backend),
+            ocr_angle_cls=_env_bool("KOTSEK_OCR_ANGLE_CLS", cls.ocr_angle_cls),
+            ocr_batch_size=max(1, _env_int("KOTSEK_OCR_BATCH_SIZE", cls.ocr_batch_size)),
+            ocr_cache_size=max(0, _env_int("KOTSEK_OCR_CACHE_SIZE", cls.ocr_cache_size)),
+            ocr_cache_distance=_env_int("KOTSEK_OCR_CACHE_DISTANCE", cls.ocr_cache_distance),
+            ocr_cache_ttl=_env_float("KOTSEK_OCR_CACHE_TTL", cls.ocr_cache_ttl),
+            color_names=_env_bool("KOTSEK_COLOR_NAMES", cls.color_names),
+            transport=os.getenv("KOTSEK_TRANSPORT", cls.transport),
+            stream_mode=os.getenv("KOTSEK_STREAM_MODE", cls.stream_mode),
+            raw_fps=_env_float("KOTSEK_RAW_FPS", cls.raw_fps),
+            raw_jpeg_quality=_env_int("KOTSEK_RAW_JPEG_QUALITY", cls.raw_jpeg_quality),
+            motion_gating=_env_bool("KOTSEK_MOTION_GATING", cls.motion_gating),
+            motion_threshold=_env_int("KOTSEK_MOTION_THRESHOLD", cls.motion_threshold),
+            motion_min_area=_env_float("KOTSEK_MOTION_MIN_AREA", cls.motion_min_area),
+            motion_scale=max(1, _env_int("KOTSEK_MOTION_SCALE", cls.motion_scale)),
+            motion_refresh_frames=max(0, _env_int("KOTSEK_MOTION_REFRESH_FRAMES", cls.motion_refresh_frames)),
+            motion_reuse=_env_bool("KOTSEK_MOTION_REUSE", cls.motion_reuse),
+            adaptive=_env_bool("KOTSEK_ADAPTIVE", cls.adaptive),
+            target_latency_ms=max(0.0, _env_float("KOTSEK_TARGET_LATENCY_MS", cls.target_latency_ms)),
+            target_fps=max(0.0, _env_float("KOTSEK_TARGET_FPS", cls.target_fps)),
+            control_interval=max(0.1, _env_float("KOTSEK_CONTROL_INTERVAL", cls.control_interval)),
+            decoder=os.getenv("KOTSEK_DECODER", cls.decoder),
+            frame_buffers=max(0, _env_int("KOTSEK_FRAME_BUFFERS", cls.frame_buffers)),
+            execution=os.getenv("KOTSEK_EXECUTION", cls.execution),
+            model_backend=os.getenv("KOTSEK_MODEL_BACKEND", cls.model_backend),
+            model_int8=_env_bool("KOTSEK_MODEL_INT8", cls.model_int8),
+            calibration_video=os.getenv("KOTSEK_CALIBRATION_VIDEO", cls.calibration_video),
+            warmup=_env_bool("KOTSEK_WARMUP", cls.warmup),
+            model_pool_size=max(0, _env_int("KOTSEK_MODEL_POOL_SIZE", cls.model_pool_size)),
+            ocr_ready_timeout=max(0.0, _env_float("KOTSEK_OCR_READY_TIMEOUT", cls.ocr_ready_timeout)),
+            preview=_env_bool("KOTSEK_PREVIEW", cls.preview),
+            persist_events=_env_bool("KOTSEK_PERSIST_EVENTS", cls.persist_events),
+            event_batch_size=max(1, _env_int("KOTSEK_EVENT_BATCH_SIZE", cls.event_batch_size)),
+            event_flush_interval=max(0.05, _env_float("KOTSEK_EVENT_FLUSH_INTERVAL", cls.event_flush_interval)),
+            event_max_pending=max(1, _env_int("KOTSEK_EVENT_MAX_PENDING", cls.event_max_pending)),
+            event_spill_dir=os.getenv("KOTSEK_EVENT_SPILL_DIR", cls.event_spill_dir),
+            analytics_utc_offset=_env_float("KOTSEK_ANALYTICS_UTC_OFFSET", cls.analytics_utc_offset),
+            viewer_outbox_size=max(1, _env_int("KOTSEK_VIEWER_OUTBOX_SIZE", cls.viewer_outbox_size)),
+            viewer_ack_timeout=max(0.05, _env_float("KOTSEK_VIEWER_ACK_TIMEOUT", cls.viewer_ack_timeout)),
+            scheduler_batch_size=max(0, _env_int("KOTSEK_SCHEDULER_BATCH_SIZE", cls.scheduler_batch_size)),
+        )
+        for key, value in overrides.items():
+            setattr(config, key, value)
+        return config
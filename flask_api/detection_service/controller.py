@@ -0,0 +1,142 @@
+import time
+from threading import Lock
+
+# Degradation ladder, from full quality (level 0) to the cheapest setting.
+# Each step sheds the work viewers notice least first: OCR sampling, then
+# JPEG quality, then inference stride, then detector input resolution.
+LEVELS = (
+    {"ocr_stride": 1, "jpeg_quality": None, "inference_stride": 1, "imgsz": None},
+    {"ocr_stride": 2, "jpeg_quality": None, "inference_stride": 1, "imgsz": None},
+    {"ocr_stride": 2, "jpeg_quality": 45, "inference_stride": 1, "imgsz": None},
+    {"ocr_stride": 2, "jpeg_quality": 45, "inference_stride": 2, "imgsz": None},
+    {"ocr_stride": 3, "jpeg_quality": 40, "inference_stride": 2, "imgsz": 512},
+    {"ocr_stride": 3, "jpeg_quality": 35, "inference_stride": 3, "imgsz": 512},
+    {"ocr_stride": 4, "jpeg_quality": 35, "inference_stride": 3, "imgsz": 416},
+    {"ocr_stride": 4, "jpeg_quality": 30, "inference_stride": 4, "imgsz": 320},
+)
+
+# Stage boundaries recorded on every result, in pipeline order
+STAGES = (("detect", "captured_at", "detected_at"),
+          ("encode", "detected_at", "encoded_at"),
+          ("emit", "encoded_at", "emitted_at"))
+
+
+class LoadController:
+    """
+    Feedback controller that holds one stream to a latency and/or FPS
+    budget. It observes every emitted frame and, once per `interval`
+    seconds, compares the interval's p95 capture-to-emit latency and frame
+    rate with the targets. Over budget, it steps one level down the LEVELS
+    ladder. Comfortably under budget (latency below `recover_margin` of the
+    target) for `recover_intervals` intervals in a row, it steps back up.
+    The interval right after a change is only measured, not acted on, so
+    frames queued before the change cannot trigger a second step.
+    A target of 0 disables that check.
+    """
+
+    def __init__(self, target_latency_ms=300.0, target_fps=0.0, interval=2.0,
+                 recover_margin=0.6, recover_intervals=3):
+        self.target_latency_ms = target_latency_ms
+        self.target_fps = target_fps
+        self.interval = interval
+        self.recover_margin = recover_margin
+        self.recover_intervals = recover_intervals
+        self.lock = Lock()
+        self.pinned = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.level = 0 if self.pinned is None else self.pinned
+            self.samples = []
+            self.stage_totals = {name: 0.0 for name, _, _ in STAGES}
+            self.window_start = time.time()
+            self.healthy_intervals = 0
+            self.settling = False
+            self.last_measurement = {}
+            self.history = []
+
+    @property
+    def knobs(self):
+        return LEVELS[self.level]
+
+    def observe(self, result):
+        """Record an emitted result (with its stage timestamps)."""
+        with self.lock:
+            self.samples.append(result["emitted_at"] - result["captured_at"])
+            for name, start, end in STAGES:
+                if start in result and end in result:
+                    self.stage_totals[name] += result[end] - result[start]
+            if result["emitted_at"] - self.window_start >= self.interval:
+                self._step(result["emitted_at"])
+
+    def _step(self, now):
+        elapsed = now - self.window_start
+        latencies = sorted(self.samples)
+        count = len(latencies)
+        p95 = latencies[min(count - 1, int(0.95 * count))] * 1000.0 if count else 0.0
+        fps = count / elapsed if elapsed > 0 else 0.0
+        self.last_measurement = {
+            "frames": count,
+            "fps": fps,
+            "p95_latency_ms": p95,
+            "stage_ms": {name: 1000.0 * total / max(count, 1) for name, total in self.stage_totals.items()},
+        }
+        over = ((self.target_latency_ms and p95 > self.target_latency_ms) or
+                (self.target_fps and fps < 0.9 * self.target_fps))
+        comfortable = ((not self.target_latency_ms or p95 < self.recover_margin * self.target_latency_ms) and
+                       (not self.target_fps or fps >= self.target_fps))
+        previous = self.level
+        if self.pinned is not None:
+            self.level = self.pinned
+        elif self.settling:
+            self.settling = False
+        elif over:
+            self.healthy_intervals = 0
+            self.level = min(self.level + 1, len(LEVELS) - 1)
+        elif comfortable:
+            self.healthy_intervals += 1
+            if self.healthy_intervals >= self.recover_intervals:
+                self.healthy_intervals = 0
+                self.level = max(self.level - 1, 0)
+        else:
+            self.healthy_intervals = 0
+        if self.level != previous:
+            self.settling = True
+            self.history.append({"at": now, "from": previous, "to": self.level,
+                                 "p95_latency_ms": round(p95, 1), "fps": round(fps, 2)})
+            del self.history[:-20]
+        self.samples = []
+        self.stage_totals = {name: 0.0 for name, _, _ in STAGES}
+        self.window_start = now
+
+    def configure(self, target_latency_ms=None, target_fps=None, level=None, pin=None):
+        """
+        Change the targets at runtime. `pin=True` holds the current (or the
+        given) level until `pin=False`; `level` alone is a one-off jump.
+        """
+        with self.lock:
+            if target_latency_ms is not None:
+                self.target_latency_ms = max(0.0, float(target_latency_ms))
+            if target_fps is not None:
+                self.target_fps = max(0.0, float(target_fps))
+            if level is not None:
+                self.level = min(max(int(level), 0), len(LEVELS) - 1)
+            if pin is True:
+                self.pinned = self.level
+            elif pin is False:
+                self.pinned = None
+            self.healthy_intervals = 0
+
+    def state(self):
+        with self.lock:
+            return {
+                "level": self.level,
+                "max_level": len(LEVELS) - 1,
+                "pinned": self.pinned is not None,
+                "knobs": dict(self.knobs),
+                "target_latency_ms": self.target_latency_ms,
+                "target_fps": self.target_fps,
+                "measured": dict(self.last_measurement),
+                "history": list(self.history),
+            }
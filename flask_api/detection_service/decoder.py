@@ -0,0 +1,200 @@
+import shutil
+import subprocess
+import time
+from collections import deque
+from threading import Condition
+import cv2
+import numpy as np
+
+OPENCV = "opencv"
+FFMPEG = "ffmpeg"
+
+DECODERS = (OPENCV, FFMPEG)
+
+
+class BufferPool:
+    """
+    Fixed set of preallocated frame buffers. The producer decodes into a
+    buffer it acquires, and the buffer goes back to the pool once the frame
+    has been emitted (or dropped), so steady-state decoding allocates nothing.
+    `acquire` blocks while every buffer is in flight, which throttles the
+    decoder to the speed of the pipeline.
+    """
+
+    def __init__(self, shape, count, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.buffers = [np.empty(shape, dtype=dtype) for _ in range(max(1, count))]
+        self.free = deque(self.buffers)
+        self.in_use = set()
+        self.cond = Condition()
+        self.closed = False
+
+    def acquire(self, timeout=None):
+        """A free buffer, or None on timeout or once the pool is closed."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.free or self.closed, timeout) or self.closed:
+                return None
+            buffer = self.free.popleft()
+            self.in_use.add(id(buffer))
+            return buffer
+
+    def release(self, buffer):
+        if buffer is None:
+            return
+        with self.cond:
+            # Ignore foreign arrays and double releases
+            if id(buffer) not in self.in_use:
+                return
+            self.in_use.discard(id(buffer))
+            self.free.append(buffer)
+            self.cond.notify()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            return {"size": len(self.buffers), "free": len(self.free)}
+
+
+class Pacer:
+    """Replays a recorded source at its native frame rate."""
+
+    def __init__(self, fps, enabled=True):
+        self.frame_delay = 1.0 / fps if fps > 0 else 0.033  # fallback delay if FPS is unavailable
+        self.enabled = enabled
+        self.next_frame_at = time.time()
+
+    def wait(self):
+        if not self.enabled:
+            return
+        # Sleep until the frame's due time, so decode time is not paid twice
+        self.next_frame_at += self.frame_delay
+        delay = self.next_frame_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            self.next_frame_at = time.time()
+
+
+class OpenCVDecoder:
+    """
+    cv2.VideoCapture decoding into one reused scratch frame, scaled straight
+    into the caller's buffer.
+    """
+
+    def __init__(self, source, size):
+        self.size = size
+        self.cap = cv2.VideoCapture(source)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 2)
+        self.scratch = None
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    @property
+    def fps(self):
+        return self.cap.get(cv2.CAP_PROP_FPS)
+
+    def read_into(self, buffer):
+        ret, frame = self.cap.read(self.scratch)
+        if not ret:
+            return False
+        self.scratch = frame
+        if frame.shape == buffer.shape:
+            np.copyto(buffer, frame)
+        else:
+            cv2.resize(frame, self.size, dst=buffer)
+        return True
+
+    def release(self):
+        self.cap.release()
+
+
+class FFmpegDecoder:
+    """
+    Decodes through an ffmpeg subprocess that also scales to the detector
+    input size, so full-resolution frames never reach Python: each frame
+    arrives as raw BGR bytes read directly into the caller's buffer.
+    """
+
+    def __init__(self, source, size, live=False):
+        self.size = size
+        self.frame_bytes = size[0] * size[1] * 3
+        self._fps = _probe_fps(source)
+        command = ["ffmpeg", "-loglevel", "error", "-nostdin"]
+        if live:
+            command += ["-fflags", "nobuffer", "-flags", "low_delay"]
+            if str(source).startswith("rtsp://"):
+                command += ["-rtsp_transport", "tcp"]
+        command += ["-i", str(source), "-an",
+                    "-vf", f"scale={size[0]}:{size[1]}:flags=bilinear",
+                    "-pix_fmt", "bgr24", "-f", "rawvideo", "-"]
+        try:
+            self.process = subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=self.frame_bytes)
+        except OSError as e:
+            print(f"Cannot start ffmpeg: {e}")
+            self.process = None
+
+    def is_opened(self):
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def fps(self):
+        return self._fps
+
+    def read_into(self, buffer):
+        if self.process is None:
+            return False
+        view = memoryview(buffer.reshape(-1)).cast("B")
+        filled = 0
+        while filled < self.frame_bytes:
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        return True
+
+    def release(self):
+        if self.process is None:
+            return
+        self.process.stdout.close()
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=2.0)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.process = None
+
+
+def _probe_fps(source):
+    if shutil.which("ffprobe") is None:
+        return 0.0
+    try:
+        output = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=avg_frame_rate",
+             "-of", "csv=p=0", str(source)],
+            capture_output=True, text=True, timeout=10).stdout.strip()
+        numerator, _, denominator = output.partition("/")
+        return float(numerator) / float(denominator or 1)
+    except (subprocess.SubprocessError, ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def open_decoder(source, size, backend=OPENCV, live=False):
+    """
+    Decoder for `source` producing frames of `size` (w, h). ffmpeg needs the
+    binary on PATH and a file or URL source; device indexes stay on OpenCV.
+    """
+    if backend not in DECODERS:
+        raise ValueError(f"Unknown decoder '{backend}', expected one of {DECODERS}")
+    if backend == FFMPEG:
+        if shutil.which("ffmpeg") is None:
+            print("ffmpeg not found, falling back to the OpenCV decoder")
+        elif isinstance(source, int) or str(source).isdigit():
+            print("ffmpeg cannot open camera indexes, using the OpenCV decoder")
+        else:
+            return FFmpegDecoder(source, size, live)
+    return OpenCVDecoder(source, size)
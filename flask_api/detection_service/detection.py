@@ -1,169 +1,714 @@
 import cv2
-import base64
 import time
 import numpy as np
-from paddleocr import PaddleOCR
 from flask_socketio import SocketIO, emit
-from ultralytics import YOLO
 from datetime import datetime
 from threading import Thread
-from queue import Queue
+from queue import Empty
+from detection_service.config import PipelineConfig
+from detection_service.model_pool import detector_pool, paddle_pool
+from detection_service.frame_queue import FrameQueue, LOSSLESS, LATEST
+from detection_service.ocr import crop_roi, read_rois
+from detection_service.tracker import Tracker
+from detection_service.ocr_pool import OCRWorkerPool
+from detection_service.ocr_cache import PlateCache
+from detection_service.color import box_colors
+from detection_service.stats import BatchStats, StreamStats
+from detection_service.decoder import BufferPool, Pacer, open_decoder
+from detection_service.encoding import FrameEncoder, compact_detection, frame_messages
+from detection_service.motion import MotionGate
+from detection_service.controller import LoadController
+from detection_service.metrics import StreamMetrics, frame_bytes
+
+def is_live_source(source):
+    """Cameras and network streams are live; anything else is a recorded file."""
+    if isinstance(source, int):
+        return True
+    source = str(source)
+    return source.isdigit() or source.startswith(("rtsp://", "rtmp://", "http://", "https://", "/dev/video"))
+
+
+def expand_results(results, run):
+    """Spread the results of the frames that were inferred back over the whole batch (None when skipped)."""
+    results = iter(results)
+    return [next(results) if inferred else None for inferred in run]
+
 
 class VideoProcessor:
-    def __init__(self, socketio, video_path, model_path="./sample/best.pt"):
+    """
+    Capture -> detect -> annotate/OCR -> encode -> emit pipeline for one video
+    source. Standalone, it runs its own detector; with a `scheduler` (see
+    StreamManager) the shared model is run by the scheduler, which hands the
+    results back through `inference_queue`. With a ViewerHub, frames are
+    fanned out to the stream's subscribers instead of broadcast.
+    """
+
+    def __init__(self, socketio, video_path, model_path="./sample/best.pt", config=None, ocr_pool=None,
+                 model=None, stream_id=None, scheduler=None, hub=None, events=None):
         self.socketio = socketio
         self.video_path = video_path
-        self.model = YOLO(model_path)
-        self.frame_queue = Queue(maxsize=10)
-        self.result_queue = Queue(maxsize=10)
+        self.stream_id = stream_id
+        self.scheduler = scheduler
+        self.hub = hub
+        # EventWriter that persists detections and plate reads, if enabled
+        self.events = events
+        self.config = config or PipelineConfig.from_env()
+        # Pooled instances this processor took and hands back in close()
+        self.pooled = []
+        # Managed streams get the shared model (and OCR pool) from their
+        # scheduler once it has loaded them; standalone ones take a warmed
+        # detector from the process-wide pool
+        if model is None and scheduler is None:
+            model = self.take(detector_pool(model_path, self.config))
+        self.model = model
+        self.live = is_live_source(video_path)
+        self.frame_queue = None
+        self.result_queue = None
+        self.inference_queue = None
+        self.create_queues()
         self.running = False
-        self.video_capture = None
+        # Generation of the current run; threads of an earlier run that
+        # outlived join() must neither keep working nor stop this one
+        self.run = 0
+        self.decoder = None
+        self.frame_pool = None
         self.producer_thread = None
         self.processor_thread = None
         self.emit_thread = None
-        # Simplified PaddleOCR initialization for ANPR
-        self.ocr = PaddleOCR(use_angle_cls=True, lang='en', use_gpu=False)
+        self.preview_thread = None
+        self.previewing = False
+        self.ocr = None
+        self.ocr_pool = ocr_pool
+        if self.ocr_pool is None and scheduler is None:
+            if self.config.ocr_mode == "async":
+                self.ocr_pool = OCRWorkerPool(workers=self.config.ocr_workers,
+                                              max_pending=self.config.ocr_queue_size,
+                                              max_age=self.config.ocr_max_age_ms / 1000.0,
+                                              backend=self.config.ocr_backend,
+                                              use_angle_cls=self.ocr_angle_cls(),
+                                              batch_size=self.config.ocr_batch_size,
+                                              warmup=self.config.warmup)
+            else:
+                self.ocr = self.take(paddle_pool(self.config, self.ocr_angle_cls()))
+        self.ocr_cache = None
+        if self.config.ocr_cache_size > 0:
+            self.ocr_cache = PlateCache(max_size=self.config.ocr_cache_size,
+                                        max_distance=self.config.ocr_cache_distance,
+                                        ttl=self.config.ocr_cache_ttl)
+        self.frame_id = 0
+        self.encoder = FrameEncoder(self.config)
+        self.motion_gate = None
+        if self.config.motion_gating:
+            self.motion_gate = MotionGate(threshold=self.config.motion_threshold,
+                                          min_area=self.config.motion_min_area,
+                                          scale=self.config.motion_scale,
+                                          refresh_frames=self.config.motion_refresh_frames)
+        self.controller = None
+        if self.config.adaptive:
+            self.controller = LoadController(target_latency_ms=self.config.target_latency_ms,
+                                             target_fps=self.config.target_fps,
+                                             interval=self.config.control_interval)
+        self.frames_seen = 0
+        # Output of the last inferred frame, reused for static frames
+        self.last_detections = []
+        self.last_annotated = None
+        self.batch_stats = BatchStats()
+        self.stream_stats = StreamStats()
+        # Prometheus stage histograms and counters (see /metrics)
+        self.metrics = StreamMetrics()
+        self.tracker = Tracker(iou_threshold=self.config.track_iou,
+                               max_missed=self.config.track_max_missed,
+                               ocr_retry_frames=self.config.ocr_retry_frames)
+
+    def take(self, pool):
+        instance = pool.acquire()
+        self.pooled.append((pool, instance))
+        return instance
 
-    def log_detection(self, label, confidence, ocr_text):
+    def close(self):
+        """Stop the stream and hand pooled model instances back for the next one."""
+        self.stop()
+        self.join(timeout=2.0)
+        for pool, instance in self.pooled:
+            pool.release(instance)
+        self.pooled = []
+
+    def create_queues(self):
+        default_policy = LATEST if self.live else LOSSLESS
+        # A shared scheduler waits on the frame queues of all its streams
+        on_put = self.scheduler.notify if self.scheduler is not None else None
+        # Frames shed by a queue hand their decode buffer straight back to the pool
+        self.frame_queue = FrameQueue(self.config.queue_size, self.config.frame_policy or default_policy,
+                                      name="frame_queue", on_put=on_put,
+                                      on_drop=lambda item: self.release_buffers([item[0]]))
+        self.result_queue = FrameQueue(self.config.queue_size, self.config.result_policy or default_policy,
+                                       name="result_queue",
+                                       on_drop=lambda result: self.release_buffers([result.get("buffer")]))
+        if self.scheduler is not None:
+            # Never let one slow live stream block the scheduler of every camera
+            self.inference_queue = FrameQueue(self.config.queue_size, self.config.result_policy or default_policy,
+                                              name="inference_queue",
+                                              on_drop=lambda item: self.release_buffers(item[3]))
+
+    def create_frame_pool(self):
+        """
+        Enough decode buffers for every frame the queues and stages can hold
+        at once, unless `frame_buffers` sets the count explicitly.
+        """
+        count = self.config.frame_buffers or (
+            self.frame_queue.maxsize + self.result_queue.maxsize + self.config.batch_size +
+            (self.inference_queue.maxsize * max(self.config.scheduler_batch_size, 1) if self.inference_queue else 0) + 4)
+        width, height = self.config.input_size
+        self.frame_pool = BufferPool((height, width, 3), count)
+
+    def release_buffers(self, buffers):
+        if self.frame_pool is None:
+            return
+        for buffer in buffers:
+            self.frame_pool.release(buffer)
+
+    def pipeline_stats(self):
+        """Depth, throughput and dropped-item counters for every stage queue."""
+        stats = {
+            "frame_queue": self.frame_queue.stats(),
+            "result_queue": self.result_queue.stats(),
+        }
+        if self.inference_queue is not None:
+            stats["inference_queue"] = self.inference_queue.stats()
+        if self.frame_pool is not None:
+            stats["frame_pool"] = self.frame_pool.stats()
+        if self.motion_gate is not None:
+            stats["motion_gate"] = self.motion_gate.stats()
+        if self.ocr_pool is not None:
+            stats["ocr_pool"] = self.ocr_pool.stats()
+        if self.ocr_cache is not None:
+            stats["ocr_cache"] = self.ocr_cache.stats()
+        return stats
+
+    def log_detection(self, label, confidence, ocr_text, ocr_confidence=None, frame_id=None, track=None):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
         if ocr_text:
             print(f"[{timestamp}] DETECTED: {label} | Conf: {confidence:.2f} | Plate: {ocr_text}")
         else:
             print(f"[{timestamp}] DETECTED: {label} | Conf: {confidence:.2f} | No text found")
+        if self.events is not None:
+            fields = {"label": label, "frame_id": frame_id}
+            if track is not None:
+                plate, plate_confidence = track.consensus()
+                fields.update({"track_id": track.track_id, "plate": plate, "plate_confidence": plate_confidence})
+            self.events.record_plate_read(self.stream_id, ocr_text, ocr_confidence, **fields)
 
     def extract_text_from_roi(self, image, box):
         """
         Extract text from the ROI defined by the bounding box.
         A padding is added, and the ROI is upscaled if it is too small to improve OCR performance.
         """
-        try:
-            if not box or len(box[0]) != 4:
-                return ""
-            x1, y1, x2, y2 = map(int, box[0])
-            padding = 10
-            y1 = max(0, y1 - padding)
-            y2 = min(image.shape[0], y2 + padding)
-            x1 = max(0, x1 - padding)
-            x2 = min(image.shape[1], x2 + padding)
-            roi = image[y1:y2, x1:x2]
-
-            # Upscale ROI if too small for better OCR accuracy
-            h, w = roi.shape[:2]
-            if w < 100 or h < 30:
-                scale_factor = 2
-                roi = cv2.resize(roi, (w * scale_factor, h * scale_factor), interpolation=cv2.INTER_CUBIC)
-
-            # Ensure ROI is 3-channel
-            if len(roi.shape) == 2:
-                roi = cv2.cvtColor(roi, cv2.COLOR_GRAY2BGR)
-
-            # Run OCR on the ROI
-            ocr_result = self.ocr.ocr(roi, cls=True)
-            # Combine multiple OCR results if present
-            text = " ".join([line[1][0] for line in ocr_result])
-            return text.strip()
-        except Exception as e:
-            print(f"OCR Error: {e}")
-            return ""
+        return self.read_plate(image, box)[0]
+
+    def read_plate(self, image, box):
+        """Like extract_text_from_roi, but returns (text, mean line confidence)."""
+        if not box or len(box[0]) != 4:
+            return "", 0.0
+        roi = crop_roi(image, box[0])
+        if roi is None:
+            return "", 0.0
+        key = self.ocr_cache.key(roi) if self.ocr_cache is not None else None
+        cached = self.ocr_cache.lookup(key) if key is not None else None
+        if cached is not None:
+            return cached
+        text, confidence = self.read_plates([roi])[0]
+        if key is not None:
+            self.ocr_cache.store(key, text, confidence)
+        return text, confidence
+
+    def read_plates(self, rois):
+        """OCR a list of plate crops in one go with the configured backend."""
+        self.metrics.add("ocr_calls", len(rois))
+        with self.metrics.time("ocr"):
+            return read_rois(self.ocr, rois, self.config.ocr_backend, self.ocr_angle_cls())
+
+    def ocr_angle_cls(self):
+        # The full PaddleOCR stack always classifies angles; the
+        # recognition-only fast path only does when configured to
+        return self.config.ocr_angle_cls if self.config.ocr_backend == "rec" else True
+
+    def submit_ocr(self, roi, cache_key, label, confidence, frame_id, index, track=None):
+        """
+        Queue a plate crop on the OCR pool. The text is emitted later as an
+        `ocr_result` event keyed by track_id (or frame_id/index without tracking).
+        """
+        submitted_at = time.perf_counter()
+
+        def on_result(text, ocr_confidence):
+            # Pool reads are timed from submission, so waiting for a worker counts too
+            self.metrics.observe("ocr", time.perf_counter() - submitted_at)
+            if cache_key is not None:
+                self.ocr_cache.store(cache_key, text, ocr_confidence)
+            if track is not None:
+                track.add_read(text, ocr_confidence)
+            self.log_detection(label, confidence, text, ocr_confidence, frame_id, track)
+            payload = {"stream_id": self.stream_id, "frame_id": frame_id, "index": index, "ocr_text": text, "confidence": ocr_confidence}
+            if track is not None:
+                plate, plate_confidence = track.consensus()
+                payload.update({"track_id": track.track_id, "plate": plate, "plate_confidence": plate_confidence})
+            self.notify("ocr_result", payload)
 
-    def process_frame(self, frame, size=(640, 480)):
-        # Resize the frame to 640x480
-        frame = cv2.resize(frame, size)
-        results = self.model(frame, conf=0.5, iou=0.5)
+        self.metrics.add("ocr_calls")
+        self.ocr_pool.submit(roi, confidence, on_result)
+
+    def apply_read(self, detection, track, text, ocr_confidence):
+        if track is None:
+            detection["ocr_text"] = text
+        else:
+            track.add_read(text, ocr_confidence)
+        self.log_detection(detection["label"], detection["confidence"], text, ocr_confidence, self.frame_id, track)
+
+    def process_frame(self, frame, size=None):
+        return self.process_batch([frame], size)[0]
+
+    def process_batch(self, frames, size=None):
+        """
+        Run a single (batched) inference call over `frames` and return one
+        (annotated_frame, detections) pair per input frame, in order.
+        """
+        frames, results = self.detect(frames, size)
+        return self.annotate_batch(frames, results)
+
+    def prepare(self, frame, size=None):
+        # Resize the frame to the detector input size (640x480 by default).
+        # Decoded frames already are, so they are used as-is.
+        size = size or self.config.input_size
+        if frame.shape[1] == size[0] and frame.shape[0] == size[1]:
+            return frame
+        return cv2.resize(frame, size)
+
+    def knob(self, name, default):
+        """Current setting of a load-shedding knob (the configured default without a controller)."""
+        if self.controller is None:
+            return default
+        value = self.controller.knobs.get(name)
+        return default if value is None else value
+
+    def model_kwargs(self):
+        kwargs = {"conf": self.config.conf, "iou": self.config.iou}
+        imgsz = self.knob("imgsz", None)
+        if imgsz is not None:
+            kwargs["imgsz"] = imgsz
+        return kwargs
+
+    def should_infer(self, frame):
+        """
+        False for frames the controller's inference stride skips, and for
+        frames the motion gate considers unchanged.
+        """
+        self.frames_seen += 1
+        stride = self.knob("inference_stride", 1)
+        if stride > 1 and self.frames_seen % stride:
+            return False
+        return self.motion_gate is None or self.motion_gate.check(frame)
+
+    def detect(self, frames, size=None):
+        """
+        Prepare `frames` and run the model on those that pass the motion
+        gate. Returns the prepared frames and one result per frame, None for
+        frames the model skipped.
+        """
+        frames = [self.prepare(frame, size) for frame in frames]
+        run = [self.should_infer(frame) for frame in frames]
+        moving = [frame for frame, inferred in zip(frames, run) if inferred]
+        results = []
+        if moving:
+            with self.metrics.time("inference"):
+                results = self.model(moving, **self.model_kwargs())
+        return frames, expand_results(results, run)
+
+    def annotate(self, frame, result):
+        return self.annotate_batch([frame], [result])[0]
+
+    def annotate_batch(self, frames, results):
+        """
+        Build (annotated_frame, detections) for every frame of a batch. Inline
+        OCR is deferred until all frames are processed, so every plate crop of
+        the batch is read in a single OCR call.
+        """
+        pending = []
+        # In overlay mode the client draws the boxes, so the server skips
+        # plotting entirely and streams the raw frame
+        plot = self.config.stream_mode != "overlay"
+        outputs = []
+        for frame, result in zip(frames, results):
+            if result is None:
+                outputs.append(self.reuse_detections(frame, plot))
+                continue
+            detections = self.build_detections(frame, result, pending)
+            if plot:
+                with self.metrics.time("plot"):
+                    annotated = result.plot()
+            else:
+                annotated = frame
+            self.last_detections = detections
+            self.last_annotated = annotated if plot else None
+            outputs.append((annotated, detections))
+        self.run_pending_ocr(pending)
+        return outputs
+
+    def reuse_detections(self, frame, plot):
+        """
+        Output for a frame the model skipped: the last inferred frame's
+        detections (and annotated picture), or nothing when reuse is off.
+        """
+        self.frame_id += 1
+        if not self.config.motion_reuse:
+            return frame, []
+        if plot and self.last_annotated is not None:
+            return self.last_annotated, list(self.last_detections)
+        return frame, list(self.last_detections)
+
+    def build_detections(self, frame, result, pending):
+        """
+        Turn one YOLO result into detection dicts. Boxes that need inline OCR,
+        and tracked boxes whose plate may change, are appended to `pending` as
+        (detection, track, roi) and completed by run_pending_ocr.
+        """
+        self.frame_id += 1
         detections = []
-        for box in results[0].boxes:
-            coords = box.xyxy.cpu().numpy().tolist()[0]
-            label = self.model.names[int(box.cls)]
-            confidence = float(box.conf)
-            x1, y1, x2, y2 = map(int, coords)
-            roi = frame[y1:y2, x1:x2]
-
-            # Example: Calculate the mean BGR color (for a color annotation)
-            hsv_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
-            mean_hsv = cv2.mean(hsv_roi)[:3]
-            mean_hsv_uint8 = np.array([[mean_hsv]], dtype=np.uint8)
-            mean_bgr = cv2.cvtColor(mean_hsv_uint8, cv2.COLOR_HSV2BGR)[0][0]
-            hex_color = '#{:02x}{:02x}{:02x}'.format(int(mean_bgr[2]), int(mean_bgr[1]), int(mean_bgr[0]))
-
-            # Apply ANPR (OCR) on the detected bounding box (with padding)
-            ocr_text = self.extract_text_from_roi(frame, [[x1, y1, x2, y2]])
-            self.log_detection(label, confidence, ocr_text)
-
-            detections.append({
+        boxes = result.boxes
+        # Pull every box off the device in one go instead of once per box
+        all_coords = boxes.xyxy.cpu().numpy()
+        all_classes = boxes.cls.cpu().numpy().astype(int)
+        all_confidences = boxes.conf.cpu().numpy()
+        tracks = None
+        if self.config.tracking:
+            # Update even on empty frames so lost tracks age out
+            tracks = self.tracker.update(all_coords, all_classes, all_confidences, self.model.names)
+        # Mean colour of every box (and optionally its colour name) from one
+        # colour-space conversion of the frame
+        with self.metrics.time("color"):
+            hex_colors, color_names = box_colors(frame, all_coords, self.config.color_names)
+        ocr_sampled = self.frame_id % self.knob("ocr_stride", 1) == 0
+        for i, (coords, cls, confidence) in enumerate(zip(all_coords.tolist(), all_classes, all_confidences)):
+            label = self.model.names[int(cls)]
+            confidence = float(confidence)
+            detection = {
                 "label": label,
-                "color_annotation": hex_color,
+                "color_annotation": hex_colors[i],
                 "confidence": confidence,
                 "coordinates": coords,
-                "ocr_text": ocr_text,
-            })
-        annotated_frame = results[0].plot()
-        return annotated_frame, detections
-
-    def frame_producer(self, cap):
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_delay = 1.0 / fps if fps > 0 else 0.033  # fallback delay if FPS is unavailable
-        while self.running:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            while self.frame_queue.full() and self.running:
-                time.sleep(0.01)
-            self.frame_queue.put(frame)
-            time.sleep(frame_delay)
-
-    def frame_processor(self):
-        while self.running:
-            if self.frame_queue.empty():
-                time.sleep(0.01)
+                "ocr_text": "",
+            }
+            if color_names is not None:
+                detection["color_name"] = color_names[i]
+            track = tracks[i] if tracks is not None else None
+            # Apply ANPR (OCR) on the detected bounding box (with padding),
+            # but only once per vehicle, or when its plate crop clearly improved
+            # (the controller may thin OCR out to every Nth frame under load)
+            needs_ocr = ocr_sampled and (track is None or self.tracker.should_ocr(track, frame))
+            if needs_ocr and track is not None:
+                self.tracker.mark_ocr(track, frame)
+            plate_roi = crop_roi(frame, coords) if needs_ocr else None
+            cache_key = None
+            if plate_roi is not None and self.ocr_cache is not None:
+                # Near-identical crops (parked or slow cars) reuse an earlier read
+                cache_key = self.ocr_cache.key(plate_roi)
+                cached = self.ocr_cache.lookup(cache_key)
+                if cached is not None:
+                    self.apply_read(detection, track, *cached)
+                    plate_roi = None
+            if plate_roi is not None and self.ocr_pool is not None:
+                self.submit_ocr(plate_roi, cache_key, label, confidence, self.frame_id, i, track)
+                plate_roi = None
+            if plate_roi is not None or track is not None:
+                pending.append((detection, track, plate_roi, cache_key))
+            detections.append(detection)
+        return detections
+
+    def run_pending_ocr(self, pending):
+        to_read = [item for item in pending if item[2] is not None]
+        texts = self.read_plates([roi for _, _, roi, _ in to_read]) if to_read else []
+        for (detection, track, _, cache_key), (text, ocr_confidence) in zip(to_read, texts):
+            if cache_key is not None:
+                self.ocr_cache.store(cache_key, text, ocr_confidence)
+            self.apply_read(detection, track, text, ocr_confidence)
+        for detection, track, _, _ in pending:
+            if track is None:
                 continue
-            frame = self.frame_queue.get()
-            annotated_frame, detections = self.process_frame(frame)
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 60]
-            _, buffer = cv2.imencode('.jpg', annotated_frame, encode_param)
-            frame_data = base64.b64encode(buffer).decode('utf-8')
-            self.result_queue.put({
-                "frame_data": frame_data,
-                "detections": detections
+            plate, plate_confidence = track.consensus()
+            detection.update({
+                "track_id": track.track_id,
+                "plate": plate,
+                "plate_confidence": plate_confidence,
+                # Keep ocr_text for existing clients: it is now the per-vehicle consensus
+                "ocr_text": plate,
             })
 
-    def emit_frames(self):
-        start_time = time.time()
+    def current(self, run):
+        return self.running and self.run == run
+
+    def frame_producer(self, decoder, pool, run):
+        # Live sources block in read() at their own rate; only files need pacing.
+        pacer = Pacer(decoder.fps, self.config.realtime_pacing and not self.live)
+        while self.current(run):
+            # Decode straight into a pooled buffer at the detector input size
+            buffer = pool.acquire()
+            if buffer is None:
+                break
+            decode_start = time.perf_counter()
+            if not decoder.read_into(buffer):
+                pool.release(buffer)
+                break
+            self.metrics.observe("decode", time.perf_counter() - decode_start)
+            # Capture time travels with the frame for end-to-end latency
+            if not self.frame_queue.put((buffer, time.time())):
+                pool.release(buffer)
+                break
+            pacer.wait()
+        # End of stream: let the downstream stages drain and exit
+        self.frame_queue.close()
+        decoder.release()
+        print("Video stream stopped.")
+
+    def collect_batch(self):
+        """
+        Block for the first frame, then keep collecting until the batch holds
+        `batch_size` frames or `batch_timeout_ms` has passed since the first one.
+        Returns the (frame, captured_at) items together with the time each one
+        was dequeued.
+        """
+        batch_size = self.config.batch_size
+        frames, dequeued_at = [], []
+        try:
+            frames.append(self.frame_queue.get())
+            dequeued_at.append(time.time())
+        except Empty:
+            return frames, dequeued_at
+        deadline = time.time() + self.config.batch_timeout_ms / 1000.0
+        while self.running and frames and len(frames) < batch_size:
+            remaining = deadline - time.time()
+            try:
+                if remaining > 0:
+                    frame = self.frame_queue.get(timeout=remaining)
+                else:
+                    # Timeout spent: only take frames that are already waiting
+                    frame = self.frame_queue.get_nowait()
+            except Empty:
+                break
+            frames.append(frame)
+            dequeued_at.append(time.time())
+        return frames, dequeued_at
+
+    def next_batch(self):
+        """
+        Next (frames, captured_at, results, buffers) to post-process, or None. A
+        standalone processor batches and runs the model itself; a managed one
+        receives batches the shared scheduler has already run inference on.
+        """
+        if self.scheduler is not None:
+            try:
+                return self.inference_queue.get()
+            except Empty:
+                return None
+        items, dequeued_at = self.collect_batch()
+        if not items:
+            return None
+        infer_start = time.time()
+        buffers = [buffer for buffer, _ in items]
+        try:
+            frames, results = self.detect(buffers)
+        except Exception:
+            self.release_buffers(buffers)
+            raise
+        waits = [infer_start - t for t, result in zip(dequeued_at, results) if result is not None]
+        if waits:
+            self.batch_stats.record(waits, time.time() - infer_start)
+        if self.batch_stats.batches >= self.config.report_interval:
+            print(self.batch_stats.format(self.config.batch_size, self.config.batch_timeout_ms))
+            self.batch_stats.reset()
+        return frames, [captured_at for _, captured_at in items], results, buffers
+
+    def encode_frame(self, frame_id, annotated_frame, detections, encode_param=None):
+        with self.metrics.time("encode"):
+            return self.encoder.encode(frame_id, annotated_frame, detections, encode_param,
+                                       quality_cap=self.knob("jpeg_quality", None))
+
+    def frame_processor(self, run):
+        source = self.inference_queue if self.scheduler is not None else self.frame_queue
+        try:
+            while self.current(run):
+                try:
+                    batch = self.next_batch()
+                except Exception as e:
+                    # next_batch has given the batch's buffers back
+                    print(f"[{self.stream_id or 'stream'}] Inference error: {e}")
+                    continue
+                if batch is None:
+                    if source.closed:
+                        break
+                    continue
+                self.process_results(*batch)
+        finally:
+            self.result_queue.close()
+
+    def process_results(self, frames, captured_at, results, buffers):
+        """Annotate and encode one batch into result_queue; its buffers always go back or along."""
+        handed_over = 0
+        try:
+            first_id = self.frame_id + 1
+            outputs = self.annotate_batch(frames, results)
+            detected_at = time.time()
+            for offset, (annotated_frame, detections) in enumerate(outputs):
+                result = self.encode_frame(first_id + offset, annotated_frame, detections)
+                result["captured_at"] = captured_at[offset]
+                result["detected_at"] = detected_at
+                # Frames the model skipped carry the last detections again
+                result["inferred"] = results[offset] is not None
+                result["encoded_at"] = time.time()
+                # The decode buffer is recycled once the frame has been emitted
+                result["buffer"] = buffers[offset]
+                handed_over = offset + 1
+                if not self.result_queue.put(result):
+                    self.release_buffers([result["buffer"]])
+        except Exception as e:
+            # The producer waits on pooled buffers: a lost batch must not keep them
+            print(f"[{self.stream_id or 'stream'}] Frame processing error: {e}")
+            self.release_buffers(buffers[handed_over:])
+
+    def emit_result(self, result, fps):
+        with self.metrics.time("emit"):
+            messages = self.frame_messages(result, fps)
+            self.publish(messages)
+        self.metrics.add("frames_emitted")
+        self.metrics.add("emitted_bytes", frame_bytes(messages))
+
+    def frame_messages(self, result, fps):
+        return frame_messages(result, fps, self.config, self.stream_id)
+
+    def publish(self, messages):
+        """Frame messages go through the viewers' outboxes, or to everyone without a hub."""
+        if self.hub is not None:
+            self.hub.publish(self.stream_id, messages)
+            return
+        for event, payload in messages:
+            self.socketio.emit(event, payload)
+
+    def notify(self, event, payload):
+        """Must-deliver events (OCR results, errors) for the viewers of this stream."""
+        if self.hub is not None:
+            self.hub.emit(self.stream_id, event, payload)
+        else:
+            self.socketio.emit(event, payload)
+
+    def emit_frames(self, run):
         frame_count = 0
-        while self.running:
-            if self.result_queue.empty():
-                time.sleep(0.01)
+        while self.current(run):
+            try:
+                result = self.result_queue.get()
+            except Empty:
+                if self.result_queue.closed:
+                    break
                 continue
-            result = self.result_queue.get()
             frame_count += 1
-            elapsed_time = time.time() - start_time
-            fps = frame_count / elapsed_time if elapsed_time > 0 else 0
-            self.socketio.emit("video_frame", {
-                "entrance_frame": result["frame_data"],
-                "entrance_detections": result["detections"],
-                "fps": fps
-            })
+            self.stream_stats.record(time.time() - result["captured_at"])
+            fps = self.stream_stats.fps()
+            self.emit_result(result, fps)
+            if self.events is not None and result["inferred"]:
+                # Only what the model saw: reused detections would be stored again every frame
+                self.events.record_detections(self.stream_id, result)
+            if self.controller is not None:
+                result["emitted_at"] = time.time()
+                self.controller.observe(result)
+            self.release_buffers([result.pop("buffer", None)])
             if frame_count % 30 == 0:
-                print(f"Processing FPS: {fps:.2f}")
-                if frame_count > 100:
-                    start_time = time.time()
-                    frame_count = 0
-        if self.video_capture:
-            self.video_capture.release()
-            print("Video stream stopped.")
+                stats = self.pipeline_stats()
+                latency = self.stream_stats.summary()
+                line = (f"[{self.stream_id or 'stream'}] Processing FPS: {fps:.2f} | "
+                        f"latency avg {latency['avg_latency_ms']:.0f} ms, p95 {latency['p95_latency_ms']:.0f} ms | dropped: "
+                        f"frame_queue={stats['frame_queue']['dropped']} "
+                        f"result_queue={stats['result_queue']['dropped']}")
+                if "ocr_cache" in stats:
+                    line += (f" | OCR cache: {stats['ocr_cache']['hits']} hits / "
+                             f"{stats['ocr_cache']['misses']} misses")
+                if "motion_gate" in stats:
+                    line += f" | static frames skipped: {stats['motion_gate']['skipped']}"
+                if self.controller is not None:
+                    line += f" | load level {self.controller.level}"
+                print(line)
+        if self.run == run:
+            self.running = False
+
+    def start_preview(self):
+        """
+        Send raw frames of the source, without detections, until `start`
+        takes over, so viewers get video while the models are still loading.
+        """
+        if self.running or self.previewing or not self.config.preview:
+            return
+        self.previewing = True
+        self.preview_thread = Thread(target=self.preview_frames, daemon=True)
+        self.preview_thread.start()
+
+    def stop_preview(self):
+        self.previewing = False
+        if self.preview_thread is not None:
+            self.preview_thread.join(timeout=2.0)
+            self.preview_thread = None
+
+    def preview_frames(self):
+        decoder = open_decoder(self.video_path, self.config.input_size, self.config.decoder, self.live)
+        if not decoder.is_opened():
+            decoder.release()
+            return
+        width, height = self.config.input_size
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        # A separate encoder, so the stream's duplicate-frame state starts clean
+        encoder = FrameEncoder(self.config)
+        encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), self.config.raw_jpeg_quality]
+        interval = 1.0 / max(self.config.raw_fps, 1e-6)
+        pacer = Pacer(decoder.fps, not self.live)
+        sent_at = 0.0
+        try:
+            # Every frame is read (live sources must not fall behind), but
+            # only `raw_fps` of them are sent
+            while self.previewing and decoder.read_into(frame):
+                now = time.time()
+                if now - sent_at >= interval:
+                    sent_at = now
+                    messages = self.frame_messages(encoder.encode(0, frame, [], encode_param), 0.0)
+                    for _, payload in messages:
+                        payload["preview"] = True
+                    self.publish(messages)
+                pacer.wait()
+        finally:
+            decoder.release()
 
     def start(self):
+        self.stop_preview()
         if self.running:
             return  # Already running
+        # Make sure the threads of a previous run have exited before reusing state
+        self.join(timeout=2.0)
+        self.run += 1
         self.running = True
-        self.video_capture = cv2.VideoCapture(self.video_path)
-        if not self.video_capture.isOpened():
-            self.socketio.emit("video_error", {"error": "Video file not available"})
+        self.create_queues()
+        self.tracker.reset()
+        self.stream_stats.reset()
+        self.encoder.reset()
+        self.last_detections = []
+        self.last_annotated = None
+        self.frames_seen = 0
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        if self.controller is not None:
+            self.controller.reset()
+        self.create_frame_pool()
+        self.decoder = open_decoder(self.video_path, self.config.input_size, self.config.decoder, self.live)
+        if not self.decoder.is_opened():
+            self.decoder.release()
+            self.notify("video_error", {"stream_id": self.stream_id, "error": "Video file not available"})
             self.running = False
             return
-        self.video_capture.set(cv2.CAP_PROP_BUFFERSIZE, 2)
-        self.producer_thread = Thread(target=self.frame_producer, args=(self.video_capture,))
-        self.processor_thread = Thread(target=self.frame_processor)
-        self.emit_thread = Thread(target=self.emit_frames)
+        self.producer_thread = Thread(target=self.frame_producer, args=(self.decoder, self.frame_pool, self.run))
+        self.processor_thread = Thread(target=self.frame_processor, args=(self.run,))
+        self.emit_thread = Thread(target=self.emit_frames, args=(self.run,))
         self.producer_thread.daemon = True
         self.processor_thread.daemon = True
         self.emit_thread.daemon = True
@@ -173,7 +718,20 @@ class VideoProcessor:
         print("Video processing started.")
 
     def stop(self):
+        self.stop_preview()
         if not self.running:
             return
         self.running = False
+        # Wake any stage blocked on a queue so the threads can exit promptly
+        self.frame_queue.close()
+        self.result_queue.close()
+        if self.inference_queue is not None:
+            self.inference_queue.close()
+        if self.frame_pool is not None:
+            self.frame_pool.close()
         print("Stopping video processing.")
+
+    def join(self, timeout=None):
+        for thread in (self.producer_thread, self.processor_thread, self.emit_thread):
+            if thread is not None and thread.is_alive():
+                thread.join(timeout)
@@ -0,0 +1,115 @@
+import base64
+import time
+import cv2
+
+
+def compact_detection(detection):
+    """
+    Compact form of a detection for the binary transport:
+    b = box (x1, y1, x2, y2) in whole pixels, l = label, c = confidence,
+    k = hex colour, t = track id, p = plate / OCR text. Empty fields are left out.
+    """
+    compact = {
+        "b": [int(round(v)) for v in detection["coordinates"]],
+        "l": detection["label"],
+        "c": round(detection["confidence"], 3),
+        "k": detection["color_annotation"],
+    }
+    if detection.get("track_id") is not None:
+        compact["t"] = detection["track_id"]
+    plate = detection.get("plate") or detection.get("ocr_text")
+    if plate:
+        compact["p"] = plate
+    if detection.get("color_name"):
+        compact["n"] = detection["color_name"]
+    return compact
+
+
+class FrameEncoder:
+    """
+    JPEG encoding of processed frames for one stream, kept free of the
+    detector imports so it can also run in a lightweight encode process.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.reset()
+
+    def reset(self):
+        self.last_jpeg = None
+        self.last_raw_at = 0.0
+
+    def encode(self, frame_id, annotated_frame, detections, encode_param=None, quality_cap=None):
+        """
+        JPEG-encode a processed frame for the emit stage. With the binary
+        transport or in overlay mode, the frame is left out (None) when its
+        bytes are identical to the previous frame's, so static scenes cost no
+        video bandwidth, and in overlay mode when the next raw frame is not
+        yet due. The base64 `video_frame` event always carries its frame:
+        existing clients render whatever it holds. In binary transport mode the JPEG
+        bytes are kept as-is instead of being base64-encoded. `quality_cap`
+        lowers the JPEG quality while the stream is shedding load.
+        """
+        height, width = annotated_frame.shape[:2]
+        result = {
+            "frame_id": frame_id,
+            "frame_data": None,
+            "size": (width, height),
+            "detections": detections
+        }
+        quality = self.config.jpeg_quality
+        if self.config.stream_mode == "overlay":
+            now = time.time()
+            if now - self.last_raw_at < 1.0 / max(self.config.raw_fps, 1e-6):
+                return result
+            self.last_raw_at = now
+            quality = self.config.raw_jpeg_quality
+            encode_param = None
+        if encode_param is None:
+            if quality_cap is not None:
+                quality = min(quality, quality_cap)
+            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+        _, buffer = cv2.imencode('.jpg', annotated_frame, encode_param)
+        jpeg = buffer.tobytes()
+        repeats_skipped = self.config.transport == "binary" or self.config.stream_mode == "overlay"
+        if jpeg != self.last_jpeg or not repeats_skipped:
+            self.last_jpeg = jpeg
+            result["frame_data"] = jpeg if self.config.transport == "binary" else base64.b64encode(jpeg).decode('utf-8')
+        return result
+
+
+def frame_messages(result, fps, config, stream_id=None):
+    """
+    The (event, payload) messages of one processed frame. They are built
+    once per stream and shared by every viewer.
+    """
+    overlay = config.stream_mode == "overlay"
+    if config.transport != "binary" and not overlay:
+        return [("video_frame", {
+            "stream_id": stream_id,
+            "frame_id": result["frame_id"],
+            "entrance_frame": result["frame_data"],
+            "entrance_detections": result["detections"],
+            "fps": fps
+        })]
+    # Split streams: frames (binary attachment, or base64 raw frames in
+    # overlay mode) and a compact JSON `detections` event per frame
+    messages = []
+    if result["frame_data"] is not None:
+        event = "video_frame_bin" if config.transport == "binary" else "raw_frame"
+        messages.append((event, {
+            "stream_id": stream_id,
+            "frame_id": result["frame_id"],
+            "frame": result["frame_data"],
+        }))
+    width, height = result["size"]
+    messages.append(("detections", {
+        "stream_id": stream_id,
+        "frame_id": result["frame_id"],
+        "fps": round(fps, 2),
+        "w": width,
+        "h": height,
+        "overlay": overlay,
+        "d": [compact_detection(d) for d in result["detections"]],
+    }))
+    return messages
@@ -0,0 +1,397 @@
+import atexit
+import csv
+import glob
+import io
+import json
+import os
+import time
+from datetime import datetime
+from queue import Queue
+from threading import Condition, Thread
+import sqlalchemy as sa
+
+
+def detection_rows(stream_id, result):
+    """detection_events rows for one processed frame"""
+    detected_at = datetime.utcfromtimestamp(result.get("captured_at", time.time()))
+    rows = []
+    for detection in result["detections"]:
+        x1, y1, x2, y2 = (int(round(v)) for v in detection["coordinates"])
+        rows.append({
+            "stream_id": stream_id,
+            "frame_id": result["frame_id"],
+            "detected_at": detected_at,
+            "label": detection["label"],
+            "confidence": float(detection["confidence"]),
+            "track_id": detection.get("track_id"),
+            "plate": detection.get("plate") or detection.get("ocr_text") or None,
+            "plate_confidence": detection.get("plate_confidence"),
+            "color": detection.get("color_annotation"),
+            "color_name": detection.get("color_name"),
+            "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+        })
+    return rows
+
+
+def plate_read_row(stream_id, text, confidence, label=None, frame_id=None, track_id=None,
+                   plate=None, plate_confidence=None):
+    """A plate_reads row for one OCR read"""
+    return {
+        "stream_id": stream_id,
+        "frame_id": frame_id,
+        "read_at": datetime.utcnow(),
+        "label": label,
+        "text": text or None,
+        "confidence": None if confidence is None else float(confidence),
+        "track_id": track_id,
+        "plate": plate or None,
+        "plate_confidence": plate_confidence,
+    }
+
+
+def rejected(engine, error):
+    """Whether the database refused the rows themselves, rather than being unreachable"""
+    kinds = (sa.exc.DataError, sa.exc.IntegrityError)
+    dbapi = engine.dialect.dbapi
+    if dbapi is not None:
+        # COPY runs on the raw connection, so its errors are not wrapped
+        kinds += (dbapi.DataError, dbapi.IntegrityError)
+    return isinstance(error, kinds)
+
+
+class EventWriter:
+    """
+    Persists detection events off the hot path. `record` only appends to an
+    in-memory buffer; a writer thread flushes the buffers once `batch_size`
+    rows are waiting or `flush_interval` seconds have passed, as one COPY
+    per table on PostgreSQL (multi-row INSERT elsewhere).
+
+    When the database falls behind (more than `max_pending` rows buffered)
+    or a flush fails, rows are spilled to JSONL files in `spill_dir` by a
+    separate spill thread, and the writer stops trying the database for
+    `retry_interval` seconds. Spilled files are replayed, oldest first,
+    once flushes succeed again. Strings are clipped to their column's
+    length. A batch the database still refuses on its data (DataError,
+    IntegrityError) is written in smaller parts, and only the rows it
+    refuses are set aside in a .bad file.
+
+    `hooks` maintain data derived from the events: each one's
+    `apply(conn, name, rows)` runs inside the transaction that writes the
+    rows, and `committed(name, rows)` after it has committed (or
+    `rolled_back(name, rows)` if it failed), so derived tables and
+    in-memory state see every row exactly once.
+    """
+
+    def __init__(self, engine, tables, batch_size=500, flush_interval=1.0, max_pending=20000,
+                 spill_dir="./spill", retry_interval=5.0, hooks=()):
+        self.engine = engine
+        self.tables = tables  # table name -> sqlalchemy Table
+        # table name -> [(column, length)] of its bounded string columns
+        self.lengths = {name: [(c.name, c.type.length) for c in table.columns
+                               if isinstance(c.type, sa.String) and c.type.length]
+                        for name, table in tables.items()}
+        self.hooks = list(hooks)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.spill_dir = spill_dir
+        self.retry_interval = retry_interval
+        self.cond = Condition()
+        self.buffers = {name: [] for name in tables}
+        self.pending = 0
+        self.running = False
+        self.retry_at = 0.0
+        self.spill_queue = Queue()
+        self.writer_thread = None
+        self.spill_thread = None
+        self.written = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.failures = 0
+        self.quarantined = 0
+
+    def start(self):
+        with self.cond:
+            if self.running:
+                return
+            self.running = True
+        os.makedirs(self.spill_dir, exist_ok=True)
+        # Files this writer had claimed when its process died
+        for path in glob.glob(os.path.join(self.spill_dir, "*.jsonl.replaying")):
+            try:
+                os.rename(path, path[:-len(".replaying")])
+            except OSError:
+                pass
+        self.writer_thread = Thread(target=self.run, daemon=True, name="event-writer")
+        self.spill_thread = Thread(target=self.spill_loop, daemon=True, name="event-spill")
+        self.writer_thread.start()
+        self.spill_thread.start()
+        # Flush (or spill) whatever is still buffered when the server exits
+        atexit.register(self.stop)
+
+    def record(self, table, rows):
+        """Queue rows for `table`. Never blocks on the database."""
+        if not rows or not self.running:
+            return
+        with self.cond:
+            self.buffers[table].extend(rows)
+            self.pending += len(rows)
+            if self.pending >= self.max_pending:
+                # The writer is stuck behind the database: park the backlog on disk
+                for name, buffered in self.buffers.items():
+                    if buffered:
+                        self.spill_queue.put((name, buffered, ""))
+                self.buffers = {name: [] for name in self.tables}
+                self.pending = 0
+            elif self.pending >= self.batch_size:
+                self.cond.notify()
+
+    def record_detections(self, stream_id, result):
+        self.record("detection_events", detection_rows(stream_id, result))
+
+    def record_plate_read(self, stream_id, text, confidence, **fields):
+        self.record("plate_reads", [plate_read_row(stream_id, text, confidence, **fields)])
+
+    def run(self):
+        while True:
+            with self.cond:
+                deadline = time.time() + self.flush_interval
+                while self.running and self.pending < self.batch_size:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                batches = [(name, rows) for name, rows in self.buffers.items() if rows]
+                self.buffers = {name: [] for name in self.tables}
+                self.pending = 0
+                running = self.running
+            for name, rows in batches:
+                self.flush(name, rows)
+            if time.time() >= self.retry_at and self.spill_queue.empty():
+                self.replay_one()
+            if not running:
+                break
+        self.spill_queue.put(None)
+
+    def flush(self, name, rows):
+        if time.time() < self.retry_at:
+            self.spill_queue.put((name, rows, ""))
+            return
+        try:
+            self.write(name, rows)
+        except Exception as e:
+            self.failures += 1
+            if rejected(self.engine, e):
+                # Bad rows do not mean the database is down: write the rest
+                refused, unwritten = self.salvage(name, rows)
+                self.written += len(rows) - len(refused) - len(unwritten)
+                self.quarantined += len(refused)
+                print(f"Event writer: {len(refused)} of {len(rows)} {name} rows rejected "
+                      f"({str(e).splitlines()[0]}), setting them aside")
+                if refused:
+                    self.spill_queue.put((name, refused, ".bad"))
+                if unwritten:
+                    self.spill_queue.put((name, unwritten, ""))
+                return
+            self.retry_at = time.time() + self.retry_interval
+            print(f"Event writer: flush of {name} failed ({str(e).splitlines()[0]}), spilling to disk")
+            self.spill_queue.put((name, rows, ""))
+            return
+        self.written += len(rows)
+        self.retry_at = 0.0
+
+    def salvage(self, name, rows):
+        """
+        Write a batch the database rejected in ever smaller parts, down to
+        single rows, so only the offending rows stay out. Returns the rows it
+        refused and, if the database fails for another reason part way
+        (retry_at is then set), the rows not written yet.
+        """
+        if len(rows) == 1:
+            return rows, []
+        refused = []
+        parts = [rows[len(rows) // 2:], rows[:len(rows) // 2]]
+        while parts:
+            part = parts.pop()
+            try:
+                self.write(name, part)
+            except Exception as e:
+                if not rejected(self.engine, e):
+                    self.retry_at = time.time() + self.retry_interval
+                    return refused, [row for rest in [part] + parts[::-1] for row in rest]
+                if len(part) == 1:
+                    refused.extend(part)
+                else:
+                    parts += [part[len(part) // 2:], part[:len(part) // 2]]
+        return refused, []
+
+    def write(self, name, rows):
+        """All of `rows` in one transaction, `batch_size` rows per statement."""
+        table = self.tables[name]
+        self.clip(name, rows)
+        try:
+            with self.engine.begin() as conn:
+                use_copy = conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2"
+                for i in range(0, len(rows), self.batch_size):
+                    chunk = rows[i:i + self.batch_size]
+                    if use_copy:
+                        self.copy(conn, table, chunk)
+                    else:
+                        conn.execute(table.insert(), chunk)
+                for hook in self.hooks:
+                    hook.apply(conn, name, rows)
+        except Exception:
+            for hook in self.hooks:
+                hook.rolled_back(name, rows)
+            raise
+        for hook in self.hooks:
+            try:
+                hook.committed(name, rows)
+            except Exception as e:
+                # The rows are in the database; failing here would spill them twice
+                print(f"Event writer: {type(hook).__name__} failed after commit ({e})")
+
+    def clip(self, name, rows):
+        """Cut over-long strings (a misread plate, say) to their column's length, in place."""
+        for column, length in self.lengths[name]:
+            for row in rows:
+                value = row.get(column)
+                if isinstance(value, str) and len(value) > length:
+                    row[column] = value[:length]
+
+    def copy(self, conn, table, rows):
+        """Bulk-load rows with PostgreSQL COPY (an unquoted empty CSV field is NULL)."""
+        columns = list(rows[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([row[c].isoformat() if isinstance(row[c], datetime) else row[c] for c in columns])
+        buffer.seek(0)
+        cursor = conn.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+    def spill_loop(self):
+        while True:
+            item = self.spill_queue.get()
+            if item is None:
+                return
+            name, rows, suffix = item
+            try:
+                self.save(name, rows, suffix)
+                if not suffix:
+                    self.spilled += len(rows)
+            except OSError as e:
+                print(f"Event writer: could not spill {len(rows)} {name} rows ({e})")
+
+    def save(self, name, rows, suffix=""):
+        """Write rows to a new spill file (suffix ".bad": set aside, never replayed)."""
+        path = os.path.join(self.spill_dir, f"{name}-{time.time_ns()}.jsonl")
+        # Written under a temporary name so replay never sees a partial file
+        with open(path + ".tmp", "w") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=lambda v: v.isoformat()))
+                f.write("\n")
+        os.replace(path + ".tmp", path + suffix)
+        return path + suffix
+
+    def spill_files(self):
+        return sorted(glob.glob(os.path.join(self.spill_dir, "*.jsonl")), key=os.path.getmtime)
+
+    def replay_one(self):
+        """
+        Load the oldest spill file back into the database; it is deleted only
+        once written. The file is claimed first (renamed to .replaying), so
+        no other writer on the same spill_dir can load it a second time. Rows
+        the database rejects go to a .bad file, for a look by hand, and the
+        rest of the file is written, so they cannot hold up anything else.
+        """
+        files = self.spill_files()
+        if not files:
+            return
+        path = files[0]
+        name = os.path.basename(path).rsplit("-", 1)[0]
+        table = self.tables.get(name)
+        if table is None:
+            # Not a table this writer knows: it would sit in front of every other file
+            try:
+                os.rename(path, path + ".bad")
+            except OSError:
+                pass
+            return
+        claimed = path + ".replaying"
+        try:
+            os.rename(path, claimed)
+        except OSError:
+            return  # taken by another writer
+        datetime_columns = [c.name for c in table.columns if isinstance(c.type, sa.DateTime)]
+        rows = []
+        with open(claimed) as f:
+            for line in f:
+                row = json.loads(line)
+                for column in datetime_columns:
+                    if row.get(column):
+                        row[column] = datetime.fromisoformat(row[column])
+                rows.append(row)
+        try:
+            self.write(name, rows)
+        except Exception as e:
+            self.failures += 1
+            if rejected(self.engine, e):
+                self.replay_rejected(path, claimed, name, rows, e)
+                return
+            self.retry_at = time.time() + self.retry_interval
+            print(f"Event writer: replay of {path} failed ({str(e).splitlines()[0]})")
+            os.rename(claimed, path)
+            return
+        try:
+            os.remove(claimed)
+        except OSError as e:
+            print(f"Event writer: could not remove {claimed} ({e})")
+        self.replayed += len(rows)
+        self.retry_at = 0.0
+
+    def replay_rejected(self, path, claimed, name, rows, error):
+        refused, unwritten = self.salvage(name, rows)
+        try:
+            # Saved before the claimed file goes, which has the only other copy
+            bad = self.save(name, refused, ".bad") if refused else None
+            if unwritten:
+                self.save(name, unwritten)
+        except OSError as e:
+            # Keep every row, even if some are now in the database as well
+            os.rename(claimed, path + ".bad")
+            print(f"Event writer: could not split {path} ({e}), moved to {path}.bad")
+            return
+        os.remove(claimed)
+        self.replayed += len(rows) - len(refused) - len(unwritten)
+        self.quarantined += len(refused)
+        print(f"Event writer: {len(refused)} of {len(rows)} rows of {path} rejected "
+              f"({str(error).splitlines()[0]}), set aside in {bad}")
+
+    def stop(self, timeout=5.0):
+        """Flush what is buffered (or spill it) and stop both threads."""
+        if not self.running:
+            return
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        for thread in (self.writer_thread, self.spill_thread):
+            if thread is not None:
+                thread.join(timeout)
+
+    def stats(self):
+        with self.cond:
+            pending = self.pending
+        return {
+            "pending": pending,
+            "written": self.written,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "failures": self.failures,
+            "quarantined": self.quarantined,
+            "spill_files": len(self.spill_files()),
+            "database_ok": self.retry_at == 0.0,
+        }
@@ -0,0 +1,190 @@
+import time
+from collections import deque
+from functools import partial
+from queue import Empty
+from threading import Condition, Lock
+
+# Events that carry a video frame, and the payload key holding it
+FRAME_EVENTS = {"video_frame": "entrance_frame", "video_frame_bin": "frame", "raw_frame": "frame"}
+
+
+def room_name(stream_id):
+    return f"stream:{stream_id}"
+
+
+def _frame_message(messages):
+    for event, payload in messages:
+        key = FRAME_EVENTS.get(event)
+        if key is not None and payload.get(key) is not None:
+            return event, payload
+    return None
+
+
+def _carry_frame(dropped, messages):
+    """
+    Frames identical to the previous one are sent without image data. When
+    the frame that did carry the image is dropped, move its image onto the
+    message that replaces it so the viewer still ends up with the newest picture.
+    """
+    old = _frame_message(dropped)
+    if old is None or _frame_message(messages) is not None:
+        return messages
+    event, payload = old
+    if event == "video_frame":
+        key = FRAME_EVENTS[event]
+        return [(e, dict(p, **{key: payload[key]}) if e == event else p) for e, p in messages]
+    return [old] + list(messages)
+
+
+class Outbox:
+    """
+    Bounded per-viewer, per-stream mailbox of encoded frames. Each item is the
+    list of (event, payload) messages of one frame.
+
+    Emitting never blocks (the Socket.IO server queues whatever it is given),
+    so the next frame is only handed out once the viewer has acknowledged
+    the previous one, or `ack_timeout` seconds after it was sent. Meanwhile
+    newer frames replace the oldest ones waiting, so a slow link only ever
+    costs that viewer frames, never latency or server memory.
+    """
+
+    def __init__(self, maxsize=1, ack_timeout=1.0):
+        self.maxsize = max(1, maxsize)
+        self.ack_timeout = ack_timeout
+        self.items = deque()
+        self.cond = Condition()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        # Sequence number of the last frame sent, and until when its ack is awaited
+        self.seq = 0
+        self.awaiting_until = None
+
+    def put(self, messages):
+        with self.cond:
+            if self.closed:
+                return False
+            while len(self.items) >= self.maxsize:
+                messages = _carry_frame(self.items.popleft(), messages)
+                self.dropped += 1
+            self.items.append(messages)
+            self.cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """
+        The next frame and its sequence number, once the previous frame was
+        acknowledged (or its ack timed out). Raises Empty after `timeout`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while not self.closed:
+                now = time.monotonic()
+                if self.awaiting_until is not None and now >= self.awaiting_until:
+                    self.awaiting_until = None
+                if self.items and self.awaiting_until is None:
+                    self.seq += 1
+                    self.sent += 1
+                    if self.ack_timeout is not None:
+                        self.awaiting_until = now + self.ack_timeout
+                    return self.items.popleft(), self.seq
+                wait = [t - now for t in (deadline, self.awaiting_until) if t is not None]
+                if deadline is not None and now >= deadline:
+                    break
+                self.cond.wait(min(wait) if wait else None)
+            raise Empty
+
+    def ack(self, seq, *args):
+        """Socket.IO acknowledgement of frame `seq` (any arguments the client sent are ignored)."""
+        with self.cond:
+            if seq == self.seq:
+                self.awaiting_until = None
+                self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.items.clear()
+            self.cond.notify_all()
+
+
+class ViewerHub:
+    """
+    Fans the frames of each stream out to the viewers subscribed to it.
+
+    Streams encode every frame once and `publish` the resulting messages;
+    the hub drops them into one Outbox per (viewer, stream), each drained by
+    its own sender task. The last message of every frame is emitted with an
+    acknowledgement callback, which paces that viewer's sender. Viewers also
+    join the stream's Socket.IO room, which carries the low-rate events (OCR
+    results, errors) that must not be dropped.
+    """
+
+    def __init__(self, socketio, outbox_size=1, ack_timeout=1.0):
+        self.socketio = socketio
+        self.outbox_size = outbox_size
+        self.ack_timeout = ack_timeout
+        self.lock = Lock()
+        self.outboxes = {}  # stream id -> {sid: Outbox}
+
+    def subscribe(self, sid, stream_id):
+        with self.lock:
+            viewers = self.outboxes.setdefault(stream_id, {})
+            if sid in viewers:
+                return False
+            outbox = viewers[sid] = Outbox(self.outbox_size, self.ack_timeout)
+        self.socketio.start_background_task(self.send_loop, sid, outbox)
+        return True
+
+    def unsubscribe(self, sid, stream_id):
+        with self.lock:
+            outbox = self.outboxes.get(stream_id, {}).pop(sid, None)
+        if outbox is not None:
+            outbox.close()
+        return outbox is not None
+
+    def remove_viewer(self, sid):
+        """Drop every subscription of a disconnected client."""
+        with self.lock:
+            outboxes = [viewers.pop(sid) for viewers in self.outboxes.values() if sid in viewers]
+        for outbox in outboxes:
+            outbox.close()
+
+    def subscribers(self, stream_id):
+        with self.lock:
+            return len(self.outboxes.get(stream_id, {}))
+
+    def publish(self, stream_id, messages):
+        """Queue one frame's messages for every viewer of `stream_id`."""
+        with self.lock:
+            outboxes = list(self.outboxes.get(stream_id, {}).values())
+        for outbox in outboxes:
+            outbox.put(messages)
+
+    def emit(self, stream_id, event, payload):
+        """Send a must-deliver event to the stream's room."""
+        self.socketio.emit(event, payload, to=room_name(stream_id))
+
+    def send_loop(self, sid, outbox):
+        while True:
+            try:
+                messages, seq = outbox.get(timeout=1.0)
+            except Empty:
+                if outbox.closed:
+                    return
+                continue
+            last = len(messages) - 1
+            for index, (event, payload) in enumerate(messages):
+                callback = partial(outbox.ack, seq) if index == last else None
+                self.socketio.emit(event, payload, to=sid, callback=callback)
+
+    def stats(self):
+        with self.lock:
+            return {
+                str(stream_id): {
+                    sid: {"sent": outbox.sent, "dropped": outbox.dropped, "depth": len(outbox.items),
+                          "awaiting_ack": outbox.awaiting_until is not None}
+                    for sid, outbox in viewers.items()
+                }
+                for stream_id, viewers in self.outboxes.items()
+            }
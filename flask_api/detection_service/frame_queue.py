@@ -0,0 +1,106 @@
+from collections import deque
+from queue import Empty
+from threading import Condition
+
+# Drop policies for a pipeline stage
+LOSSLESS = "lossless"        # block the producer when full (offline replay)
+DROP_OLDEST = "drop_oldest"  # evict the oldest item when full (live feeds)
+LATEST = "latest"            # keep only the newest item (live feeds, lowest latency)
+
+POLICIES = (LOSSLESS, DROP_OLDEST, LATEST)
+
+
+class FrameQueue:
+    """
+    Bounded, condition-variable based queue used between pipeline stages.
+    Consumers block until an item arrives instead of polling, and producers
+    never block unless the policy is lossless. Every item shed by the
+    policy is counted in `dropped`. `on_put` is called after every accepted
+    put, outside the queue lock, so another thread can wait on several queues.
+    """
+
+    def __init__(self, maxsize=10, policy=LOSSLESS, name="queue", on_drop=None, on_put=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown drop policy '{policy}', expected one of {POLICIES}")
+        self.maxsize = 1 if policy == LATEST else max(1, maxsize)
+        self.policy = policy
+        self.name = name
+        self.on_drop = on_drop
+        self.on_put = on_put
+        self.items = deque()
+        self.cond = Condition()
+        self.closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item, timeout=None):
+        """
+        Enqueue `item`. Returns False if the queue was closed, or if a
+        lossless put timed out, and True otherwise.
+        """
+        evicted = []
+        with self.cond:
+            if self.closed:
+                return False
+            if self.policy == LOSSLESS:
+                if not self.cond.wait_for(lambda: self.closed or len(self.items) < self.maxsize, timeout):
+                    return False
+                if self.closed:
+                    return False
+            else:
+                while len(self.items) >= self.maxsize:
+                    evicted.append(self.items.popleft())
+                self.dropped += len(evicted)
+            self.items.append(item)
+            self.put_count += 1
+            self.cond.notify_all()
+        if self.on_drop:
+            for old in evicted:
+                self.on_drop(old)
+        if self.on_put:
+            self.on_put()
+        return True
+
+    def get(self, timeout=None):
+        """
+        Block until an item is available and return it. Raises queue.Empty
+        on timeout, or once the queue is closed and drained.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.items or self.closed, timeout):
+                raise Empty
+            if not self.items:
+                raise Empty
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def get_nowait(self):
+        return self.get(timeout=0)
+
+    def close(self):
+        """Wake every blocked producer and consumer; later puts are refused."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def clear(self):
+        with self.cond:
+            items = list(self.items)
+            self.items.clear()
+            self.cond.notify_all()
+        if self.on_drop:
+            for item in items:
+                self.on_drop(item)
+
+    def qsize(self):
+        with self.cond:
+            return len(self.items)
+
+    def stats(self):
+        return {
+            "policy": self.policy,
+            "depth": self.qsize(),
+            "put": self.put_count,
+            "dropped": self.dropped,
+        }
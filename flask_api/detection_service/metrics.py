@@ -0,0 +1,148 @@
+"""
+Prometheus metrics for the camera pipelines, in the plain-text exposition
+format. Every stream keeps its own StreamMetrics: a handful of fixed-bucket
+histograms and counters behind one lock, so recording a sample is a bisect
+and two additions. Queue depths, drops and OCR pool/cache counters are not
+recorded at all; they are read from the pipeline's existing stats when
+/metrics is scraped.
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+
+# Pipeline stages with a latency histogram, in pipeline order
+STAGES = ("decode", "inference", "ocr", "color", "plot", "encode", "emit")
+
+# Seconds; covers a sub-millisecond colour pass up to a multi-second OCR backlog
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+COUNTERS = {
+    "frames_emitted": "Frames handed to the viewers",
+    "emitted_bytes": "Bytes of frame data handed to the viewers",
+    "ocr_calls": "Plate crops sent to OCR (inline or through the worker pool)",
+}
+
+
+class StreamMetrics:
+    """Stage latency histograms and counters of one stream."""
+
+    def __init__(self):
+        self.lock = Lock()
+        # stage -> [per-bucket counts (+Inf last), sum, count]
+        self.histograms = {stage: [[0] * (len(BUCKETS) + 1), 0.0, 0] for stage in STAGES}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def observe(self, stage, seconds):
+        index = bisect_left(BUCKETS, seconds)
+        with self.lock:
+            histogram = self.histograms[stage]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def add(self, counter, value=1):
+        with self.lock:
+            self.counters[counter] += value
+
+    def snapshot(self):
+        with self.lock:
+            histograms = {stage: (list(counts), total, count)
+                          for stage, (counts, total, count) in self.histograms.items()}
+            return histograms, dict(self.counters)
+
+
+def frame_bytes(messages):
+    """Bytes of frame data in a list of (event, payload) frame messages."""
+    total = 0
+    for _, payload in messages:
+        frame = payload.get("frame", payload.get("entrance_frame"))
+        if frame is not None:
+            total += len(frame)
+    return total
+
+
+def _escape(value):
+    """A label value as the text format quotes it: backslash, double quote and newline escaped."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def render(manager):
+    """The /metrics page for every stream of a StreamManager."""
+    lines = []
+
+    def header(name, kind, text):
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    streams = list(manager.streams.items())
+    snapshots = {stream_id: processor.metrics.snapshot()
+                 for stream_id, processor in streams if getattr(processor, "metrics", None) is not None}
+    pipelines = {stream_id: processor.pipeline_stats() for stream_id, processor in streams}
+
+    name = "kotsek_stage_latency_seconds"
+    header(name, "histogram", "Time spent per frame (or per batch for inference) in each pipeline stage")
+    for stream_id, (histograms, _) in snapshots.items():
+        for stage, (counts, total, count) in histograms.items():
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(camera=stream_id, stage=stage, le=bound)} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(camera=stream_id, stage=stage, le='+Inf')} {count}")
+            lines.append(f"{name}_sum{_labels(camera=stream_id, stage=stage)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(camera=stream_id, stage=stage)} {count}")
+
+    for counter, text in COUNTERS.items():
+        name = f"kotsek_{counter}_total"
+        header(name, "counter", text)
+        for stream_id, (_, counters) in snapshots.items():
+            lines.append(f"{name}{_labels(camera=stream_id)} {counters[counter]}")
+
+    header("kotsek_queue_depth", "gauge", "Items waiting in a pipeline queue")
+    for stream_id, stats in pipelines.items():
+        for queue, values in stats.items():
+            if queue.endswith("_queue") and isinstance(values, dict) and values.get("depth") is not None:
+                lines.append(f"kotsek_queue_depth{_labels(camera=stream_id, queue=queue)} {values['depth']}")
+
+    header("kotsek_dropped_frames_total", "counter", "Frames dropped by a pipeline queue's overflow policy")
+    for stream_id, stats in pipelines.items():
+        for queue, values in stats.items():
+            if queue.endswith("_queue") and isinstance(values, dict) and "dropped" in values:
+                lines.append(f"kotsek_dropped_frames_total{_labels(camera=stream_id, queue=queue)} {values['dropped']}")
+
+    caches = {stream_id: stats["ocr_cache"] for stream_id, stats in pipelines.items() if stats.get("ocr_cache")}
+    for key, text in (("hits", "Plate crops answered from the OCR cache"),
+                      ("misses", "Plate crops the OCR cache could not answer")):
+        header(f"kotsek_ocr_cache_{key}_total", "counter", text)
+        for stream_id, cache in caches.items():
+            lines.append(f"kotsek_ocr_cache_{key}_total{_labels(camera=stream_id)} {cache[key]}")
+
+    # The shared OCR pool exists once the models have loaded
+    if manager.ocr_pool is not None:
+        pool = manager.ocr_pool.stats()
+        header("kotsek_ocr_pool", "gauge", "Shared OCR worker pool: pending and in-flight crops")
+        lines.append(f"kotsek_ocr_pool{_labels(state='pending')} {pool['pending']}")
+        lines.append(f"kotsek_ocr_pool{_labels(state='in_flight')} {pool['in_flight']}")
+        header("kotsek_ocr_pool_crops_total", "counter", "Shared OCR worker pool crop counters")
+        for state in ("submitted", "completed", "dropped_full", "dropped_stale", "failed"):
+            lines.append(f"kotsek_ocr_pool_crops_total{_labels(state=state)} {pool[state]}")
+        header("kotsek_ocr_pool_worker_restarts_total", "counter", "OCR worker processes restarted after dying")
+        lines.append(f"kotsek_ocr_pool_worker_restarts_total {pool['restarts']}")
+
+    return "\n".join(lines) + "\n"
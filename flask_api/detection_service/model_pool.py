@@ -0,0 +1,172 @@
+"""
+Pre-initialised, warmed-up model instances. Constructing a YOLO or PaddleOCR
+object costs seconds, and so do the first calls through it (lazy weight
+loading, kernel selection, allocator growth). A ModelPool pays for both
+ahead of time and hands ready instances to streams as they start, instead
+of every VideoProcessor building its own.
+"""
+import time
+from threading import Lock
+import cv2
+import numpy as np
+from detection_service.backends import load_model
+from detection_service.controller import LEVELS
+from detection_service.ocr import read_rois
+
+
+def warmup_frames(size, count=1):
+    """Noisy frames at the detector input size, the same on every run."""
+    width, height = size
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def warmup_plate():
+    """A plate-like crop: dark text on a light background."""
+    crop = np.full((48, 160, 3), 235, dtype=np.uint8)
+    cv2.putText(crop, "ABC 1234", (8, 34), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (20, 20, 20), 2)
+    return crop
+
+
+def warm_up_detector(model, config, runs=2):
+    """
+    Run dummy batches through `model` at the configured batch size and at
+    every input size it can be asked for, so the first real frames do not
+    pay for lazy initialisation. The adaptive controller's reduced `imgsz`
+    levels each get their own pass.
+    """
+    frames = warmup_frames(config.input_size, config.batch_size)
+    sizes = [None]
+    if config.adaptive:
+        sizes += sorted({level["imgsz"] for level in LEVELS if level["imgsz"]}, reverse=True)
+    for imgsz in sizes:
+        kwargs = {"conf": config.conf, "iou": config.iou, "verbose": False}
+        if imgsz is not None:
+            kwargs["imgsz"] = imgsz
+        for _ in range(runs):
+            model(frames, **kwargs)
+
+
+def warm_up_ocr(ocr, backend="full", use_angle_cls=True, batch_size=1, runs=2):
+    """Read dummy plate crops, in batches of `batch_size`, with the given OCR backend."""
+    crops = [warmup_plate()] * max(1, batch_size)
+    for _ in range(runs):
+        read_rois(ocr, crops, backend, use_angle_cls)
+
+
+class ModelPool:
+    """
+    Up to `size` idle instances built by `factory` and passed through
+    `warm_up`. `acquire` hands out an idle instance, or builds a fresh one
+    when the pool is empty, so callers never wait on each other; `release`
+    puts an instance back for the next stream.
+    """
+
+    def __init__(self, factory, size=1, warm_up=None, name="model"):
+        self.factory = factory
+        self.size = max(0, size)
+        self.warm_up = warm_up
+        self.name = name
+        self.lock = Lock()
+        self.idle = []
+        self.created = 0
+        self.reused = 0
+        self.build_seconds = 0.0
+
+    def create(self):
+        started = time.time()
+        instance = self.factory()
+        if self.warm_up is not None:
+            self.warm_up(instance)
+        elapsed = time.time() - started
+        with self.lock:
+            self.created += 1
+            self.build_seconds += elapsed
+        print(f"{self.name} ready in {elapsed:.1f}s")
+        return instance
+
+    def fill(self):
+        """Build instances until `size` are idle."""
+        while True:
+            with self.lock:
+                if len(self.idle) >= self.size:
+                    return
+            instance = self.create()
+            with self.lock:
+                self.idle.append(instance)
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                self.reused += 1
+                return self.idle.pop()
+        return self.create()
+
+    def release(self, instance):
+        if instance is None:
+            return
+        with self.lock:
+            if len(self.idle) < self.size:
+                self.idle.append(instance)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "idle": len(self.idle),
+                "size": self.size,
+                "created": self.created,
+                "reused": self.reused,
+                "avg_build_s": self.build_seconds / self.created if self.created else 0.0,
+            }
+
+
+# One pool per model configuration, shared by every processor in the process
+_pools = {}
+_pools_lock = Lock()
+
+
+def _pool(key, build):
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = build()
+        return pool
+
+
+def detector_pool(model_path, config):
+    """The pool of warmed detectors for `model_path` on the configured backend."""
+    key = ("detector", model_path, config.model_backend, config.model_int8)
+
+    def build():
+        def factory():
+            return load_model(model_path, config.model_backend, config.model_int8,
+                              calibration_video=config.calibration_video or None)
+        warm_up = (lambda model: warm_up_detector(model, config)) if config.warmup else None
+        return ModelPool(factory, config.model_pool_size, warm_up, name=f"Detector ({config.model_backend})")
+
+    return _pool(key, build)
+
+
+def paddle_pool(config, use_angle_cls=True):
+    """The pool of warmed in-process PaddleOCR instances (inline OCR)."""
+    key = ("paddleocr", config.ocr_backend, use_angle_cls)
+
+    def build():
+        def factory():
+            from paddleocr import PaddleOCR
+
+            # Simplified PaddleOCR initialization for ANPR
+            return PaddleOCR(use_angle_cls=True, lang='en', use_gpu=False)
+        warm_up = None
+        if config.warmup:
+            def warm_up(ocr):
+                warm_up_ocr(ocr, config.ocr_backend, use_angle_cls, config.ocr_batch_size)
+        return ModelPool(factory, config.model_pool_size, warm_up, name="PaddleOCR")
+
+    return _pool(key, build)
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
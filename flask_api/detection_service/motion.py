@@ -0,0 +1,61 @@
+import cv2
+
+
+class MotionGate:
+    """
+    Cheap scene-change check in front of the detector. Each frame is shrunk
+    by `scale`, converted to grayscale and blurred, then compared with the
+    last frame the detector actually ran on. The frame counts as static when
+    fewer than `min_area` (a fraction of the image) of its pixels differ by
+    more than `threshold` grey levels. Comparing against the last inferred
+    frame rather than the previous one means slow movement still adds up to
+    a change. Every `refresh_frames` skipped frames, one frame is let through
+    regardless, so lighting drift and missed changes cannot stick forever.
+    """
+
+    def __init__(self, threshold=25, min_area=0.005, scale=4, refresh_frames=30):
+        self.threshold = threshold
+        self.min_area = min_area
+        self.scale = max(1, scale)
+        self.refresh_frames = refresh_frames
+        self.reset()
+
+    def reset(self):
+        self.reference = None
+        self.since_refresh = 0
+        self.frames = 0
+        self.skipped = 0
+
+    def thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        small = cv2.resize(frame, (max(1, width // self.scale), max(1, height // self.scale)),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed_fraction(self, gray):
+        diff = cv2.absdiff(gray, self.reference)
+        _, mask = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(mask) / float(mask.size)
+
+    def check(self, frame):
+        """True if the detector should run on `frame`."""
+        self.frames += 1
+        gray = self.thumbnail(frame)
+        run = (self.reference is None or self.reference.shape != gray.shape
+               or self.since_refresh >= self.refresh_frames
+               or self.changed_fraction(gray) >= self.min_area)
+        if run:
+            self.reference = gray
+            self.since_refresh = 0
+        else:
+            self.skipped += 1
+            self.since_refresh += 1
+        return run
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / self.frames if self.frames else 0.0,
+        }
@@ -0,0 +1,373 @@
+"""
+Multi-process execution of one stream, for hosts with many cores:
+
+    decode --ring--> detect (+ OCR worker pool) --ring--> encode --> emit
+
+Decode, detect and encode each run in their own process, so colour
+analysis, OCR post-processing and JPEG encoding no longer compete with
+inference for one GIL. Frames live in a multiprocessing.shared_memory ring
+and never cross a queue; the stages only pass slot indexes and small
+metadata (timestamps, detection dicts, the final JPEG). Emitting stays in
+this process, which owns the Socket.IO server.
+
+The decode and encode processes only import OpenCV/NumPy; the detector and
+PaddleOCR are loaded in the detect process alone.
+"""
+import atexit
+import multiprocessing
+import time
+from dataclasses import replace
+from multiprocessing import shared_memory
+from queue import Empty, Full
+from threading import Lock, Thread
+import numpy as np
+from detection_service.config import PipelineConfig
+from detection_service.decoder import Pacer, open_decoder
+from detection_service.encoding import FrameEncoder, frame_messages
+from detection_service.metrics import StreamMetrics, frame_bytes
+from detection_service.stats import StreamStats
+
+# How long a stage blocks on a queue before re-checking the stop flag
+_POLL = 0.5
+
+
+class SharedFrameRing:
+    """
+    `slots` frames of `shape` (uint8) in a single shared memory block. The
+    creating process owns the block; the stages attach to it by name.
+    """
+
+    def __init__(self, shape, slots, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        size = int(np.prod(self.shape)) * slots
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def spec(self):
+        """Everything another process needs to attach: (name, shape, slots)."""
+        return self.shm.name, self.shape, self.slots
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, slots = spec
+        return cls(shape, slots, name=name)
+
+    def view(self, slot):
+        return self.frames[slot]
+
+    def close(self):
+        if self.frames is None:
+            return
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class QueueEmitter:
+    """Stand-in for the Socket.IO server inside a stage: events go back to the parent."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def emit(self, event, payload, **kwargs):
+        self.events.put((event, payload))
+
+
+def _put(queue, item, stop):
+    """Blocking put that gives up once the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=_POLL)
+            return True
+        except Full:
+            continue
+    return False
+
+
+def _decode_stage(ring_spec, free_slots, out_queue, events, stop, source, config, live, stream_id):
+    ring = SharedFrameRing.attach(ring_spec)
+    decoder = open_decoder(source, config.input_size, config.decoder, live)
+    if not decoder.is_opened():
+        events.put(("video_error", {"stream_id": stream_id, "error": "Video file not available"}))
+    else:
+        pacer = Pacer(decoder.fps, config.realtime_pacing and not live)
+        while not stop.is_set():
+            try:
+                slot = free_slots.get(timeout=_POLL)
+            except Empty:
+                continue
+            if not decoder.read_into(ring.view(slot)):
+                free_slots.put(slot)
+                break
+            item = (slot, time.time())
+            if live:
+                # Never queue stale live frames: drop this one if detect is behind
+                try:
+                    out_queue.put_nowait(item)
+                except Full:
+                    free_slots.put(slot)
+            elif not _put(out_queue, item, stop):
+                break
+            pacer.wait()
+    decoder.release()
+    _put(out_queue, None, stop)
+    ring.close()
+
+
+def _detect_stage(ring_spec, in_queue, out_queue, events, stop, source, model_path, config, stream_id):
+    # Heavy imports stay out of the other stages
+    from detection_service.detection import VideoProcessor
+
+    ring = SharedFrameRing.attach(ring_spec)
+    processor = VideoProcessor(QueueEmitter(events), source, model_path, config, stream_id=stream_id)
+    finished = False
+    while not finished and not stop.is_set():
+        try:
+            item = in_queue.get(timeout=_POLL)
+        except Empty:
+            continue
+        items = []
+        # Micro-batch whatever is already waiting, up to batch_size
+        while item is not None:
+            items.append(item)
+            if len(items) >= config.batch_size:
+                break
+            try:
+                item = in_queue.get_nowait()
+            except Empty:
+                break
+        finished = item is None
+        if not items:
+            continue
+        frames = [ring.view(slot) for slot, _ in items]
+        infer_start = time.time()
+        frames_in, results = processor.detect(frames)
+        inferred = sum(result is not None for result in results)
+        if inferred:
+            processor.batch_stats.record([0.0] * inferred, time.time() - infer_start)
+        first_id = processor.frame_id + 1
+        outputs = processor.annotate_batch(frames_in, results)
+        for offset, ((annotated, detections), (slot, captured_at)) in enumerate(zip(outputs, items)):
+            if annotated is not frames[offset]:
+                # Plotted boxes go back into the slot for the encode stage
+                np.copyto(frames[offset], annotated)
+            inferred_frame = results[offset] is not None
+            if not _put(out_queue, (slot, first_id + offset, captured_at, detections, inferred_frame), stop):
+                break
+        if processor.batch_stats.batches >= config.report_interval:
+            print(f"[{stream_id}] " + processor.batch_stats.format(config.batch_size, 0))
+            processor.batch_stats.reset()
+    _put(out_queue, None, stop)
+    if processor.ocr_pool is not None:
+        processor.ocr_pool.shutdown()
+    ring.close()
+
+
+def _encode_stage(ring_spec, free_slots, in_queue, out_queue, stop, config):
+    ring = SharedFrameRing.attach(ring_spec)
+    encoder = FrameEncoder(config)
+    while not stop.is_set():
+        try:
+            item = in_queue.get(timeout=_POLL)
+        except Empty:
+            continue
+        if item is None:
+            break
+        slot, frame_id, captured_at, detections, inferred = item
+        result = encoder.encode(frame_id, ring.view(slot), detections)
+        free_slots.put(slot)
+        result["captured_at"] = captured_at
+        result["inferred"] = inferred
+        if not _put(out_queue, result, stop):
+            break
+    _put(out_queue, None, stop)
+    ring.close()
+
+
+class ProcessPipeline:
+    """
+    Drop-in alternative to a standalone VideoProcessor (same start/stop/
+    join/stats surface) that runs the stages as separate processes.
+    """
+
+    def __init__(self, socketio, video_path, model_path="./sample/best.pt", config=None,
+                 stream_id=None, hub=None, events=None):
+        from detection_service.detection import is_live_source
+
+        self.socketio = socketio
+        self.video_path = video_path
+        self.model_path = model_path
+        self.stream_id = stream_id
+        self.hub = hub
+        self.events = events
+        self.scheduler = None
+        # The detect process reads plates through its own OCR worker pool
+        self.config = replace(config or PipelineConfig.from_env(), ocr_mode="async")
+        self.live = is_live_source(video_path)
+        self.ctx = multiprocessing.get_context("spawn")
+        self.running = False
+        # Generation of the current run, as in VideoProcessor
+        self.run = 0
+        self.ring = None
+        self.stop_event = None
+        self.release_lock = Lock()
+        self.queues = {}
+        self.processes = []
+        self.emit_thread = None
+        self.events_thread = None
+        self.stream_stats = StreamStats()
+        # Only the emit stage runs in this process, so only it is measured here
+        self.metrics = StreamMetrics()
+        atexit.register(self.stop)
+
+    def start(self):
+        if self.running:
+            return
+        self.join(timeout=2.0)
+        config = self.config
+        width, height = config.input_size
+        slots = config.frame_buffers or 2 * config.queue_size + config.batch_size + 2
+        self.ring = SharedFrameRing((height, width, 3), slots)
+        self.stop_event = self.ctx.Event()
+        free_slots = self.ctx.Queue()
+        for slot in range(slots):
+            free_slots.put(slot)
+        # Live feeds keep the hand-off to detect short so frames stay fresh
+        decoded = self.ctx.Queue(maxsize=2 if self.live else config.queue_size)
+        detected = self.ctx.Queue(maxsize=config.queue_size)
+        encoded = self.ctx.Queue(maxsize=config.queue_size)
+        events = self.ctx.Queue()
+        self.queues = {"free_slots": free_slots, "decoded": decoded, "detected": detected,
+                       "encoded": encoded, "events": events}
+        spec = self.ring.spec
+        self.processes = [
+            self.ctx.Process(target=_decode_stage, daemon=True, name=f"decode-{self.stream_id}",
+                             args=(spec, free_slots, decoded, events, self.stop_event, self.video_path,
+                                   config, self.live, self.stream_id)),
+            # Not a daemon: the detect stage starts its own OCR worker processes
+            self.ctx.Process(target=_detect_stage, daemon=False, name=f"detect-{self.stream_id}",
+                             args=(spec, decoded, detected, events, self.stop_event, self.video_path,
+                                   self.model_path, config, self.stream_id)),
+            self.ctx.Process(target=_encode_stage, daemon=True, name=f"encode-{self.stream_id}",
+                             args=(spec, free_slots, detected, encoded, self.stop_event, config)),
+        ]
+        self.run += 1
+        self.running = True
+        self.stream_stats.reset()
+        for process in self.processes:
+            process.start()
+        # The emit thread tears down the processes and ring of its own run
+        self.emit_thread = Thread(target=self.emit_frames, daemon=True,
+                                  args=(self.run, encoded, self.stop_event, self.processes, self.ring))
+        self.events_thread = Thread(target=self.forward_events, daemon=True, args=(self.run,))
+        self.emit_thread.start()
+        self.events_thread.start()
+        print(f"Video processing started ({len(self.processes)} processes).")
+
+    def publish(self, messages):
+        if self.hub is not None:
+            self.hub.publish(self.stream_id, messages)
+            return
+        for event, payload in messages:
+            self.socketio.emit(event, payload)
+
+    def notify(self, event, payload):
+        if self.hub is not None:
+            self.hub.emit(self.stream_id, event, payload)
+        else:
+            self.socketio.emit(event, payload)
+
+    def forward_events(self, run):
+        events = self.queues["events"]
+        while self.running and self.run == run:
+            try:
+                event, payload = events.get(timeout=_POLL)
+            except Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            if event == "ocr_result" and self.events is not None:
+                # Plate reads happen in the detect process; they are persisted here
+                self.events.record_plate_read(self.stream_id, payload.get("ocr_text"), payload.get("confidence"),
+                                              frame_id=payload.get("frame_id"), track_id=payload.get("track_id"),
+                                              plate=payload.get("plate"), plate_confidence=payload.get("plate_confidence"))
+            self.notify(event, payload)
+
+    def emit_frames(self, run, encoded, stop_event, processes, ring):
+        frame_count = 0
+        while self.running and self.run == run:
+            try:
+                result = encoded.get(timeout=_POLL)
+            except Empty:
+                continue
+            if result is None:
+                break
+            frame_count += 1
+            self.stream_stats.record(time.time() - result["captured_at"])
+            fps = self.stream_stats.fps()
+            with self.metrics.time("emit"):
+                messages = frame_messages(result, fps, self.config, self.stream_id)
+                self.publish(messages)
+            self.metrics.add("frames_emitted")
+            self.metrics.add("emitted_bytes", frame_bytes(messages))
+            if self.events is not None and result["inferred"]:
+                # Only what the model saw: reused detections would be stored again every frame
+                self.events.record_detections(self.stream_id, result)
+            if frame_count % 30 == 0:
+                latency = self.stream_stats.summary()
+                print(f"[{self.stream_id or 'stream'}] Processing FPS: {fps:.2f} | "
+                      f"latency avg {latency['avg_latency_ms']:.0f} ms, p95 {latency['p95_latency_ms']:.0f} ms")
+        if self.run == run:
+            self.running = False
+        # Stopped or finished: wait for the stages and free the shared memory
+        stop_event.set()
+        self.release(processes, ring)
+        print("Video stream stopped.")
+
+    def pipeline_stats(self):
+        stats = {}
+        for name, queue in self.queues.items():
+            try:
+                stats[f"{name}_queue"] = {"depth": queue.qsize()}
+            except NotImplementedError:
+                # qsize() is unavailable on macOS
+                stats[f"{name}_queue"] = {"depth": None}
+        stats["processes"] = {process.name: process.is_alive() for process in self.processes}
+        return stats
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.stop_event.set()
+        print("Stopping video processing.")
+
+    def close(self):
+        self.stop()
+        self.join(timeout=2.0)
+
+    def release(self, processes, ring, timeout=2.0):
+        """Join (or terminate) the stage processes of a run, then unlink its ring."""
+        for process in processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout)
+        # The stages only release the shared ring once they have exited
+        with self.release_lock:
+            if ring is not None:
+                ring.close()
+            if self.ring is ring:
+                self.ring = None
+                self.processes = []
+
+    def join(self, timeout=None):
+        for thread in (self.emit_thread, self.events_thread):
+            if thread is not None and thread.is_alive():
+                thread.join(timeout)
+        if self.processes or self.ring is not None:
+            self.release(self.processes, self.ring, 2.0 if timeout is None else timeout)
@@ -0,0 +1,110 @@
+import cv2
+
+
+def crop_roi(image, box, padding=10):
+    """
+    Crop the padded ROI for `box` (x1, y1, x2, y2) out of `image`, upscaled if
+    it is too small for reliable OCR and always 3-channel. Returns None when
+    the crop is empty.
+    """
+    x1, y1, x2, y2 = map(int, box)
+    y1 = max(0, y1 - padding)
+    y2 = min(image.shape[0], y2 + padding)
+    x1 = max(0, x1 - padding)
+    x2 = min(image.shape[1], x2 + padding)
+    roi = image[y1:y2, x1:x2]
+    if roi.size == 0:
+        return None
+
+    # Upscale ROI if too small for better OCR accuracy
+    h, w = roi.shape[:2]
+    if w < 100 or h < 30:
+        scale_factor = 2
+        roi = cv2.resize(roi, (w * scale_factor, h * scale_factor), interpolation=cv2.INTER_CUBIC)
+
+    # Ensure ROI is 3-channel
+    if len(roi.shape) == 2:
+        roi = cv2.cvtColor(roi, cv2.COLOR_GRAY2BGR)
+    return roi
+
+
+def ocr_lines(ocr_result):
+    """
+    Yield (text, confidence) for every recognised line of a PaddleOCR result.
+    Older PaddleOCR releases return a flat list of lines, newer ones wrap the
+    lines in one list per input image (and use None for an empty image).
+    """
+    for item in ocr_result or []:
+        if not item:
+            continue
+        if len(item) == 2 and isinstance(item[1], (list, tuple)) and isinstance(item[1][0], str):
+            yield item[1][0], float(item[1][1])
+        else:
+            for line in item:
+                if line:
+                    yield line[1][0], float(line[1][1])
+
+
+def combine_lines(lines):
+    """Join recognised lines into one plate string with their mean confidence."""
+    lines = list(lines)
+    if not lines:
+        return "", 0.0
+    text = " ".join(text for text, _ in lines).strip()
+    confidence = sum(conf for _, conf in lines) / len(lines)
+    return text, confidence
+
+
+def _rec_lines(rec_result):
+    """Yield (text, confidence) pairs from a recognition-only (det=False) result."""
+    for item in rec_result or []:
+        if not item:
+            continue
+        if isinstance(item, (list, tuple)) and len(item) == 2 and isinstance(item[0], str):
+            yield item[0], float(item[1])
+        else:
+            yield from _rec_lines(item)
+
+
+def recognize_batch(ocr, rois, use_angle_cls=False):
+    """
+    Recognition-only OCR for crops that YOLO has already localised. All crops
+    go through PaddleOCR's text recognizer as one batch, skipping the text
+    detector entirely; the angle classifier only runs if asked for.
+    Returns one (text, confidence) pair per crop.
+    """
+    rois = list(rois)
+    if not rois:
+        return []
+    recognizer = getattr(ocr, "text_recognizer", None)
+    if recognizer is None:
+        # PaddleOCR build without the internal recognizer attribute: fall back
+        # to its public recognition-only mode, one crop at a time
+        return [combine_lines(_rec_lines(ocr.ocr(roi, det=False, cls=use_angle_cls))) for roi in rois]
+    classifier = getattr(ocr, "text_classifier", None)
+    if use_angle_cls and classifier is not None:
+        rois, _, _ = classifier(rois)
+    rec_res, _ = recognizer(rois)
+    return [(text.strip(), float(confidence)) for text, confidence in rec_res]
+
+
+def read_rois(ocr, rois, backend="full", use_angle_cls=True):
+    """
+    Read every crop in `rois` with the selected backend: "full" runs the
+    complete detect/classify/recognize stack per crop, "rec" batches the
+    crops through recognition only.
+    """
+    if backend == "rec":
+        try:
+            return recognize_batch(ocr, rois, use_angle_cls)
+        except Exception as e:
+            print(f"OCR Error: {e}")
+            return [("", 0.0)] * len(rois)
+    results = []
+    for roi in rois:
+        try:
+            results.append(combine_lines(ocr_lines(ocr.ocr(roi, cls=use_angle_cls))))
+        except Exception as e:
+            print(f"OCR Error: {e}")
+            results.append(("", 0.0))
+    return results
@@ -0,0 +1,97 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+import cv2
+import numpy as np
+
+# Number of set bits for every byte value, for vectorized Hamming distances
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def dhash(roi, hash_size=16):
+    """
+    Difference hash of a crop: shrink to a (hash_size + 1) x hash_size
+    grayscale thumbnail and record whether each pixel is brighter than its
+    right-hand neighbour. Robust to scale, small shifts and global brightness
+    changes. Returned as packed bits (hash_size**2 / 8 bytes).
+    """
+    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if roi.ndim == 3 else roi
+    thumb = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return np.packbits(thumb[:, 1:] > thumb[:, :-1])
+
+
+class PlateCache:
+    """
+    OCR result cache keyed by the perceptual hash of the plate crop. A lookup
+    hits when a stored hash is within `max_distance` bits of the query, so the
+    near-identical crops of a parked or slow car all share one OCR call.
+    Bounded to `max_size` entries with LRU eviction; entries older than `ttl`
+    seconds are treated as misses and dropped.
+    """
+
+    def __init__(self, max_size=512, max_distance=10, ttl=30.0, hash_size=16):
+        self.max_size = max(1, max_size)
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.hash_size = hash_size
+        self.entries = OrderedDict()  # hash bytes -> (text, confidence, stored_at)
+        self.lock = Lock()
+        self._matrix = None
+        self._keys = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, roi):
+        return dhash(roi, self.hash_size).tobytes()
+
+    def _nearest(self, key):
+        if key in self.entries:
+            return key
+        if not self.entries:
+            return None
+        if self._matrix is None:
+            self._keys = list(self.entries)
+            self._matrix = np.frombuffer(b"".join(self._keys), dtype=np.uint8).reshape(len(self._keys), -1)
+        query = np.frombuffer(key, dtype=np.uint8)
+        distances = _POPCOUNT[self._matrix ^ query].sum(axis=1, dtype=np.int32)
+        best = int(np.argmin(distances))
+        return self._keys[best] if distances[best] <= self.max_distance else None
+
+    def lookup(self, key):
+        """Return the cached (text, confidence) for a crop hash, or None."""
+        with self.lock:
+            match = self._nearest(key)
+            if match is not None:
+                text, confidence, stored_at = self.entries[match]
+                if self.ttl is None or time.time() - stored_at <= self.ttl:
+                    self.entries.move_to_end(match)
+                    self.hits += 1
+                    return text, confidence
+                del self.entries[match]
+                self._matrix = None
+            self.misses += 1
+            return None
+
+    def store(self, key, text, confidence):
+        # Empty reads are not cached so unreadable crops are retried later
+        if not text:
+            return
+        with self.lock:
+            self.entries[key] = (text, confidence, time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,129 @@
+"""
+Parity check between the full PaddleOCR path and the recognition-only
+fast path, on plate crops taken from a recorded clip:
+
+    python -m detection_service.ocr_parity ./sample/mamamo.mov --frames 300
+
+Both paths read exactly the same YOLO crops, so the report shows how often
+the fast path agrees with the current one and how much time it saves.
+"""
+import argparse
+import json
+import time
+import cv2
+from paddleocr import PaddleOCR
+from ultralytics import YOLO
+from detection_service.ocr import crop_roi, read_rois
+from detection_service.tracker import normalize_plate
+
+
+def collect_crops(video_path, model, max_frames, stride, size, conf, iou):
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open {video_path}")
+    crops = []
+    index = 0
+    sampled = 0
+    while sampled < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        index += 1
+        if (index - 1) % stride:
+            continue
+        sampled += 1
+        frame = cv2.resize(frame, size)
+        result = model(frame, conf=conf, iou=iou, verbose=False)[0]
+        for box in result.boxes.xyxy.cpu().numpy():
+            roi = crop_roi(frame, box)
+            if roi is not None:
+                crops.append(roi)
+    cap.release()
+    return crops
+
+
+def _edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def _timed_read(ocr, crops, backend, use_angle_cls, batch_size):
+    start = time.perf_counter()
+    texts = []
+    for i in range(0, len(crops), batch_size):
+        texts.extend(read_rois(ocr, crops[i:i + batch_size], backend, use_angle_cls))
+    return texts, time.perf_counter() - start
+
+
+def compare(full, rec):
+    exact = 0
+    similarity = 0.0
+    disagreements = []
+    for (full_text, _), (rec_text, _) in zip(full, rec):
+        a, b = normalize_plate(full_text), normalize_plate(rec_text)
+        if a == b:
+            exact += 1
+            similarity += 1.0
+            continue
+        similarity += 1.0 - _edit_distance(a, b) / max(len(a), len(b))
+        disagreements.append({"full": a, "rec": b})
+    total = max(len(full), 1)
+    return {
+        "exact_match_rate": exact / total,
+        "mean_char_similarity": similarity / total,
+        "disagreements": disagreements[:50],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="Recorded clip to sample plate crops from")
+    parser.add_argument("--model", default="./sample/best.pt")
+    parser.add_argument("--frames", type=int, default=300, help="Number of frames to sample")
+    parser.add_argument("--stride", type=int, default=5, help="Sample every Nth frame")
+    parser.add_argument("--batch-size", type=int, default=8, help="Crops per recognition-only call")
+    parser.add_argument("--angle-cls", action="store_true", help="Run angle classification on the fast path")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    model = YOLO(args.model)
+    ocr = PaddleOCR(use_angle_cls=True, lang='en', use_gpu=False, show_log=False)
+    crops = collect_crops(args.video, model, args.frames, args.stride, (640, 480), 0.5, 0.5)
+    if not crops:
+        raise SystemExit("No detections found in the sampled frames")
+
+    # Warm both paths up once so model initialisation is not timed
+    read_rois(ocr, crops[:1], "full", True)
+    read_rois(ocr, crops[:1], "rec", args.angle_cls)
+
+    full, full_seconds = _timed_read(ocr, crops, "full", True, 1)
+    rec, rec_seconds = _timed_read(ocr, crops, "rec", args.angle_cls, args.batch_size)
+
+    report = {
+        "video": args.video,
+        "crops": len(crops),
+        "full_ms_per_plate": 1000.0 * full_seconds / len(crops),
+        "rec_ms_per_plate": 1000.0 * rec_seconds / len(crops),
+        "speedup": full_seconds / rec_seconds if rec_seconds > 0 else 0.0,
+        "rec_batch_size": args.batch_size,
+        "rec_angle_cls": args.angle_cls,
+    }
+    report.update(compare(full, rec))
+
+    print(f"Crops: {report['crops']}")
+    print(f"Full path: {report['full_ms_per_plate']:.1f} ms/plate")
+    print(f"Recognition-only: {report['rec_ms_per_plate']:.1f} ms/plate ({report['speedup']:.1f}x faster)")
+    print(f"Exact agreement: {report['exact_match_rate']:.1%} | "
+          f"mean character similarity: {report['mean_char_similarity']:.1%}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
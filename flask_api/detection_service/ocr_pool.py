@@ -0,0 +1,270 @@
+import atexit
+import multiprocessing
+import time
+from itertools import count
+from multiprocessing.connection import wait
+from threading import Condition, Thread
+from detection_service.ocr import read_rois
+
+
+# A worker that dies within this many seconds of starting is not restarted
+# right away, so one that cannot start does not respawn in a tight loop
+RESTART_DELAY = 5.0
+
+# What a worker sends once its PaddleOCR is built and warmed up
+READY = "ready"
+
+
+def _ocr_worker(job_queue, result_conn, ocr_kwargs, backend, use_angle_cls, batch_size, warmup):
+    """Worker process: owns one PaddleOCR instance and reads crop batches until told to stop."""
+    from paddleocr import PaddleOCR
+    ocr = PaddleOCR(**ocr_kwargs)
+    if warmup:
+        # Before the first job, so the first real plates do not wait on lazy initialisation
+        from detection_service.model_pool import warm_up_ocr
+        warm_up_ocr(ocr, backend, use_angle_cls, batch_size)
+    result_conn.send(READY)
+    while True:
+        batch = job_queue.get()
+        if batch is None:
+            break
+        job_ids = [job_id for job_id, _ in batch]
+        texts = read_rois(ocr, [roi for _, roi in batch], backend, use_angle_cls)
+        result_conn.send([(job_id, text, confidence) for job_id, (text, confidence) in zip(job_ids, texts)])
+
+
+class OCRJob:
+    def __init__(self, job_id, roi, confidence, callback):
+        self.job_id = job_id
+        self.roi = roi
+        self.confidence = confidence
+        self.callback = callback
+        self.submitted_at = time.time()
+
+
+class OCRWorkerPool:
+    """
+    Bounded pool of OCR worker processes, each with its own PaddleOCR.
+
+    `submit` never blocks the caller: crops wait in a small local backlog and
+    are handed to the workers only when one is free, so at most `workers`
+    batches of up to `batch_size` crops are in flight. When the backlog is
+    full, stale crops are shed first, then the lowest-confidence one
+    (possibly the new crop itself).
+    Results are delivered through each job's callback on a collector thread,
+    which also restarts workers that died; the crops they held are counted
+    as failed. `wait_ready` blocks until every worker has warmed up.
+    """
+
+    def __init__(self, workers=2, max_pending=32, max_age=2.0, ocr_kwargs=None,
+                 backend="full", use_angle_cls=True, batch_size=8, warmup=True):
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max(1, max_pending)
+        self.max_age = max_age
+        ocr_kwargs = ocr_kwargs or {"use_angle_cls": True, "lang": "en", "use_gpu": False, "show_log": False}
+
+        # Paddle is not fork-safe, so always spawn fresh interpreters
+        self.ctx = multiprocessing.get_context("spawn")
+        self.worker_args = (ocr_kwargs, backend, use_angle_cls, self.batch_size, warmup)
+        # One job queue and one result pipe per worker: the batch a dead
+        # worker held is known, and dying mid-write breaks only its own pipe
+        self.job_queues = [None] * self.workers
+        self.result_conns = [None] * self.workers
+        self.processes = [None] * self.workers
+        self.started_at = [0.0] * self.workers
+        # Job ids of the batch each worker is reading, None while it is free
+        self.assigned = [None] * self.workers
+        self.ready = [False] * self.workers
+
+        self.cond = Condition()
+        self.pending = []
+        self.in_flight = {}
+        self.running = True
+        self._ids = count(1)
+        self.submitted = 0
+        self.completed = 0
+        self.dropped_full = 0
+        self.dropped_stale = 0
+        self.failed = 0
+        self.restarts = 0
+
+        for worker in range(self.workers):
+            self._spawn(worker)
+        self.dispatch_thread = Thread(target=self._dispatch, daemon=True)
+        self.collect_thread = Thread(target=self._collect, daemon=True)
+        self.dispatch_thread.start()
+        self.collect_thread.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, roi, confidence, callback):
+        """
+        Queue `roi` for OCR; `callback(text, confidence)` runs when it is read.
+        Returns False if the crop was shed instead of queued.
+        """
+        with self.cond:
+            if not self.running:
+                return False
+            self._shed_stale()
+            if len(self.pending) >= self.max_pending:
+                weakest = min(range(len(self.pending)), key=lambda i: self.pending[i].confidence)
+                if self.pending[weakest].confidence >= confidence:
+                    self.dropped_full += 1
+                    return False
+                del self.pending[weakest]
+                self.dropped_full += 1
+            self.pending.append(OCRJob(next(self._ids), roi.copy(), confidence, callback))
+            self.submitted += 1
+            self.cond.notify_all()
+            return True
+
+    def _spawn(self, worker):
+        if self.job_queues[worker] is not None:
+            self.job_queues[worker].cancel_join_thread()
+        if self.result_conns[worker] is not None:
+            self.result_conns[worker].close()
+        self.job_queues[worker] = self.ctx.Queue(maxsize=1)
+        reader, writer = self.ctx.Pipe(duplex=False)
+        self.processes[worker] = self.ctx.Process(target=_ocr_worker, daemon=True,
+                                                  args=(self.job_queues[worker], writer, *self.worker_args))
+        self.started_at[worker] = time.time()
+        self.ready[worker] = False
+        self.processes[worker].start()
+        # Only the worker holds the write end, so its exit reads as EOF here
+        writer.close()
+        self.result_conns[worker] = reader
+
+    def _free_worker(self):
+        for worker, job_ids in enumerate(self.assigned):
+            if job_ids is None and self.processes[worker].is_alive():
+                return worker
+        return None
+
+    def _shed_stale(self):
+        if self.max_age is None:
+            return
+        cutoff = time.time() - self.max_age
+        fresh = [job for job in self.pending if job.submitted_at >= cutoff]
+        self.dropped_stale += len(self.pending) - len(fresh)
+        self.pending = fresh
+
+    def _dispatch(self):
+        while True:
+            with self.cond:
+                # Dead workers are restarted by the collector, which notifies
+                self.cond.wait_for(lambda: not self.running or
+                                   (self.pending and self._free_worker() is not None), timeout=1.0)
+                if not self.running:
+                    return
+                self._shed_stale()
+                worker = self._free_worker()
+                if not self.pending or worker is None:
+                    continue
+                # Give a free worker everything that is waiting, up to one batch
+                batch = self.pending[:self.batch_size]
+                del self.pending[:self.batch_size]
+                for job in batch:
+                    self.in_flight[job.job_id] = job
+                self.assigned[worker] = [job.job_id for job in batch]
+                job_queue = self.job_queues[worker]
+            job_queue.put([(job.job_id, job.roi) for job in batch])
+
+    def _collect(self):
+        checked_at = time.time()
+        while self.running:
+            with self.cond:
+                conns = {conn: worker for worker, conn in enumerate(self.result_conns) if conn is not None}
+            for conn in wait(list(conns), timeout=0.5):
+                try:
+                    results = conn.recv()
+                except (EOFError, OSError):
+                    # The worker exited; stop waiting on its pipe until it is replaced
+                    with self.cond:
+                        if self.result_conns[conns[conn]] is conn:
+                            self.result_conns[conns[conn]] = None
+                    conn.close()
+                    checked_at = 0.0
+                    continue
+                if results == READY:
+                    with self.cond:
+                        self.ready[conns[conn]] = True
+                        self.cond.notify_all()
+                    continue
+                self._deliver(conns[conn], results)
+            if time.time() - checked_at >= 0.5:
+                checked_at = time.time()
+                self._check_workers()
+
+    def _deliver(self, worker, results):
+        with self.cond:
+            jobs = [self.in_flight.pop(job_id, None) for job_id, _, _ in results]
+            self.completed += len(results)
+            # Unless the worker was given up on (and replaced) meanwhile
+            if self.assigned[worker] == [job_id for job_id, _, _ in results]:
+                self.assigned[worker] = None
+            self.cond.notify_all()
+        for job, (_, text, confidence) in zip(jobs, results):
+            if job is None:
+                continue
+            try:
+                job.callback(text, confidence)
+            except Exception as e:
+                print(f"OCR callback error: {e}")
+
+    def wait_ready(self, timeout=None):
+        """Wait until every worker has warmed up; False if `timeout` passed first."""
+        with self.cond:
+            return self.cond.wait_for(lambda: all(self.ready) or not self.running, timeout) and self.running
+
+    def _check_workers(self):
+        """Fail the crops of workers that died and start replacements."""
+        with self.cond:
+            if not self.running:
+                return
+            for worker, process in enumerate(self.processes):
+                if process.is_alive():
+                    continue
+                lost = [self.in_flight.pop(job_id, None) for job_id in self.assigned[worker] or []]
+                lost = [job for job in lost if job is not None]
+                self.assigned[worker] = None
+                self.failed += len(lost)
+                if lost:
+                    print(f"OCR worker {worker} exited (code {process.exitcode}) with {len(lost)} crops")
+                if time.time() - self.started_at[worker] < RESTART_DELAY:
+                    continue
+                print(f"Restarting OCR worker {worker}")
+                self._spawn(worker)
+                self.restarts += 1
+                self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            return {
+                "workers": self.workers,
+                "ready": sum(self.ready),
+                "pending": len(self.pending),
+                "in_flight": len(self.in_flight),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "dropped_full": self.dropped_full,
+                "dropped_stale": self.dropped_stale,
+                "failed": self.failed,
+                "restarts": self.restarts,
+            }
+
+    def shutdown(self):
+        with self.cond:
+            if not self.running:
+                return
+            self.running = False
+            self.pending = []
+            self.cond.notify_all()
+        for job_queue in self.job_queues:
+            try:
+                job_queue.put(None, timeout=1.0)
+            except Exception:
+                pass
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
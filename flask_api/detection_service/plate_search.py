@@ -0,0 +1,345 @@
+"""
+Fuzzy plate search over every plate the pipeline has read.
+
+Plates are compared on a confusion-folded key: uppercase letters and digits
+only, with characters OCR mixes up (0/O, 1/I, 8/B, ...) mapped to one
+representative, so "ABC 1O8" and "A8C108" share a key. Every distinct
+spelling is kept once in the plate_keys table (upserted as plate reads are
+written) and, in memory, in a trigram index over the folded keys that
+answers three kinds of query without scanning:
+
+- fuzzy: keys within edit distance 1 (or 0: confusion-equivalent only).
+  A single edit touches at most three of the padded trigrams, so candidates
+  must share all but three of the query's trigrams; only those are checked
+  with a real edit distance.
+- partial: a fragment such as "BC12" or "AB?123" ("?" is one unknown
+  character) anywhere in the plate. Candidates must contain every trigram of
+  the fragment's known runs and are then matched exactly.
+"""
+import re
+import time
+from array import array
+from datetime import datetime
+from threading import Lock, Thread
+import sqlalchemy as sa
+
+# Characters OCR confuses on plates, each class folded to its first character
+CONFUSIONS = ("0OQD", "1IL", "8B", "5S", "2Z")
+_FOLD = str.maketrans({c: group[0] for group in CONFUSIONS for c in group[1:]})
+_PAD = "$"
+
+# Searchable spellings of a plate_reads row
+PLATE_FIELDS = ("text", "plate")
+
+
+def row_spellings(row):
+    """The distinct spellings of a plate_reads row: one read each, even when text and plate agree."""
+    return {row[field] for field in PLATE_FIELDS if row.get(field)}
+
+
+def normalize_plate(text):
+    """Uppercase letters and digits only: "abc-1234 " -> "ABC1234"."""
+    return "".join(c for c in (text or "").upper() if c.isalnum())
+
+
+def fold_plate(text):
+    """The confusion-folded key of a plate."""
+    return normalize_plate(text).translate(_FOLD)
+
+
+def trigrams(key, padded=True):
+    if padded:
+        key = _PAD * 2 + key + _PAD * 2
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance of a and b, or limit + 1 once it is known to exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+    if limit <= 1:
+        # Linear check: skip the common prefix, then at most one edit
+        if len(a) < len(b):
+            a, b = b, a
+        i = 0
+        while i < len(b) and a[i] == b[i]:
+            i += 1
+        rest = a[i + 1:] == b[i + 1:] if len(a) == len(b) else a[i + 1:] == b[i:]
+        return 1 if rest else limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class PlateIndex:
+    """
+    In-memory trigram index over the folded keys of every known plate
+    spelling, loaded once from plate_keys and kept current by the
+    EventWriter (see `apply` / `committed`). Reads committed while it loads
+    are held back and added afterwards, unless the load already saw them.
+    """
+
+    def __init__(self, table=None):
+        self.table = table  # plate_keys
+        self.lock = Lock()
+        self.keys = []  # key id -> folded key
+        self.ids = {}  # folded key -> key id
+        # key id -> {normalized plate: [reads, last_seen, last_stream_id, other spellings or None]}
+        self.plates = []
+        self.postings = {}  # padded trigram -> array of key ids
+        self.state = "idle"
+        self.load_error = None
+        # Held from `apply` until the batch has committed or rolled back, so
+        # the load's snapshot falls between two batches
+        self.commit_lock = Lock()
+        self.committing = False
+        # Reads committed after the load's snapshot, None when not loading
+        self.held_back = None
+
+    def add(self, spelling, reads=1, last_seen=None, stream_id=None):
+        plate = normalize_plate(spelling)
+        if not plate:
+            return
+        key = plate.translate(_FOLD)
+        with self.lock:
+            key_id = self.ids.get(key)
+            if key_id is None:
+                key_id = self.ids[key] = len(self.keys)
+                self.keys.append(key)
+                self.plates.append({})
+                for gram in trigrams(key):
+                    self.postings.setdefault(gram, array("I")).append(key_id)
+            entry = self.plates[key_id].get(plate)
+            if entry is None:
+                entry = self.plates[key_id][plate] = [0, None, None, None]
+            entry[0] += reads
+            if last_seen is not None and (entry[1] is None or last_seen >= entry[1]):
+                entry[1] = last_seen
+                entry[2] = stream_id
+            if spelling != plate:
+                # Raw spellings ("ABC 1234") are needed to look the reads up
+                if entry[3] is None:
+                    entry[3] = set()
+                entry[3].add(spelling)
+
+    def add_reads(self, rows):
+        for row in rows:
+            for spelling in row_spellings(row):
+                self.add(spelling, 1, row.get("read_at"), row.get("stream_id"))
+
+    # EventWriter hook: plate_keys is upserted in the same transaction as
+    # the reads, the memory index only once that transaction has committed
+
+    def apply(self, conn, name, rows):
+        if name != "plate_reads":
+            return
+        self.commit_lock.acquire()
+        self.committing = True
+        if self.table is not None:
+            upsert_plate_keys(conn, self.table, plate_key_rows(rows))
+
+    def committed(self, name, rows):
+        if name != "plate_reads" or not self.committing:
+            return
+        try:
+            with self.lock:
+                if self.held_back is not None:
+                    # Loading, and these reads came after its snapshot
+                    self.held_back.extend(rows)
+                    return
+                # Until the load has its snapshot, plate_keys is the only copy
+                if self.state in ("idle", "loading"):
+                    return
+            self.add_reads(rows)
+        finally:
+            self.release_commit()
+
+    def rolled_back(self, name, rows):
+        if name == "plate_reads" and self.committing:
+            self.release_commit()
+
+    def release_commit(self):
+        self.committing = False
+        self.commit_lock.release()
+
+    def load(self, engine, chunk_rows=10000):
+        """Fill the index from plate_keys (one row per distinct spelling, not per read)."""
+        started = time.time()
+        self.state = "loading"
+        try:
+            query = sa.select(self.table.c.text, self.table.c.reads, self.table.c.last_seen,
+                              self.table.c.last_stream_id)
+            with engine.connect() as conn:
+                # The query's snapshot has every batch committed before it;
+                # `committed` holds back the ones after it
+                with self.commit_lock:
+                    result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(query)
+                    with self.lock:
+                        self.held_back = []
+                for text, reads, last_seen, stream_id in result:
+                    self.add(text, reads, last_seen, stream_id)
+        except Exception as e:
+            with self.lock:
+                self.held_back = None
+                self.state = "failed"
+            self.load_error = str(e).splitlines()[0]
+            print(f"Plate index: loading failed ({self.load_error})")
+            return
+        while True:
+            with self.lock:
+                rows, self.held_back = self.held_back, []
+                if not rows:
+                    self.held_back = None
+                    self.state = "ready"
+                    break
+            self.add_reads(rows)
+        print(f"Plate index: {len(self.keys)} plate keys loaded in {time.time() - started:.1f}s")
+
+    def load_async(self, engine):
+        with self.lock:
+            if self.state != "idle":
+                return
+            self.state = "loading"
+        Thread(target=self.load, args=(engine,), daemon=True, name="plate-index").start()
+
+    def fuzzy_candidates(self, key, max_distance):
+        grams = trigrams(key)
+        # Every edit removes at most three of the query's trigrams, so a
+        # match shares all but 3 * max_distance of them and must appear in
+        # at least one of any 3 * max_distance + 1 posting lists: only the
+        # shortest ones are read
+        with self.lock:
+            postings = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+            ids = set()
+            for ids_with_gram in postings[:min(len(postings), 3 * max_distance + 1)]:
+                ids.update(ids_with_gram)
+            keys = self.keys
+            return [(key_id, keys[key_id]) for key_id in ids]
+
+    def partial_candidates(self, fragment):
+        runs = [run for run in fragment.split("?") if len(run) >= 3]
+        if not runs:
+            raise ValueError("Partial plates need at least 3 consecutive known characters")
+        ids = None
+        with self.lock:
+            for gram in set().union(*(trigrams(run, padded=False) for run in runs)):
+                postings = self.postings.get(gram)
+                if postings is None:
+                    return []
+                # Unpadded trigrams are a subset of the padded ones
+                ids = set(postings) if ids is None else ids.intersection(postings)
+                if not ids:
+                    return []
+            keys = self.keys
+            return [(key_id, keys[key_id]) for key_id in ids]
+
+    def search(self, query, max_distance=1, partial=False, limit=50):
+        """
+        Plates matching `query`, best first: exact spelling, then
+        confusion-equivalent, then one edit away (partial: by read count).
+        Raises ValueError for queries too short to search.
+        """
+        plate = "".join(c for c in (query or "").upper() if c.isalnum() or c == "?")
+        partial = partial or "?" in plate
+        key = plate.translate(_FOLD)
+        if partial:
+            pattern = re.compile(re.escape(key).replace(r"\?", "."))
+            matches = [(key_id, 0) for key_id, candidate in self.partial_candidates(key)
+                       if pattern.search(candidate)]
+        else:
+            if len(key) < 3:
+                raise ValueError("Plate queries need at least 3 characters")
+            matches = []
+            for key_id, candidate in self.fuzzy_candidates(key, max_distance):
+                distance = 0 if candidate == key else edit_distance(key, candidate, max_distance)
+                if distance <= max_distance:
+                    matches.append((key_id, distance))
+        results = []
+        with self.lock:
+            for key_id, distance in matches:
+                for normalized, (reads, last_seen, stream_id, spellings) in self.plates[key_id].items():
+                    if partial:
+                        match = "partial"
+                    elif distance:
+                        match = "edit"
+                    else:
+                        match = "exact" if normalized == plate else "confusion"
+                    results.append({
+                        "plate": normalized,
+                        "match": match,
+                        "distance": distance,
+                        "reads": reads,
+                        "last_seen": last_seen.isoformat() if isinstance(last_seen, datetime) else last_seen,
+                        "last_stream_id": stream_id,
+                        "spellings": sorted((spellings or set()) | {normalized}),
+                    })
+        rank = {"exact": 0, "confusion": 1, "edit": 2, "partial": 3}
+        results.sort(key=lambda r: (rank[r["match"]], -r["reads"], r["plate"]))
+        return results[:limit]
+
+    def stats(self):
+        with self.lock:
+            return {"state": self.state, "error": self.load_error, "keys": len(self.keys),
+                    "plates": sum(len(plates) for plates in self.plates), "trigrams": len(self.postings)}
+
+
+def plate_key_rows(rows):
+    """plate_keys upserts for a batch of plate_reads rows, one per spelling."""
+    keys = {}
+    for row in rows:
+        for text in row_spellings(row):
+            if not normalize_plate(text):
+                continue
+            read_at = row.get("read_at") or datetime.utcnow()
+            entry = keys.get(text)
+            if entry is None:
+                keys[text] = {"text": text, "folded": fold_plate(text), "reads": 1, "first_seen": read_at,
+                              "last_seen": read_at, "last_stream_id": row.get("stream_id")}
+                continue
+            entry["reads"] += 1
+            entry["first_seen"] = min(entry["first_seen"], read_at)
+            if read_at >= entry["last_seen"]:
+                entry["last_seen"] = read_at
+                entry["last_stream_id"] = row.get("stream_id")
+    return list(keys.values())
+
+
+def upsert_plate_keys(conn, table, rows):
+    """Insert new spellings and add to the counters of known ones."""
+    if not rows:
+        return
+    dialect = conn.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table)
+        excluded = statement.excluded
+        newer = excluded.last_seen >= table.c.last_seen
+        conn.execute(statement.on_conflict_do_update(index_elements=[table.c.text], set_={
+            "reads": table.c.reads + excluded.reads,
+            "first_seen": sa.case((excluded.first_seen < table.c.first_seen, excluded.first_seen),
+                                  else_=table.c.first_seen),
+            "last_seen": sa.case((newer, excluded.last_seen), else_=table.c.last_seen),
+            "last_stream_id": sa.case((newer, excluded.last_stream_id), else_=table.c.last_stream_id),
+        }), rows)
+        return
+    # Other databases: update what exists, insert the rest
+    existing = {text for (text,) in conn.execute(
+        sa.select(table.c.text).where(table.c.text.in_([row["text"] for row in rows])))}
+    for row in rows:
+        if row["text"] in existing:
+            conn.execute(table.update().where(table.c.text == row["text"]).values(
+                reads=table.c.reads + row["reads"], last_seen=row["last_seen"],
+                last_stream_id=row["last_stream_id"]))
+        else:
+            conn.execute(table.insert(), [row])
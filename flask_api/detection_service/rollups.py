@@ -0,0 +1,140 @@
+"""
+Traffic counts per camera and vehicle class at hourly, daily and monthly
+granularity, maintained as detection events are written so the analytics
+API reads a few pre-aggregated rows instead of scanning detection_events.
+
+A vehicle is counted once, in the buckets of the moment it is first seen:
+with tracking, when a (camera, track id) appears more than `track_gap`
+seconds away from every time it has been seen; without tracking every
+detection counts. `detections`
+keeps the raw per-frame detection count alongside.
+"""
+from datetime import timedelta
+
+GRANULARITIES = ("hour", "day", "month")
+
+
+def bucket_start(moment, granularity):
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+class Rollups:
+    """
+    EventWriter hook keeping analytics_rollups current. Counter increments
+    are upserted in the transaction that writes the detection events; the
+    track bookkeeping only moves forward once it has committed, so a batch
+    that is spilled and replayed later is counted exactly once. Each track
+    keeps the interval it has been seen in, for `history` seconds after it
+    ends, so a batch replayed after newer ones joins the same vehicle.
+    Buckets are in local time, `utc_offset` hours from UTC.
+    """
+
+    def __init__(self, table, utc_offset=0.0, track_gap=30.0, history=3600.0):
+        self.table = table  # analytics_rollups
+        self.offset = timedelta(hours=utc_offset)
+        self.track_gap = timedelta(seconds=track_gap)
+        self.history = max(self.track_gap, timedelta(seconds=history))
+        self.seen = {}  # (stream_id, track_id) -> (first, last) detected_at of its detections
+        self.staged = None
+
+    def local(self, moment):
+        return moment + self.offset
+
+    def count(self, rows):
+        """(stream_id, label, moment) of every new vehicle, and the track intervals to remember."""
+        vehicles = []
+        tracks = {}
+        for row in sorted(rows, key=lambda r: r["detected_at"]):
+            if row.get("track_id") is None:
+                vehicles.append((row["stream_id"], row["label"], row["detected_at"]))
+            else:
+                tracks.setdefault((row["stream_id"], row["track_id"]), []).append(row)
+        seen = {}
+        for key, track in tracks.items():
+            interval = self.seen.get(key)
+            # The batch's own runs of the track (no gap over track_gap), each
+            # new unless it comes within track_gap of where the track was seen
+            start = 0
+            for end in range(1, len(track) + 1):
+                if end < len(track) and track[end]["detected_at"] - track[end - 1]["detected_at"] <= self.track_gap:
+                    continue
+                first, last = track[start]["detected_at"], track[end - 1]["detected_at"]
+                if interval is None:
+                    interval = (first, last)
+                    vehicles.append((key[0], track[start]["label"], first))
+                else:
+                    # A track id that went quiet (or restarted with the stream) is a new vehicle
+                    if first - interval[1] > self.track_gap or interval[0] - last > self.track_gap:
+                        vehicles.append((key[0], track[start]["label"], first))
+                    interval = (min(interval[0], first), max(interval[1], last))
+                start = end
+            seen[key] = interval
+        return vehicles, seen
+
+    def increments(self, rows, vehicles):
+        counters = {}
+
+        def add(stream_id, label, moment, field):
+            local = self.local(moment)
+            for granularity in GRANULARITIES:
+                key = (granularity, bucket_start(local, granularity), stream_id, label)
+                entry = counters.get(key)
+                if entry is None:
+                    entry = counters[key] = {"granularity": granularity, "bucket": key[1], "stream_id": stream_id,
+                                             "label": label, "vehicles": 0, "detections": 0}
+                entry[field] += 1
+
+        for row in rows:
+            add(row["stream_id"], row["label"], row["detected_at"], "detections")
+        for stream_id, label, moment in vehicles:
+            add(stream_id, label, moment, "vehicles")
+        return list(counters.values())
+
+    def apply(self, conn, name, rows):
+        if name != "detection_events":
+            return
+        vehicles, self.staged = self.count(rows)
+        upsert_rollups(conn, self.table, self.increments(rows, vehicles))
+
+    def rolled_back(self, name, rows):
+        if name == "detection_events":
+            self.staged = None
+
+    def committed(self, name, rows):
+        if name != "detection_events" or not self.staged:
+            return
+        self.seen.update(self.staged)
+        self.staged = None
+        # Forget tracks that ended longer than `history` ago
+        latest = max(last for _, last in self.seen.values())
+        self.seen = {key: interval for key, interval in self.seen.items()
+                     if latest - interval[1] <= self.history}
+
+
+def upsert_rollups(conn, table, rows):
+    """Add each row's counters to its bucket, creating the bucket if needed."""
+    if not rows:
+        return
+    dialect = conn.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table)
+        conn.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.granularity, table.c.bucket, table.c.stream_id, table.c.label],
+            set_={"vehicles": table.c.vehicles + statement.excluded.vehicles,
+                  "detections": table.c.detections + statement.excluded.detections}), rows)
+        return
+    for row in rows:
+        key = ((table.c.granularity == row["granularity"]) & (table.c.bucket == row["bucket"])
+               & (table.c.stream_id == row["stream_id"]) & (table.c.label == row["label"]))
+        updated = conn.execute(table.update().where(key).values(
+            vehicles=table.c.vehicles + row["vehicles"], detections=table.c.detections + row["detections"]))
+        if updated.rowcount == 0:
+            conn.execute(table.insert(), [row])
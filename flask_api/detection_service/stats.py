@@ -0,0 +1,96 @@
+import time
+from collections import deque
+from threading import Lock
+
+
+class BatchStats:
+    """
+    Running throughput/latency figures for micro-batched inference.
+    `wait` is the latency batching adds: the time a frame spends in the
+    processor between being dequeued and the batched model call starting.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.batches = 0
+        self.frames = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.infer_total = 0.0
+
+    def record(self, frame_waits, infer_seconds):
+        self.batches += 1
+        self.frames += len(frame_waits)
+        self.wait_total += sum(frame_waits)
+        self.wait_max = max(self.wait_max, max(frame_waits, default=0.0))
+        self.infer_total += infer_seconds
+
+    def summary(self):
+        frames = max(self.frames, 1)
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "avg_batch_fill": self.frames / max(self.batches, 1),
+            "inference_fps": self.frames / self.infer_total if self.infer_total > 0 else 0.0,
+            "infer_ms_per_frame": 1000.0 * self.infer_total / frames,
+            "avg_added_latency_ms": 1000.0 * self.wait_total / frames,
+            "max_added_latency_ms": 1000.0 * self.wait_max,
+        }
+
+    def format(self, batch_size, batch_timeout_ms):
+        s = self.summary()
+        return (
+            f"Batching N={batch_size} T={batch_timeout_ms:g}ms | "
+            f"fill {s['avg_batch_fill']:.2f} | "
+            f"inference {s['inference_fps']:.1f} FPS ({s['infer_ms_per_frame']:.1f} ms/frame) | "
+            f"added latency avg {s['avg_added_latency_ms']:.1f} ms, max {s['max_added_latency_ms']:.1f} ms"
+        )
+
+
+class StreamStats:
+    """
+    Frame rate and end-to-end latency (capture to emit) of one stream, over
+    a sliding window of the last `window` emitted frames.
+    """
+
+    def __init__(self, window=120):
+        self.window = window
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.emitted_at = deque(maxlen=self.window)
+            self.latencies = deque(maxlen=self.window)
+            self.frames = 0
+
+    def record(self, latency, now=None):
+        with self.lock:
+            self.emitted_at.append(now if now is not None else time.time())
+            self.latencies.append(latency)
+            self.frames += 1
+
+    def fps(self):
+        with self.lock:
+            if len(self.emitted_at) < 2:
+                return 0.0
+            span = self.emitted_at[-1] - self.emitted_at[0]
+            return (len(self.emitted_at) - 1) / span if span > 0 else 0.0
+
+    def summary(self):
+        fps = self.fps()
+        with self.lock:
+            latencies = sorted(self.latencies)
+            frames = self.frames
+        if not latencies:
+            return {"frames": frames, "fps": fps, "avg_latency_ms": 0.0,
+                    "p95_latency_ms": 0.0, "max_latency_ms": 0.0}
+        return {
+            "frames": frames,
+            "fps": fps,
+            "avg_latency_ms": 1000.0 * sum(latencies) / len(latencies),
+            "p95_latency_ms": 1000.0 * latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+            "max_latency_ms": 1000.0 * latencies[-1],
+        }
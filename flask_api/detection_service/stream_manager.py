@@ -0,0 +1,389 @@
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from queue import Empty
+from threading import Condition, Lock, Thread
+from detection_service.config import PipelineConfig
+from detection_service.detection import VideoProcessor
+from detection_service.fanout import ViewerHub
+from detection_service.model_pool import detector_pool, pool_stats
+from detection_service.mp_pipeline import ProcessPipeline
+from detection_service.ocr_pool import OCRWorkerPool
+from detection_service.stats import BatchStats
+
+
+def parse_sources(spec):
+    """
+    Parse a camera list such as "entrance=./sample/mamamo.mov,exit=0" into
+    (stream_id, source) pairs. Entries without an id are named camN, and
+    digit sources are turned into device indexes for cv2.VideoCapture.
+    """
+    sources = []
+    for index, entry in enumerate(part.strip() for part in (spec or "").split(",")):
+        if not entry:
+            continue
+        stream_id, sep, source = entry.partition("=")
+        if not sep or any(c in stream_id for c in ":/."):
+            # A bare source (possibly a URL with a query string)
+            stream_id, source = f"cam{index}", entry
+        source = source.strip()
+        sources.append((stream_id.strip(), int(source) if source.isdigit() else source))
+    return sources
+
+
+class StreamManager:
+    """
+    Runs many camera streams on one YOLO model and one OCR worker pool.
+
+    Every registered stream keeps its own capture, tracker, OCR cache and
+    emit stage (a managed VideoProcessor), while a single scheduler thread
+    owns the detector: each round it takes the next frame of every stream
+    that has one, round-robin from where the last round stopped, runs one
+    batched inference call and hands each result back to its stream. A busy
+    camera therefore never gets more than its share of the model.
+
+    The model and the OCR pool are loaded and warmed up in the background
+    (load_async), not when the manager is built, so importing the app stays
+    cheap. Streams started before they are ready send raw preview frames and
+    start for real as soon as loading completes.
+    """
+
+    def __init__(self, socketio, model_path="./sample/best.pt", config=None, events=None):
+        self.socketio = socketio
+        self.model_path = model_path
+        self.config = config or PipelineConfig.from_env()
+        self.events = events
+        self.model = None
+        self.ocr_pool = None
+        # idle -> loading -> ready (or failed)
+        self.state = "idle"
+        self.load_error = None
+        self.load_thread = None
+        self.pending_starts = []
+        self.hub = ViewerHub(socketio, outbox_size=self.config.viewer_outbox_size,
+                             ack_timeout=self.config.viewer_ack_timeout)
+        self.streams = OrderedDict()  # stream id -> VideoProcessor
+        self.lock = Lock()
+        self.cond = Condition()
+        self.next_index = 0
+        self.running = False
+        self.scheduler_thread = None
+        self.batch_stats = BatchStats()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def load_async(self):
+        """Start the event writer and load the model and OCR pool in the background (once)."""
+        with self.lock:
+            if self.state != "idle":
+                return
+            self.state = "loading"
+        if self.events is not None:
+            # Like the models, the writer only runs in the serving process: two
+            # writers would replay the same spill files
+            self.events.start()
+        self.load_thread = Thread(target=self.load, daemon=True, name="model-loader")
+        self.load_thread.start()
+
+    def load(self):
+        started = time.time()
+        ocr_pool = None
+        try:
+            # The OCR workers construct and warm up their PaddleOCR in their
+            # own processes, meanwhile the detector is built and warmed here.
+            # PaddleOCR is not safe to share between the streams' processor
+            # threads, so managed streams always read plates through the pool
+            ocr_pool = OCRWorkerPool(workers=self.config.ocr_workers,
+                                     max_pending=self.config.ocr_queue_size,
+                                     max_age=self.config.ocr_max_age_ms / 1000.0,
+                                     backend=self.config.ocr_backend,
+                                     use_angle_cls=self.config.ocr_angle_cls if self.config.ocr_backend == "rec" else True,
+                                     batch_size=self.config.ocr_batch_size,
+                                     warmup=self.config.warmup)
+            detectors = detector_pool(self.model_path, self.config)
+            detectors.fill()
+            model = detectors.acquire()
+            # Streams leave preview only once plates can be read without a cold start
+            remaining = self.config.ocr_ready_timeout - (time.time() - started)
+            if not ocr_pool.wait_ready(max(0.0, remaining)):
+                print(f"OCR workers not warmed up after {self.config.ocr_ready_timeout:g}s "
+                      f"({ocr_pool.stats()['ready']}/{ocr_pool.workers}), starting without them")
+        except Exception as e:
+            if ocr_pool is not None:
+                ocr_pool.shutdown()
+            with self.lock:
+                self.state = "failed"
+                self.load_error = str(e)
+                pending, self.pending_starts = self.pending_starts, []
+            print(f"Model loading failed: {e}")
+            for stream_id in pending:
+                processor = self.streams.get(stream_id)
+                if processor is not None:
+                    processor.stop_preview()
+                    processor.notify("video_error", {"stream_id": stream_id, "error": f"Model loading failed: {e}"})
+            return
+        with self.lock:
+            self.model = model
+            self.ocr_pool = ocr_pool
+            for processor in self.scheduled():
+                processor.model = model
+                processor.ocr_pool = ocr_pool
+            self.state = "ready"
+            pending, self.pending_starts = self.pending_starts, []
+        print(f"Models loaded{' and warmed up' if self.config.warmup else ''} in {time.time() - started:.1f}s")
+        for stream_id in pending:
+            self.start(stream_id)
+
+    def readiness(self):
+        with self.lock:
+            return {
+                "state": self.state,
+                "ready": self.state == "ready",
+                "error": self.load_error,
+                "streams": len(self.streams),
+                "waiting_to_start": list(self.pending_starts),
+                "model_pools": pool_stats(),
+            }
+
+    def register(self, stream_id, source, **overrides):
+        """Add a source under `stream_id`; `overrides` tweak its PipelineConfig."""
+        with self.lock:
+            if stream_id in self.streams:
+                raise ValueError(f"Stream '{stream_id}' is already registered")
+            config = replace(self.config, ocr_mode="async", **overrides)
+            if config.execution == "processes":
+                # Runs its own detector and OCR pool in worker processes
+                processor = ProcessPipeline(self.socketio, source, self.model_path, config,
+                                            stream_id=stream_id, hub=self.hub, events=self.events)
+                self.streams[stream_id] = processor
+                return processor
+            processor = VideoProcessor(self.socketio, source, config=config, ocr_pool=self.ocr_pool,
+                                       model=self.model, stream_id=stream_id, scheduler=self, hub=self.hub,
+                                       events=self.events)
+            self.streams[stream_id] = processor
+            return processor
+
+    def unregister(self, stream_id):
+        with self.lock:
+            processor = self.streams.pop(stream_id, None)
+        if processor is not None:
+            processor.close()
+        return processor is not None
+
+    def resolve(self, key):
+        """
+        Stream id for a client-supplied stream id or camera index. None (or
+        an empty key) means the first registered stream.
+        """
+        with self.lock:
+            ids = list(self.streams)
+        if not ids:
+            return None
+        if key is None or key == "":
+            return ids[0]
+        key = str(key)
+        if key in self.streams:
+            return key
+        if key.isdigit() and int(key) < len(ids):
+            return ids[int(key)]
+        return None
+
+    def start(self, stream_id):
+        """
+        Start a stream. Managed streams requested before the model is loaded
+        are queued and started once it is; True means started or queued.
+        """
+        processor = self.streams.get(stream_id)
+        if processor is None:
+            return False
+        if processor.scheduler is self:
+            with self.lock:
+                if self.state == "failed":
+                    return False
+                waiting = self.state != "ready"
+                if waiting and stream_id not in self.pending_starts:
+                    self.pending_starts.append(stream_id)
+            if waiting:
+                processor.start_preview()
+                self.load_async()
+                return True
+        self.ensure_scheduler()
+        processor.start()
+        return processor.running
+
+    def stop(self, stream_id):
+        processor = self.streams.get(stream_id)
+        if processor is None:
+            return False
+        with self.lock:
+            if stream_id in self.pending_starts:
+                self.pending_starts.remove(stream_id)
+        processor.stop()
+        return True
+
+    def stop_all(self):
+        with self.lock:
+            self.pending_starts = []
+        for processor in list(self.streams.values()):
+            processor.stop()
+
+    def shutdown(self):
+        self.stop_all()
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.ocr_pool is not None:
+            self.ocr_pool.shutdown()
+        if self.events is not None:
+            self.events.stop()
+
+    def ensure_scheduler(self):
+        with self.cond:
+            if self.running and self.scheduler_thread is not None and self.scheduler_thread.is_alive():
+                return
+            self.running = True
+        self.scheduler_thread = Thread(target=self.schedule, daemon=True)
+        self.scheduler_thread.start()
+
+    def notify(self):
+        """Called by the streams' frame queues whenever a frame arrives."""
+        with self.cond:
+            self.cond.notify_all()
+
+    def scheduled(self):
+        """Streams whose inference runs on the shared model."""
+        return [p for p in list(self.streams.values()) if p.scheduler is self]
+
+    def _has_work(self, streams):
+        for processor in streams:
+            if not processor.running or processor.inference_queue.closed:
+                continue
+            # A stream whose capture ended still needs its processor released
+            if processor.frame_queue.qsize() or processor.frame_queue.closed:
+                return True
+        return False
+
+    def schedule(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: not self.running or self._has_work(self.scheduled()), timeout=0.5)
+                if not self.running:
+                    return
+            streams = [p for p in self.scheduled() if p.running and not p.inference_queue.closed]
+            for processor in streams:
+                if processor.frame_queue.closed and not processor.frame_queue.qsize():
+                    # End of stream: let the processor drain and exit
+                    processor.inference_queue.close()
+            batch = self.pick(streams)
+            if not batch:
+                continue
+            try:
+                self.infer(batch)
+            except Exception as e:
+                # One bad frame must not take down every camera's detector,
+                # nor keep its streams' decode buffers (their producers wait on them)
+                print(f"Inference error: {e}")
+                for processor, buffer, _, _ in batch:
+                    processor.release_buffers([buffer])
+
+    def pick(self, streams):
+        """
+        Take up to `scheduler_batch_size` frames round-robin, at most one per
+        stream per pass, starting after the stream served last.
+        """
+        if not streams:
+            return []
+        limit = self.config.scheduler_batch_size or len(streams)
+        start = self.next_index % len(streams)
+        order = streams[start:] + streams[:start]
+        batch = []
+        last_served = None
+        while len(batch) < limit:
+            served = False
+            for processor in order:
+                if len(batch) >= limit:
+                    break
+                try:
+                    frame, captured_at = processor.frame_queue.get_nowait()
+                except Empty:
+                    continue
+                batch.append((processor, frame, captured_at, time.time()))
+                last_served = processor
+                served = True
+            if not served:
+                break
+        if last_served is not None:
+            self.next_index = streams.index(last_served) + 1
+        return batch
+
+    def infer(self, batch):
+        frames = [processor.prepare(frame) for processor, frame, _, _ in batch]
+        # Static frames skip the model; their streams reuse the last detections
+        run = [processor.should_infer(frame) for (processor, _, _, _), frame in zip(batch, frames)]
+        infer_start = time.time()
+        results = self.run_model(batch, frames, run)
+        if any(run):
+            self.batch_stats.record([infer_start - item[3] for item, inferred in zip(batch, run) if inferred],
+                                    time.time() - infer_start)
+        if self.batch_stats.batches >= self.config.report_interval:
+            print(self.batch_stats.format(self.config.scheduler_batch_size or len(self.streams), 0))
+            self.batch_stats.reset()
+
+        # Hand every stream its own frames, in capture order
+        per_stream = OrderedDict()
+        for (processor, buffer, captured_at, _), frame, result in zip(batch, frames, results):
+            item = per_stream.setdefault(processor, ([], [], [], []))
+            for values, value in zip(item, (frame, captured_at, result, buffer)):
+                values.append(value)
+        for processor, item in per_stream.items():
+            if not processor.inference_queue.put(item):
+                processor.release_buffers(item[3])
+
+    def run_model(self, batch, frames, run):
+        """
+        One model call per distinct set of model arguments in the batch
+        (normally exactly one; streams shedding load may ask for a smaller
+        input resolution). Returns one result per frame, None where skipped.
+        """
+        results = [None] * len(frames)
+        groups = OrderedDict()
+        for index, ((processor, _, _, _), inferred) in enumerate(zip(batch, run)):
+            if inferred:
+                kwargs = processor.model_kwargs()
+                groups.setdefault(tuple(sorted(kwargs.items())), []).append(index)
+        for key, indexes in groups.items():
+            start = time.perf_counter()
+            group_results = self.model([frames[i] for i in indexes], **dict(key))
+            # Every stream in the call waited for all of it
+            elapsed = time.perf_counter() - start
+            for processor in {batch[i][0] for i in indexes}:
+                processor.metrics.observe("inference", elapsed)
+            for index, result in zip(indexes, group_results):
+                results[index] = result
+        return results
+
+    def stats(self):
+        """Per-stream FPS, capture-to-emit latency and queue counters."""
+        streams = {}
+        for stream_id, processor in list(self.streams.items()):
+            pipeline = processor.pipeline_stats()
+            streams[stream_id] = {
+                "source": str(processor.video_path),
+                "live": processor.live,
+                "running": processor.running,
+                "viewers": self.hub.subscribers(stream_id),
+                **processor.stream_stats.summary(),
+                "queues": {name: value for name, value in pipeline.items() if name.endswith("_queue")},
+                "motion_gate": pipeline.get("motion_gate"),
+                "controller": processor.controller.state() if getattr(processor, "controller", None) else None,
+            }
+        return {
+            "streams": streams,
+            "scheduler": self.batch_stats.summary(),
+            "models": self.state,
+            "ocr_pool": self.ocr_pool.stats() if self.ocr_pool is not None else None,
+            "viewers": self.hub.stats(),
+            "events": self.events.stats() if self.events is not None else None,
+        }
@@ -0,0 +1,231 @@
+import cv2
+import numpy as np
+from itertools import count
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes, as an (N, M) array."""
+    a = a[:, None, :]
+    b = b[None, :, :]
+    ix1 = np.maximum(a[..., 0], b[..., 0])
+    iy1 = np.maximum(a[..., 1], b[..., 1])
+    ix2 = np.minimum(a[..., 2], b[..., 2])
+    iy2 = np.minimum(a[..., 3], b[..., 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def centroid_distance_matrix(a, b):
+    """
+    Pairwise centroid distance between (N, 4) and (M, 4) boxes, normalised
+    by the diagonal of the boxes in `a` so it is independent of object size.
+    """
+    ca = (a[:, :2] + a[:, 2:]) / 2.0
+    cb = (b[:, :2] + b[:, 2:]) / 2.0
+    diag = np.hypot(a[:, 2] - a[:, 0], a[:, 3] - a[:, 1])
+    dist = np.linalg.norm(ca[:, None, :] - cb[None, :, :], axis=2)
+    return dist / np.maximum(diag[:, None], 1e-9)
+
+
+def crop_sharpness(image, box):
+    """Variance of the Laplacian of the grayscale crop: higher is sharper."""
+    x1, y1, x2, y2 = map(int, box)
+    roi = image[max(0, y1):max(0, y2), max(0, x1):max(0, x2)]
+    if roi.size == 0:
+        return 0.0
+    if roi.ndim == 3:
+        roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(roi, cv2.CV_64F).var())
+
+
+def normalize_plate(text):
+    """Canonical form used for voting: alphanumerics only, upper case."""
+    return "".join(c for c in text if c.isalnum()).upper()
+
+
+class Track:
+    def __init__(self, track_id, box, cls, label, confidence, frame_index):
+        self.track_id = track_id
+        self.box = box
+        self.velocity = np.zeros(4)
+        self.cls = cls
+        self.label = label
+        self.confidence = confidence
+        self.hits = 1
+        self.misses = 0
+        self.first_frame = frame_index
+        self.last_frame = frame_index
+        # OCR bookkeeping: best crop seen so far and the weighted plate votes
+        self.ocr_attempts = 0
+        self.last_ocr_frame = None
+        self.best_area = 0.0
+        self.best_sharpness = 0.0
+        # Latest sharpness measurement as (frame index, value)
+        self.sharpness = None
+        self.votes = {}
+
+    def predicted_box(self):
+        return self.box + self.velocity * (self.misses + 1)
+
+    def update(self, box, confidence, frame_index):
+        self.velocity = 0.5 * self.velocity + 0.5 * (box - self.box) / max(frame_index - self.last_frame, 1)
+        self.box = box
+        self.confidence = confidence
+        self.hits += 1
+        self.misses = 0
+        self.last_frame = frame_index
+
+    def add_read(self, text, confidence):
+        """Record one OCR read; reads of the same plate accumulate confidence."""
+        plate = normalize_plate(text)
+        if plate:
+            # Copy-on-write: reads may arrive from an OCR callback thread while
+            # the processor thread is computing the consensus
+            votes = dict(self.votes)
+            votes[plate] = votes.get(plate, 0.0) + confidence
+            self.votes = votes
+
+    def consensus(self):
+        """Return (plate, share of the total vote weight) for the winning plate."""
+        votes = self.votes
+        if not votes:
+            return "", 0.0
+        plate, weight = max(votes.items(), key=lambda item: item[1])
+        return plate, weight / sum(votes.values())
+
+
+class Tracker:
+    """
+    Lightweight IoU/centroid multi-object tracker. Detections are greedily
+    matched to the predicted boxes of existing tracks of the same class, using
+    one vectorized cost matrix per frame: IoU where boxes overlap, centroid
+    distance as a fallback for small or fast-moving objects.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_distance=0.75, max_missed=15,
+                 ocr_growth=1.3, ocr_sharpness_gain=1.5, ocr_min_sharpness_gain=50.0,
+                 ocr_sharpness_interval=5, ocr_min_area_ratio=0.8, ocr_retry_frames=15, on_expire=None):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.ocr_growth = ocr_growth
+        self.ocr_sharpness_gain = ocr_sharpness_gain
+        # A flat first crop has sharpness 0: any texture at all must not count as better
+        self.ocr_min_sharpness_gain = ocr_min_sharpness_gain
+        self.ocr_sharpness_interval = ocr_sharpness_interval
+        self.ocr_min_area_ratio = ocr_min_area_ratio
+        self.ocr_retry_frames = ocr_retry_frames
+        self.on_expire = on_expire
+        self.tracks = []
+        self.frame_index = 0
+        self._ids = count(1)
+
+    def match(self, boxes, classes):
+        """Return (track_idx, detection_idx) pairs, best matches first."""
+        if not self.tracks or len(boxes) == 0:
+            return []
+        predicted = np.array([t.predicted_box() for t in self.tracks])
+        track_classes = np.array([t.cls for t in self.tracks])
+        iou = iou_matrix(predicted, boxes)
+        dist = centroid_distance_matrix(predicted, boxes)
+        cost = np.where(iou >= self.iou_threshold, 1.0 - iou, 1.0 + dist)
+        valid = (iou >= self.iou_threshold) | (dist <= self.max_distance)
+        valid &= track_classes[:, None] == classes[None, :]
+        cost = np.where(valid, cost, np.inf)
+
+        pairs = []
+        used_tracks, used_dets = set(), set()
+        n_dets = cost.shape[1]
+        for flat in np.argsort(cost, axis=None):
+            t, d = divmod(int(flat), n_dets)
+            if not np.isfinite(cost[t, d]):
+                break
+            if t in used_tracks or d in used_dets:
+                continue
+            used_tracks.add(t)
+            used_dets.add(d)
+            pairs.append((t, d))
+        return pairs
+
+    def update(self, boxes, classes, confidences, names):
+        """
+        Advance the tracker by one frame. Returns the Track for every input
+        detection, in input order. Tracks that have not been seen for more
+        than `max_missed` frames are dropped and handed to `on_expire`.
+        """
+        self.frame_index += 1
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        classes = np.asarray(classes, dtype=int).reshape(-1)
+        assigned = [None] * len(boxes)
+
+        for t, d in self.match(boxes, classes):
+            track = self.tracks[t]
+            track.update(boxes[d], float(confidences[d]), self.frame_index)
+            assigned[d] = track
+
+        for d, track in enumerate(assigned):
+            if track is None:
+                track = Track(next(self._ids), boxes[d], int(classes[d]), names[int(classes[d])],
+                              float(confidences[d]), self.frame_index)
+                self.tracks.append(track)
+                assigned[d] = track
+
+        alive = []
+        for track in self.tracks:
+            if track.last_frame != self.frame_index:
+                track.misses += 1
+            if track.misses > self.max_missed:
+                self.expire(track)
+            else:
+                alive.append(track)
+        self.tracks = alive
+        return assigned
+
+    def should_ocr(self, track, frame):
+        """
+        OCR a track only when it is new, when its crop got clearly bigger or
+        sharper than the best crop read so far, or (while it still has no
+        plate) every `ocr_retry_frames` frames.
+        The sharpness (a Laplacian over the crop) is only measured every
+        `ocr_sharpness_interval` frames of a track, and not for crops much
+        smaller than the best one, which would not be a better read anyway.
+        """
+        if track.ocr_attempts == 0:
+            return True
+        x1, y1, x2, y2 = track.box
+        area = (x2 - x1) * (y2 - y1)
+        if area >= track.best_area * self.ocr_growth:
+            return True
+        if not track.votes and self.frame_index - track.last_ocr_frame >= self.ocr_retry_frames:
+            return True
+        if area < track.best_area * self.ocr_min_area_ratio:
+            return False
+        if track.sharpness is not None and self.frame_index - track.sharpness[0] < self.ocr_sharpness_interval:
+            return False
+        sharpness = self.measure_sharpness(track, frame)
+        return sharpness > max(track.best_sharpness * self.ocr_sharpness_gain,
+                               track.best_sharpness + self.ocr_min_sharpness_gain)
+
+    def measure_sharpness(self, track, frame):
+        if track.sharpness is None or track.sharpness[0] != self.frame_index:
+            track.sharpness = (self.frame_index, crop_sharpness(frame, track.box))
+        return track.sharpness[1]
+
+    def mark_ocr(self, track, frame):
+        x1, y1, x2, y2 = track.box
+        track.ocr_attempts += 1
+        track.last_ocr_frame = self.frame_index
+        track.best_area = max(track.best_area, (x2 - x1) * (y2 - y1))
+        track.best_sharpness = max(track.best_sharpness, self.measure_sharpness(track, frame))
+
+    def expire(self, track):
+        if self.on_expire:
+            self.on_expire(track)
+
+    def reset(self):
+        for track in self.tracks:
+            self.expire(track)
+        self.tracks = []
+        self.frame_index = 0
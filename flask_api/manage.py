@@ -1,12 +1,24 @@
-from flask import Flask
+from flask import Flask, request
 from flask_cors import CORS
-from flask_socketio import SocketIO
-from detection_service.detection import VideoProcessor
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from detection_service.stream_manager import StreamManager, parse_sources
+from detection_service.config import PipelineConfig
+from detection_service.event_writer import EventWriter
+from detection_service.fanout import room_name
+from detection_service.plate_search import PlateIndex
+from detection_service.rollups import Rollups
 from controllers.auth import auth_bp, init_jwt
+from controllers.streams import streams_bp
+from controllers.metrics import metrics_bp
+from controllers.plates import plates_bp
+from controllers.analytics import analytics_bp
+from controllers.incidents import incidents_bp
 import os 
 from dotenv import load_dotenv
 from db.db import init_db, db  # Import the init_db function and db instance
 from flask_migrate import Migrate  # Import Flask-Migrate
+from models.detections import DetectionEvent, PlateRead, PlateKey, AnalyticsRollup
+from models.incidents import Incident, IncidentVehicle
 
 load_dotenv()
 
@@ -23,6 +35,11 @@ def create_app():
     
     # Register the auth blueprint
     app.register_blueprint(auth_bp)
+    app.register_blueprint(streams_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(plates_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(incidents_bp)
 
     init_jwt(app)
 
@@ -34,23 +51,112 @@ def create_app():
     socketio = SocketIO(app, ping_timeout=1, ping_interval=2, 
                         cors_allowed_origins="*", max_http_buffer_size=1e8)
 
-    video_path = "./sample/mamamo.mov"  # Update path as necessary
-    video_processor = VideoProcessor(socketio, video_path)
+    # Cameras as comma-separated id=source pairs; all of them share one
+    # detector and one OCR pool
+    config = PipelineConfig.from_env()
+    # Fuzzy plate search; kept current by the event writer when events are persisted
+    plate_index = PlateIndex(PlateKey.__table__)
+    app.extensions['plate_index'] = plate_index
+    events = None
+    if config.persist_events:
+        # Detections are written in batches by a background thread, never from the pipeline
+        with app.app_context():
+            engine = db.engine
+        events = EventWriter(engine,
+                             {DetectionEvent.__tablename__: DetectionEvent.__table__,
+                              PlateRead.__tablename__: PlateRead.__table__},
+                             batch_size=config.event_batch_size,
+                             flush_interval=config.event_flush_interval,
+                             max_pending=config.event_max_pending,
+                             spill_dir=config.event_spill_dir,
+                             # Plate search keys and analytics counts follow the events as they are written
+                             hooks=[plate_index, Rollups(AnalyticsRollup.__table__, config.analytics_utc_offset)])
+        # Started with the models by stream_manager.load_async
+        app.extensions['event_writer'] = events
+    stream_manager = StreamManager(socketio, config=config, events=events)
+    for stream_id, source in parse_sources(os.getenv('CAMERA_SOURCES', 'entrance=./sample/mamamo.mov')):
+        stream_manager.register(stream_id, source)
+    app.extensions['stream_manager'] = stream_manager
+
+    @app.before_request
+    def load_models():
+        # The detector and OCR load (and the event writer starts) in the
+        # background once the server is taking requests, never at import
+        # (flask db upgrade, tests, workers), and so does the plate index
+        stream_manager.load_async()
+        if plate_index.state == 'idle':
+            plate_index.load_async(db.engine)
+
+    def subscribe(stream_id):
+        # Viewers get frames through their own outbox and the rest in the room
+        join_room(room_name(stream_id))
+        stream_manager.hub.subscribe(request.sid, stream_id)
+
+    @socketio.on("subscribe")
+    def handle_subscribe(data=None):
+        data = data or {}
+        stream_id = stream_manager.resolve(data.get("stream_id", data.get("camera_index")))
+        if stream_id is None:
+            emit("video_error", {"error": "Unknown camera"})
+            return
+        subscribe(stream_id)
+        emit("subscribed", {"stream_id": stream_id})
+
+    @socketio.on("unsubscribe")
+    def handle_unsubscribe(data=None):
+        data = data or {}
+        stream_id = stream_manager.resolve(data.get("stream_id", data.get("camera_index")))
+        if stream_id is not None:
+            leave_room(room_name(stream_id))
+            stream_manager.hub.unsubscribe(request.sid, stream_id)
+
+    @socketio.on("disconnect")
+    def handle_disconnect():
+        stream_manager.hub.remove_viewer(request.sid)
 
     @socketio.on("start_video")
-    def handle_start_video(data):
+    def handle_start_video(data=None):
         print("Received start_video event")
-        video_processor.start()
+        data = data or {}
+        # Clients pick a camera by stream id or by its index in CAMERA_SOURCES
+        stream_id = stream_manager.resolve(data.get("stream_id", data.get("camera_index")))
+        if stream_id is None:
+            emit("video_error", {"error": "Unknown camera"})
+            return
+        # Whoever starts a camera watches it
+        subscribe(stream_id)
+        stream_manager.start(stream_id)
+        readiness = stream_manager.readiness()
+        if stream_id in readiness["waiting_to_start"]:
+            emit("video_status", {"stream_id": stream_id, "state": "loading"})
+        elif readiness["state"] == "failed":
+            emit("video_error", {"stream_id": stream_id, "error": f"Models failed to load: {readiness['error']}"})
 
     @socketio.on("stop_video")
     def handle_stop_video(data=None):
         print("Received stop_video event")
-        video_processor.stop()
+        data = data or {}
+        key = data.get("stream_id", data.get("camera_index"))
+        if key is None:
+            stream_manager.stop_all()
+            return
+        stream_id = stream_manager.resolve(key)
+        if stream_id is not None:
+            stream_manager.stop(stream_id)
 
-    return app, socketio
+    return app
 
-# Create a global app variable for Flask CLI to pick up
-app, socketio = create_app()
+# No app at import: worker processes (OCR, pipeline stages) are spawned and
+# re-import this module, and must not build one of their own. The Flask CLI
+# (flask db upgrade) finds the create_app factory instead.
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True, host='0.0.0.0', port=5001, allow_unsafe_werkzeug=True)
+    app = create_app()
+    socketio = app.extensions['socketio']
+    debug = True
+    # With the reloader (on in debug) this script also runs as the watcher
+    # that restarts the server; only the server process
+    # (WERKZEUG_RUN_MAIN=true) loads the models and starts the event writer
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        app.extensions['stream_manager'].load_async()
+    socketio.run(app, debug=debug, host='0.0.0.0', port=5001, allow_unsafe_werkzeug=True)
@@ -0,0 +1,65 @@
+"""Detection events and plate reads
+
+Revision ID: 5b1d2c9e7a41
+Revises: 27f597ee2047
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1d2c9e7a41'
+down_revision = '27f597ee2047'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('detection_events',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('stream_id', sa.String(length=64), nullable=False),
+    sa.Column('frame_id', sa.Integer(), nullable=False),
+    sa.Column('detected_at', sa.DateTime(), nullable=False),
+    sa.Column('label', sa.String(length=64), nullable=False),
+    sa.Column('confidence', sa.Float(), nullable=False),
+    sa.Column('track_id', sa.Integer(), nullable=True),
+    sa.Column('plate', sa.String(length=32), nullable=True),
+    sa.Column('plate_confidence', sa.Float(), nullable=True),
+    sa.Column('color', sa.String(length=7), nullable=True),
+    sa.Column('color_name', sa.String(length=16), nullable=True),
+    sa.Column('x1', sa.Integer(), nullable=False),
+    sa.Column('y1', sa.Integer(), nullable=False),
+    sa.Column('x2', sa.Integer(), nullable=False),
+    sa.Column('y2', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_detection_events_stream_detected_at', 'detection_events', ['stream_id', 'detected_at'], unique=False)
+    op.create_index(op.f('ix_detection_events_plate'), 'detection_events', ['plate'], unique=False)
+    op.create_table('plate_reads',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('stream_id', sa.String(length=64), nullable=False),
+    sa.Column('frame_id', sa.Integer(), nullable=True),
+    sa.Column('read_at', sa.DateTime(), nullable=False),
+    sa.Column('label', sa.String(length=64), nullable=True),
+    sa.Column('text', sa.String(length=32), nullable=True),
+    sa.Column('confidence', sa.Float(), nullable=True),
+    sa.Column('track_id', sa.Integer(), nullable=True),
+    sa.Column('plate', sa.String(length=32), nullable=True),
+    sa.Column('plate_confidence', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_plate_reads_stream_read_at', 'plate_reads', ['stream_id', 'read_at'], unique=False)
+    op.create_index(op.f('ix_plate_reads_text'), 'plate_reads', ['text'], unique=False)
+    op.create_index(op.f('ix_plate_reads_plate'), 'plate_reads', ['plate'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_plate_reads_plate'), table_name='plate_reads')
+    op.drop_index(op.f('ix_plate_reads_text'), table_name='plate_reads')
+    op.drop_index('ix_plate_reads_stream_read_at', table_name='plate_reads')
+    op.drop_table('plate_reads')
+    op.drop_index(op.f('ix_detection_events_plate'), table_name='detection_events')
+    op.drop_index('ix_detection_events_stream_detected_at', table_name='detection_events')
+    op.drop_table('detection_events')
@@ -0,0 +1,50 @@
+"""Plate keys for fuzzy plate search
+
+Revision ID: 8e4f0a6c3d52
+Revises: 5b1d2c9e7a41
+Create Date: 2026-10-18 16:40:12.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4f0a6c3d52'
+down_revision = '5b1d2c9e7a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('plate_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('text', sa.String(length=32), nullable=False),
+    sa.Column('folded', sa.String(length=32), nullable=False),
+    sa.Column('reads', sa.Integer(), nullable=False),
+    sa.Column('first_seen', sa.DateTime(), nullable=False),
+    sa.Column('last_seen', sa.DateTime(), nullable=False),
+    sa.Column('last_stream_id', sa.String(length=64), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('text')
+    )
+    op.create_index(op.f('ix_plate_keys_folded'), 'plate_keys', ['folded'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        # Backfill from the reads stored so far (one pass, at migration time
+        # only); the fold mirrors detection_service.plate_search.fold_plate
+        op.execute("""
+            INSERT INTO plate_keys (text, folded, reads, first_seen, last_seen)
+            SELECT spelling,
+                   TRANSLATE(REGEXP_REPLACE(UPPER(spelling), '[^A-Z0-9]', '', 'g'), 'OQDILBSZ', '00011852'),
+                   COUNT(*), MIN(read_at), MAX(read_at)
+            FROM (SELECT text AS spelling, read_at FROM plate_reads WHERE text IS NOT NULL
+                  UNION ALL
+                  SELECT plate AS spelling, read_at FROM plate_reads WHERE plate IS NOT NULL) AS spellings
+            WHERE REGEXP_REPLACE(spelling, '[^A-Za-z0-9]', '', 'g') <> ''
+            GROUP BY spelling
+        """)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_plate_keys_folded'), table_name='plate_keys')
+    op.drop_table('plate_keys')
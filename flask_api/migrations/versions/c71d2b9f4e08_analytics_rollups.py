@@ -0,0 +1,50 @@
+"""Analytics rollups
+
+Revision ID: c71d2b9f4e08
+Revises: 8e4f0a6c3d52
+Create Date: 2026-10-18 18:05:47.530912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71d2b9f4e08'
+down_revision = '8e4f0a6c3d52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('analytics_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('granularity', sa.String(length=8), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('stream_id', sa.String(length=64), nullable=False),
+    sa.Column('label', sa.String(length=64), nullable=False),
+    sa.Column('vehicles', sa.Integer(), nullable=False),
+    sa.Column('detections', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('granularity', 'bucket', 'stream_id', 'label', name='uq_analytics_rollups_key')
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        # Backfill from the events stored so far (one pass, at migration
+        # time only), in the same local time as the live rollups. Vehicle
+        # counts of the history are approximate: track ids repeat across
+        # stream restarts.
+        offset = float(os.getenv('KOTSEK_ANALYTICS_UTC_OFFSET') or 0)
+        for granularity in ('hour', 'day', 'month'):
+            op.execute(f"""
+                INSERT INTO analytics_rollups (granularity, bucket, stream_id, label, vehicles, detections)
+                SELECT '{granularity}', date_trunc('{granularity}', detected_at + interval '{offset} hours'),
+                       stream_id, label,
+                       COUNT(DISTINCT track_id) + COUNT(*) FILTER (WHERE track_id IS NULL), COUNT(*)
+                FROM detection_events
+                GROUP BY 2, 3, 4
+            """)
+
+
+def downgrade():
+    op.drop_table('analytics_rollups')
@@ -0,0 +1,65 @@
+"""Incidents and the vehicles involved
+
+Revision ID: f2a9c4e1b7d3
+Revises: c71d2b9f4e08
+Create Date: 2026-10-18 19:21:08.664210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a9c4e1b7d3'
+down_revision = 'c71d2b9f4e08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('incidents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('incident_name', sa.String(length=200), nullable=False),
+    sa.Column('occurred_at', sa.DateTime(), nullable=False),
+    sa.Column('details', sa.Text(), nullable=False),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['created_by'], ['user_profiles.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_incidents_occurred_at_id', 'incidents', ['occurred_at', 'id'], unique=False)
+    op.create_index('ix_incidents_name_id', 'incidents', ['incident_name', 'id'], unique=False)
+    op.create_table('incident_vehicles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('incident_id', sa.Integer(), nullable=False),
+    sa.Column('occurred_at', sa.DateTime(), nullable=False),
+    sa.Column('plate_number', sa.String(length=32), nullable=False),
+    sa.Column('plate_normalized', sa.String(length=32), nullable=False),
+    sa.Column('vehicle_type', sa.String(length=32), nullable=False),
+    sa.Column('color', sa.String(length=32), nullable=False),
+    sa.Column('drivers_name', sa.String(length=120), nullable=False),
+    sa.Column('contact_number', sa.String(length=32), nullable=False),
+    sa.ForeignKeyConstraint(['incident_id'], ['incidents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_incident_vehicles_incident_id'), 'incident_vehicles', ['incident_id'], unique=False)
+    op.create_index('ix_incident_vehicles_type_occurred_at', 'incident_vehicles', ['vehicle_type', 'occurred_at', 'incident_id'], unique=False)
+    op.create_index('ix_incident_vehicles_plate_occurred_at', 'incident_vehicles', ['plate_normalized', 'occurred_at', 'incident_id'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        # Substring search over names and details (ILIKE '%...%') through trigram indexes
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX ix_incidents_name_trgm ON incidents USING gin (incident_name gin_trgm_ops)')
+        op.execute('CREATE INDEX ix_incidents_details_trgm ON incidents USING gin (details gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_incidents_details_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_incidents_name_trgm')
+    op.drop_index('ix_incident_vehicles_plate_occurred_at', table_name='incident_vehicles')
+    op.drop_index('ix_incident_vehicles_type_occurred_at', table_name='incident_vehicles')
+    op.drop_index(op.f('ix_incident_vehicles_incident_id'), table_name='incident_vehicles')
+    op.drop_table('incident_vehicles')
+    op.drop_index('ix_incidents_name_id', table_name='incidents')
+    op.drop_index('ix_incidents_occurred_at_id', table_name='incidents')
+    op.drop_table('incidents')
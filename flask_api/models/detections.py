@@ -0,0 +1,133 @@
+from db.db import db
+from datetime import datetime
+
+class DetectionEvent(db.Model):
+    """One detected object in one processed frame of a camera stream"""
+    __tablename__ = 'detection_events'
+    __table_args__ = (
+        db.Index('ix_detection_events_stream_detected_at', 'stream_id', 'detected_at'),
+    )
+
+    # Only INTEGER keys autoincrement on SQLite, which the tests run on
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    stream_id = db.Column(db.String(64), nullable=False)
+    frame_id = db.Column(db.Integer, nullable=False)
+    detected_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    label = db.Column(db.String(64), nullable=False)
+    confidence = db.Column(db.Float, nullable=False)
+    track_id = db.Column(db.Integer, nullable=True)
+    plate = db.Column(db.String(32), nullable=True, index=True)
+    plate_confidence = db.Column(db.Float, nullable=True)
+    color = db.Column(db.String(7), nullable=True)
+    color_name = db.Column(db.String(16), nullable=True)
+    x1 = db.Column(db.Integer, nullable=False)
+    y1 = db.Column(db.Integer, nullable=False)
+    x2 = db.Column(db.Integer, nullable=False)
+    y2 = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<DetectionEvent {self.stream_id}#{self.frame_id} {self.label}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'stream_id': self.stream_id,
+            'frame_id': self.frame_id,
+            'detected_at': self.detected_at.isoformat(),
+            'label': self.label,
+            'confidence': self.confidence,
+            'track_id': self.track_id,
+            'plate': self.plate,
+            'plate_confidence': self.plate_confidence,
+            'color': self.color,
+            'color_name': self.color_name,
+            'box': [self.x1, self.y1, self.x2, self.y2]
+        }
+
+class PlateRead(db.Model):
+    """One OCR read of a plate crop, with the vehicle's consensus plate when tracked"""
+    __tablename__ = 'plate_reads'
+    __table_args__ = (
+        db.Index('ix_plate_reads_stream_read_at', 'stream_id', 'read_at'),
+    )
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    stream_id = db.Column(db.String(64), nullable=False)
+    frame_id = db.Column(db.Integer, nullable=True)
+    read_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    label = db.Column(db.String(64), nullable=True)
+    text = db.Column(db.String(32), nullable=True, index=True)
+    confidence = db.Column(db.Float, nullable=True)
+    track_id = db.Column(db.Integer, nullable=True)
+    plate = db.Column(db.String(32), nullable=True, index=True)
+    plate_confidence = db.Column(db.Float, nullable=True)
+
+    def __repr__(self):
+        return f'<PlateRead {self.stream_id} {self.text}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'stream_id': self.stream_id,
+            'frame_id': self.frame_id,
+            'read_at': self.read_at.isoformat(),
+            'label': self.label,
+            'text': self.text,
+            'confidence': self.confidence,
+            'track_id': self.track_id,
+            'plate': self.plate,
+            'plate_confidence': self.plate_confidence
+        }
+
+class PlateKey(db.Model):
+    """One distinct plate spelling with its confusion-folded search key and read counters"""
+    __tablename__ = 'plate_keys'
+
+    id = db.Column(db.Integer, primary_key=True)
+    text = db.Column(db.String(32), nullable=False, unique=True)
+    folded = db.Column(db.String(32), nullable=False, index=True)
+    reads = db.Column(db.Integer, nullable=False, default=0)
+    first_seen = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_seen = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_stream_id = db.Column(db.String(64), nullable=True)
+
+    def __repr__(self):
+        return f'<PlateKey {self.text}>'
+
+    def to_dict(self):
+        return {
+            'text': self.text,
+            'folded': self.folded,
+            'reads': self.reads,
+            'first_seen': self.first_seen.isoformat(),
+            'last_seen': self.last_seen.isoformat(),
+            'last_stream_id': self.last_stream_id
+        }
+
+class AnalyticsRollup(db.Model):
+    """Vehicle and detection counts of one camera and class in one hour, day or month"""
+    __tablename__ = 'analytics_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('granularity', 'bucket', 'stream_id', 'label', name='uq_analytics_rollups_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(8), nullable=False)
+    bucket = db.Column(db.DateTime, nullable=False)
+    stream_id = db.Column(db.String(64), nullable=False)
+    label = db.Column(db.String(64), nullable=False)
+    vehicles = db.Column(db.Integer, nullable=False, default=0)
+    detections = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<AnalyticsRollup {self.granularity} {self.bucket} {self.stream_id} {self.label}>'
+
+    def to_dict(self):
+        return {
+            'granularity': self.granularity,
+            'bucket': self.bucket.isoformat(),
+            'stream_id': self.stream_id,
+            'label': self.label,
+            'vehicles': self.vehicles,
+            'detections': self.detections
+        }
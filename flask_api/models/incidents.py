@@ -0,0 +1,67 @@
+from db.db import db
+from datetime import datetime
+
+class Incident(db.Model):
+    """An incident report; listed newest first (or by name) with keyset pagination"""
+    __tablename__ = 'incidents'
+    __table_args__ = (
+        # Keyset pagination: one index per sort order, ending in the id tie-breaker
+        db.Index('ix_incidents_occurred_at_id', 'occurred_at', 'id'),
+        db.Index('ix_incidents_name_id', 'incident_name', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    incident_name = db.Column(db.String(200), nullable=False)
+    occurred_at = db.Column(db.DateTime, nullable=False)
+    details = db.Column(db.Text, nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('user_profiles.id'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    vehicles = db.relationship('IncidentVehicle', backref='incident', lazy='selectin',
+                               cascade='all, delete-orphan', order_by='IncidentVehicle.id')
+
+    def __repr__(self):
+        return f'<Incident {self.id} {self.incident_name}>'
+
+    def to_dict(self):
+        # Same shape as the report page's incident form
+        return {
+            'id': self.id,
+            'incident_name': self.incident_name,
+            'date': self.occurred_at.strftime('%Y-%m-%d'),
+            'time': self.occurred_at.strftime('%H:%M'),
+            'details': self.details,
+            'vehicles': [vehicle.to_dict() for vehicle in self.vehicles],
+            'created_at': self.created_at.isoformat()
+        }
+
+class IncidentVehicle(db.Model):
+    """A vehicle involved in an incident"""
+    __tablename__ = 'incident_vehicles'
+    __table_args__ = (
+        # The incident's time is copied here so type and plate filters walk
+        # these indexes in the same order as the date-sorted listing
+        db.Index('ix_incident_vehicles_type_occurred_at', 'vehicle_type', 'occurred_at', 'incident_id'),
+        db.Index('ix_incident_vehicles_plate_occurred_at', 'plate_normalized', 'occurred_at', 'incident_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    incident_id = db.Column(db.Integer, db.ForeignKey('incidents.id', ondelete='CASCADE'), nullable=False, index=True)
+    occurred_at = db.Column(db.DateTime, nullable=False)
+    plate_number = db.Column(db.String(32), nullable=False)
+    plate_normalized = db.Column(db.String(32), nullable=False)
+    vehicle_type = db.Column(db.String(32), nullable=False)
+    color = db.Column(db.String(32), nullable=False)
+    drivers_name = db.Column(db.String(120), nullable=False)
+    contact_number = db.Column(db.String(32), nullable=False)
+
+    def __repr__(self):
+        return f'<IncidentVehicle {self.plate_number}>'
+
+    def to_dict(self):
+        return {
+            'plateNumber': self.plate_number,
+            'type': self.vehicle_type,
+            'color': self.color,
+            'driversName': self.drivers_name,
+            'contactNumber': self.contact_number
+        }
@@ -0,0 +1,46 @@
+import pytest
+import sqlalchemy as sa
+from db.db import db
+from detection_service.event_writer import EventWriter
+from models.detections import DetectionEvent, PlateRead, PlateKey, AnalyticsRollup
+
+TABLES = {DetectionEvent.__tablename__: DetectionEvent.__table__,
+          PlateRead.__tablename__: PlateRead.__table__}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # A file, not :memory:, so every connection of the pool sees the same database
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'events.db'}")
+
+    @sa.event.listens_for(engine, "connect")
+    def use_wal(dbapi_connection, _):
+        # Readers do not block the writer, as on PostgreSQL
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+    db.metadata.create_all(engine, tables=[DetectionEvent.__table__, PlateRead.__table__,
+                                           PlateKey.__table__, AnalyticsRollup.__table__])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def make_writer(engine, tmp_path):
+    """EventWriters on the test database, not started: the tests drive flush/replay themselves."""
+    def make(hooks=(), **kwargs):
+        kwargs.setdefault("spill_dir", str(tmp_path / "spill"))
+        writer = EventWriter(engine, TABLES, hooks=hooks, **kwargs)
+        (tmp_path / "spill").mkdir(exist_ok=True)
+        return writer
+    return make
+
+
+def spill_now(writer):
+    """Write out everything queued for spilling, as the spill thread would."""
+    writer.spill_queue.put(None)
+    writer.spill_loop()
+
+
+def count(engine, query):
+    with engine.connect() as conn:
+        return conn.execute(sa.text(query)).scalar()
@@ -0,0 +1,14 @@
+import argparse
+import pytest
+from detection_service.backend_parity import parse_backend
+
+
+def test_parse_backend():
+    assert parse_backend("torch") == ("torch", False)
+    assert parse_backend("openvino-int8") == ("openvino", True)
+
+
+@pytest.mark.parametrize("name", ["torch-int8", "onnx-fp16", "onnx-", "tensorrt"])
+def test_parse_backend_rejects(name):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_backend(name)
@@ -0,0 +1,127 @@
+import glob
+import json
+import os
+from datetime import datetime
+from threading import Thread
+import sqlalchemy as sa
+from conftest import count, spill_now
+from detection_service.event_writer import detection_rows, plate_read_row
+from detection_service.plate_search import PlateIndex
+from models.detections import PlateKey
+
+
+def detections(frame_id, *boxes, track_id=None):
+    return detection_rows("entrance", {
+        "frame_id": frame_id,
+        "captured_at": 1700000000.0 + frame_id,
+        "detections": [{"label": "car", "confidence": 0.9, "coordinates": box, "track_id": track_id}
+                       for box in boxes],
+    })
+
+
+def spill_file(directory, name, rows, number):
+    path = os.path.join(directory, f"{name}-{number:05d}.jsonl")
+    with open(path, "w") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=lambda v: v.isoformat()) + "\n")
+    # Replay goes oldest first, by modification time
+    os.utime(path, (number, number))
+    return path
+
+
+def test_flush_writes_rows(engine, make_writer):
+    writer = make_writer()
+    writer.flush("detection_events", detections(1, (0, 0, 10, 10), (5.4, 5.6, 20, 20)))
+    assert writer.written == 2
+    assert count(engine, "SELECT count(*) FROM detection_events") == 2
+    assert count(engine, "SELECT y1 FROM detection_events WHERE x1 = 5") == 6
+
+
+def test_failed_flush_is_spilled_then_replayed(engine, make_writer):
+    writer = make_writer()
+    with engine.begin() as conn:
+        conn.execute(sa.text("ALTER TABLE detection_events RENAME TO detection_events_away"))
+    writer.flush("detection_events", detections(1, (0, 0, 10, 10)))
+    assert writer.failures == 1 and writer.retry_at > 0
+    # While the database is down, later batches go straight to disk
+    writer.flush("detection_events", detections(2, (0, 0, 10, 10)))
+    spill_now(writer)
+    assert writer.spilled == 2 and len(writer.spill_files()) == 2
+
+    with engine.begin() as conn:
+        conn.execute(sa.text("ALTER TABLE detection_events_away RENAME TO detection_events"))
+    writer.retry_at = 0.0
+    writer.replay_one()
+    writer.replay_one()
+    assert writer.replayed == 2 and writer.spill_files() == []
+    assert count(engine, "SELECT count(*) FROM detection_events") == 2
+    with engine.connect() as conn:
+        detected_at = conn.execute(sa.text("SELECT detected_at FROM detection_events WHERE frame_id = 1")).scalar()
+    assert detected_at.startswith(str(datetime.utcfromtimestamp(1700000001.0)))
+
+
+def test_each_spill_file_is_replayed_once(engine, make_writer, tmp_path):
+    writers = [make_writer() for _ in range(3)]
+    for number in range(30):
+        spill_file(writers[0].spill_dir, "plate_reads", [plate_read_row("entrance", f"ABC{number}", 0.9)], number)
+
+    def replay(writer):
+        for _ in range(30):
+            writer.replay_one()
+
+    threads = [Thread(target=replay, args=(writer,)) for writer in writers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert count(engine, "SELECT count(*) FROM plate_reads") == 30
+    assert count(engine, "SELECT count(DISTINCT text) FROM plate_reads") == 30
+    assert os.listdir(writers[0].spill_dir) == []
+
+
+def bad_rows(directory):
+    rows = []
+    for path in glob.glob(os.path.join(directory, "*.jsonl.bad")):
+        with open(path) as f:
+            rows += [json.loads(line) for line in f]
+    return rows
+
+
+def test_rejected_rows_are_set_aside(engine, make_writer):
+    writer = make_writer()
+    spill_file(writer.spill_dir, "plate_reads", [plate_read_row("entrance", "ABC123", 0.9),
+                                                 plate_read_row(None, "BAD000", 0.9),
+                                                 plate_read_row("entrance", "DEF456", 0.9)], 1)
+    spill_file(writer.spill_dir, "plate_reads", [plate_read_row("entrance", "XYZ789", 0.9)], 2)
+    writer.replay_one()
+    writer.replay_one()
+    # Only the bad row stays out, and the database is not considered down
+    assert [row["text"] for row in bad_rows(writer.spill_dir)] == ["BAD000"]
+    assert writer.quarantined == 1 and writer.replayed == 3
+    assert writer.retry_at == 0.0 and writer.spill_files() == []
+    assert count(engine, "SELECT group_concat(text) FROM (SELECT text FROM plate_reads ORDER BY text)") == \
+        "ABC123,DEF456,XYZ789"
+
+
+def test_rejected_batch_keeps_its_good_rows(engine, make_writer):
+    index = PlateIndex(PlateKey.__table__)
+    index.state = "ready"
+    writer = make_writer(hooks=[index])
+    rows = [plate_read_row("entrance", f"ABC{number:03d}", 0.9) for number in range(20)]
+    rows[7]["stream_id"] = rows[13]["stream_id"] = None
+    writer.flush("plate_reads", rows)
+    spill_now(writer)
+    assert writer.written == 18 and writer.quarantined == 2 and writer.retry_at == 0.0
+    assert sorted(row["text"] for row in bad_rows(writer.spill_dir)) == ["ABC007", "ABC013"]
+    assert writer.spill_files() == []
+    # The hooks saw every row that went in, once
+    assert count(engine, "SELECT sum(reads) FROM plate_keys") == 18
+    assert index.stats()["plates"] == 18
+
+
+def test_long_strings_are_clipped(engine, make_writer):
+    writer = make_writer()
+    writer.flush("plate_reads", [plate_read_row("entrance", "A" * 40, 0.5, label="x" * 80)])
+    assert writer.written == 1
+    assert count(engine, "SELECT length(text) FROM plate_reads") == 32
+    assert count(engine, "SELECT length(label) FROM plate_reads") == 64
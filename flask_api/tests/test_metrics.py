@@ -0,0 +1,6 @@
+from detection_service.metrics import _labels
+
+
+def test_label_values_are_escaped():
+    assert _labels(camera='gate "B"\\2\nnorth', stage="decode") == \
+        '{camera="gate \\"B\\"\\\\2\\nnorth",stage="decode"}'
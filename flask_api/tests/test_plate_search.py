@@ -0,0 +1,104 @@
+from datetime import datetime
+import pytest
+from detection_service.event_writer import plate_read_row
+from detection_service.plate_search import PlateIndex, edit_distance, fold_plate, normalize_plate, plate_key_rows
+from models.detections import PlateKey
+from conftest import count
+
+
+def plates(results):
+    return [(r["plate"], r["match"]) for r in results]
+
+
+def test_normalize_and_fold():
+    assert normalize_plate(" abc-1o8 ") == "ABC1O8"
+    assert fold_plate("ABC 1O8") == fold_plate("A8C108")
+
+
+def test_edit_distance():
+    assert edit_distance("ABC123", "ABC123", 1) == 0
+    assert edit_distance("ABC123", "ABX123", 1) == 1
+    assert edit_distance("ABC123", "AB123", 1) == 1
+    assert edit_distance("ABC123", "XBC12", 1) == 2
+    assert edit_distance("ABC123", "ABD124", 2) == 2
+
+
+def test_search_ranks_exact_confusion_then_edit():
+    index = PlateIndex()
+    index.add("ABC 108", reads=5)
+    index.add("A8C1O8", reads=2)
+    index.add("ABC109", reads=9)
+    index.add("XYZ999")
+    assert plates(index.search("abc108")) == [("ABC108", "exact"), ("A8C1O8", "confusion"), ("ABC109", "edit")]
+    assert plates(index.search("abc108", max_distance=0)) == [("ABC108", "exact"), ("A8C1O8", "confusion")]
+    assert index.search("abc108")[0]["spellings"] == ["ABC 108", "ABC108"]
+
+
+def test_partial_search():
+    index = PlateIndex()
+    index.add("ABC1234")
+    index.add("XBC1299")
+    index.add("QRS5678")
+    assert sorted(r["plate"] for r in index.search("BC12", partial=True)) == ["ABC1234", "XBC1299"]
+    assert plates(index.search("ABC?234")) == [("ABC1234", "partial")]
+    with pytest.raises(ValueError):
+        index.search("A?C")
+
+
+def test_index_follows_the_writer_and_loads_from_plate_keys(engine, make_writer):
+    index = PlateIndex(PlateKey.__table__)
+    writer = make_writer(hooks=[index])
+    read_at = datetime(2026, 3, 1, 8, 0)
+    rows = [plate_read_row("entrance", "ABC123", 0.9), plate_read_row("gate", "ABC123", 0.8)]
+    rows[1]["read_at"] = read_at
+    writer.flush("plate_reads", rows)
+    # Not loaded yet: only plate_keys has the reads
+    assert index.stats()["keys"] == 0
+    index.load(engine)
+    assert index.state == "ready"
+    [result] = index.search("ABC123")
+    assert result["reads"] == 2 and result["last_stream_id"] == "entrance"
+
+    writer.flush("plate_reads", [plate_read_row("gate", "ABC 123", 0.7)])
+    [result] = index.search("ABC123")
+    assert result["reads"] == 3 and result["spellings"] == ["ABC 123", "ABC123"]
+
+
+def test_a_read_counts_once_when_text_and_plate_agree():
+    rows = [plate_read_row("entrance", "ABC123", 0.9, plate="ABC123"),
+            plate_read_row("entrance", "ABC 123", 0.9, plate="ABC123")]
+    assert {row["text"]: row["reads"] for row in plate_key_rows(rows)} == {"ABC123": 2, "ABC 123": 1}
+
+
+def test_reads_committed_while_loading_count_once(engine, make_writer):
+    index = PlateIndex(PlateKey.__table__)
+    writer = make_writer(hooks=[index])
+    writer.flush("plate_reads", [plate_read_row("entrance", "ABC123", 0.9)])
+    # As load_async leaves it until the load thread has its snapshot
+    index.state = "loading"
+    writer.flush("plate_reads", [plate_read_row("entrance", "ABC123", 0.9, plate="ABC123")])
+
+    add = index.add
+    during_load = []
+
+    def add_while_a_batch_commits(*args, **kwargs):
+        if not during_load:
+            during_load.append(True)
+            writer.flush("plate_reads", [plate_read_row("gate", "ABC123", 0.9), plate_read_row("gate", "XYZ789", 0.9)])
+        add(*args, **kwargs)
+
+    index.add = add_while_a_batch_commits
+    index.load(engine)
+    assert during_load and writer.written == 4
+    assert index.state == "ready" and index.held_back is None
+    assert index.search("ABC123")[0]["reads"] == 3 == count(engine, "SELECT reads FROM plate_keys WHERE text = 'ABC123'")
+    assert index.search("XYZ789")[0]["reads"] == 1
+
+
+def test_failed_batch_releases_the_load(engine, make_writer):
+    index = PlateIndex(PlateKey.__table__)
+    writer = make_writer(hooks=[index])
+    writer.flush("plate_reads", [plate_read_row(None, "ABC123", 0.9)])
+    assert writer.failures == 1 and not index.committing
+    index.load(engine)
+    assert index.state == "ready"
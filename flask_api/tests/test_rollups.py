@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+import sqlalchemy as sa
+from conftest import spill_now
+from detection_service.rollups import Rollups
+from models.detections import AnalyticsRollup
+
+START = datetime(2026, 3, 1, 8, 15)
+
+
+def row(seconds, track_id=None, label="car", stream_id="entrance"):
+    return {"stream_id": stream_id, "frame_id": int(seconds), "detected_at": START + timedelta(seconds=seconds),
+            "label": label, "confidence": 0.9, "track_id": track_id, "x1": 0, "y1": 0, "x2": 10, "y2": 10}
+
+
+def rollups(engine, granularity="hour"):
+    with engine.connect() as conn:
+        table = AnalyticsRollup.__table__
+        return {(r.stream_id, r.label): (r.vehicles, r.detections) for r in conn.execute(
+            sa.select(table).where(table.c.granularity == granularity))}
+
+
+class FailOnce:
+    """A hook whose first apply fails, rolling back the batch it was part of."""
+
+    def __init__(self):
+        self.failed = False
+
+    def apply(self, conn, name, rows):
+        if not self.failed:
+            self.failed = True
+            raise RuntimeError("database went away")
+
+    def committed(self, name, rows):
+        pass
+
+    def rolled_back(self, name, rows):
+        pass
+
+
+def test_track_is_one_vehicle_across_batches(engine, make_writer):
+    writer = make_writer(hooks=[Rollups(AnalyticsRollup.__table__)])
+    writer.flush("detection_events", [row(0, track_id=1), row(1, track_id=1), row(1, track_id=2)])
+    writer.flush("detection_events", [row(2, track_id=1), row(3, track_id=2)])
+    for granularity in ("hour", "day", "month"):
+        assert rollups(engine, granularity) == {("entrance", "car"): (2, 5)}
+
+
+def test_quiet_track_counts_again(engine, make_writer):
+    writer = make_writer(hooks=[Rollups(AnalyticsRollup.__table__, track_gap=30.0)])
+    writer.flush("detection_events", [row(0, track_id=1)])
+    writer.flush("detection_events", [row(20, track_id=1)])
+    writer.flush("detection_events", [row(100, track_id=1)])
+    assert rollups(engine) == {("entrance", "car"): (2, 3)}
+
+
+def test_untracked_detections_each_count(engine, make_writer):
+    writer = make_writer(hooks=[Rollups(AnalyticsRollup.__table__)])
+    writer.flush("detection_events", [row(0), row(1), row(1, label="truck")])
+    assert rollups(engine) == {("entrance", "car"): (2, 2), ("entrance", "truck"): (1, 1)}
+
+
+def test_replayed_batch_is_counted_once(engine, make_writer):
+    writer = make_writer(hooks=[Rollups(AnalyticsRollup.__table__), FailOnce()])
+    writer.flush("detection_events", [row(0, track_id=1), row(1, track_id=1)])
+    assert writer.failures == 1 and rollups(engine) == {}
+    spill_now(writer)
+    writer.retry_at = 0.0
+    writer.replay_one()
+    # Newer rows of the same track arrive after the replay
+    writer.flush("detection_events", [row(2, track_id=1)])
+    assert rollups(engine) == {("entrance", "car"): (1, 3)}
+
+
+def test_batch_replayed_after_newer_rows_is_counted_once(engine, make_writer):
+    # EventWriter.run flushes live batches before it replays spill files
+    writer = make_writer(hooks=[Rollups(AnalyticsRollup.__table__, track_gap=30.0), FailOnce()])
+    writer.flush("detection_events", [row(seconds, track_id=1) for seconds in range(41)])
+    # The database is back: the next live batch goes in, then the spill file
+    writer.retry_at = 0.0
+    writer.flush("detection_events", [row(seconds, track_id=1) for seconds in range(41, 46)])
+    spill_now(writer)
+    writer.retry_at = 0.0
+    writer.replay_one()
+    assert writer.replayed == 41
+    assert rollups(engine) == {("entrance", "car"): (1, 46)}
+
+
+def test_replayed_track_far_from_newer_rows_is_another_vehicle(engine, make_writer):
+    writer = make_writer(hooks=[Rollups(AnalyticsRollup.__table__, track_gap=30.0), FailOnce()])
+    writer.flush("detection_events", [row(0, track_id=1), row(5, track_id=1)])
+    writer.retry_at = 0.0
+    writer.flush("detection_events", [row(300, track_id=1)])
+    spill_now(writer)
+    writer.replay_one()
+    # Rows between the two vehicles' intervals join them rather than counting again
+    writer.flush("detection_events", [row(150, track_id=1)])
+    assert rollups(engine) == {("entrance", "car"): (2, 4)}
+
+
+def test_buckets_follow_the_utc_offset(engine, make_writer):
+    writer = make_writer(hooks=[Rollups(AnalyticsRollup.__table__, utc_offset=16.0)])
+    writer.flush("detection_events", [row(0)])
+    with engine.connect() as conn:
+        table = AnalyticsRollup.__table__
+        bucket = conn.execute(sa.select(table.c.bucket).where(table.c.granularity == "day")).scalar()
+    assert bucket == datetime(2026, 3, 2)